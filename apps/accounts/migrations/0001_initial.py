@@ -1,6 +1,6 @@
-# Generated by Django 6.0.1 on 2026-02-02 21:21
+# Generated by Django 5.2.18 on 2026-10-18 17:18
 
-import django.db.models.deletion
+import uuid
 from django.db import migrations, models
 
 
@@ -8,25 +8,12 @@ class Migration(migrations.Migration):
 
     initial = True
 
-    dependencies = [
-        ("common", "0001_initial"),
-    ]
+    dependencies = []
 
     operations = [
         migrations.CreateModel(
             name="User",
             fields=[
-                (
-                    "isdeletedmodel_ptr",
-                    models.OneToOneField(
-                        auto_created=True,
-                        on_delete=django.db.models.deletion.CASCADE,
-                        parent_link=True,
-                        primary_key=True,
-                        serialize=False,
-                        to="common.isdeletedmodel",
-                    ),
-                ),
                 ("password", models.CharField(max_length=128, verbose_name="password")),
                 (
                     "last_login",
@@ -34,6 +21,19 @@ class Migration(migrations.Migration):
                         blank=True, null=True, verbose_name="last login"
                     ),
                 ),
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("is_deleted", models.BooleanField(default=False)),
+                ("deleted_at", models.DateTimeField(blank=True, null=True)),
                 (
                     "first_name",
                     models.CharField(
@@ -73,6 +73,5 @@ class Migration(migrations.Migration):
             options={
                 "abstract": False,
             },
-            bases=("common.isdeletedmodel", models.Model),
         ),
     ]
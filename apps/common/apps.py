@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CommonConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = "apps.common"
+
+    def ready(self):
+        from apps.common.signals import connect_file_signals
+
+        connect_file_signals()
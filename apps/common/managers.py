@@ -23,15 +23,18 @@ class IsDeletedQuerySet(GetOrNoneQuerySet):
         if hard_delete:
             return super().delete()
         else:
-            self.update(is_deleted=True, deleted_at=timezone.now())
+            now = timezone.now()
+            self.update(is_deleted=True, deleted_at=now, updated_at=now)
 
 
 class IsDeletedManager(GetOrNoneManager):
+    queryset_class = IsDeletedQuerySet
+
     def get_queryset(self):
-        return IsDeletedQuerySet(self.model).filter(is_deleted=False)
+        return self.unfiltered().filter(is_deleted=False)
 
     def unfiltered(self):
-        return IsDeletedQuerySet(self.model)
+        return self.queryset_class(self.model)
 
     def hard_delete(self):
         return self.unfiltered().delete(hard_delete=True)
@@ -1,4 +1,4 @@
-# Generated by Django 6.0.1 on 2026-02-02 21:21
+# Generated by Django 5.2.18 on 2026-10-18 17:46
 
 import uuid
 from django.db import migrations, models
@@ -12,7 +12,7 @@ class Migration(migrations.Migration):
 
     operations = [
         migrations.CreateModel(
-            name="IsDeletedModel",
+            name="StoredFile",
             fields=[
                 (
                     "id",
@@ -25,8 +25,9 @@ class Migration(migrations.Migration):
                 ),
                 ("created_at", models.DateTimeField(auto_now_add=True)),
                 ("updated_at", models.DateTimeField(auto_now=True)),
-                ("is_deleted", models.BooleanField(default=False)),
-                ("deleted_at", models.DateTimeField(blank=True, null=True)),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("size", models.PositiveBigIntegerField()),
+                ("references", models.PositiveIntegerField(default=0)),
             ],
             options={
                 "abstract": False,
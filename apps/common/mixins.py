@@ -0,0 +1,209 @@
+import hashlib
+from itertools import islice
+
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    """
+    Answers conditional GETs (If-None-Match) with 304 Not Modified before
+    anything is serialized. The ETag comes from one aggregate over the view's
+    rows: `max(updated_at)` catches edits and the row count catches deletions.
+    No Last-Modified is sent: a hard delete can leave `max(updated_at)` where it
+    was, or move it back, so a date alone would answer 304 for a changed list.
+    Detail views set `conditional_empty_results = False` so a missing object
+    still goes through the normal 404 path.
+    """
+    conditional_empty_results = True
+
+    def get_validator_queryset(self):
+        return self.get_queryset()
+
+    def get_etag(self):
+        state = self.get_validator_queryset().order_by().aggregate(
+            last_modified=Max("updated_at"), count=Count("pk")
+        )
+        if not state["count"] and not self.conditional_empty_results:
+            return None
+        return self.build_etag(state["count"], state["last_modified"])
+
+    def build_etag(self, count, last_modified):
+        version = f"{self.request.get_full_path()}|{count}|{last_modified and last_modified.isoformat()}"
+        return f'"{hashlib.md5(version.encode(), usedforsecurity=False).hexdigest()}"'
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag()
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+        return response
+
+
+class StreamingListMixin:
+    """
+    `?stream=json` or `?stream=ndjson` returns the whole unpaginated list as a
+    streaming response. The queryset is read with `.iterator(chunk_size=...)` and
+    serialized chunk by chunk, so memory use does not grow with the row count.
+    """
+    stream_query_param = "stream"
+    stream_chunk_size = 500
+    stream_content_types = {
+        "json": "application/json",
+        "ndjson": "application/x-ndjson",
+    }
+
+    def get_stream_format(self):
+        stream_format = self.request.query_params.get(self.stream_query_param)
+        if stream_format is None:
+            return None
+        if stream_format not in self.stream_content_types:
+            raise ValidationError({
+                self.stream_query_param: f"Expected one of: {', '.join(self.stream_content_types)}"
+            })
+        return stream_format
+
+    def prepare_list(self, queryset):
+        """Returns the queryset to read and a callable serializing a chunk of its rows."""
+        return queryset, lambda rows: self.get_serializer(rows, many=True).data
+
+    def iter_chunks(self, queryset):
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            yield chunk
+
+    def render_stream(self, queryset, serialize, stream_format):
+        render = JSONRenderer().render
+        separator = b""
+        if stream_format == "json":
+            yield b"["
+        for chunk in self.iter_chunks(queryset):
+            items = [render(item) for item in serialize(chunk)]
+            if stream_format == "ndjson":
+                yield b"".join(item + b"\n" for item in items)
+            else:
+                yield separator + b",".join(items)
+                separator = b","
+        if stream_format == "json":
+            yield b"]"
+
+    def stream_list(self, stream_format):
+        queryset = self.filter_queryset(self.get_queryset())
+        if hasattr(self.paginator, "get_ordering"):
+            # Same order as the pages, including ?sort=.
+            queryset = queryset.order_by(*self.paginator.get_ordering(self.request))
+        queryset, serialize = self.prepare_list(queryset)
+        return StreamingHttpResponse(
+            self.render_stream(queryset, serialize, stream_format),
+            content_type=self.stream_content_types[stream_format],
+        )
+
+    def list(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format()
+        if stream_format is not None:
+            return self.stream_list(stream_format)
+        return super().list(request, *args, **kwargs)
+
+
+class ValuesListMixin(StreamingListMixin):
+    """
+    Lists through `values_serializer_class`, which renders `.values()` rows
+    instead of model instances. The output matches `serializer_class`.
+    """
+    values_serializer_class = None
+
+    def get_values_serializer(self):
+        return self.values_serializer_class(context=self.get_serializer_context(), serializer=self.get_serializer())
+
+    def prepare_list(self, queryset):
+        serializer = self.get_values_serializer()
+        return serializer.prepare(queryset), serializer.serialize
+
+    def list(self, request, *args, **kwargs):
+        stream_format = self.get_stream_format()
+        if stream_format is not None:
+            return self.stream_list(stream_format)
+        queryset, serialize = self.prepare_list(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize(page))
+        return Response(serialize(queryset))
+
+
+SPARSE_FIELDSET_PARAMETERS = [
+    OpenApiParameter(
+        name="fields",
+        description="Comma separated fields to return",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+    OpenApiParameter(
+        name="expand",
+        description="Comma separated relations to nest instead of returning their ids",
+        required=False,
+        type=OpenApiTypes.STR,
+    ),
+]
+
+
+class SparseFieldsetMixin:
+    """
+    `?fields=name,slug` trims the serializer to the named fields and
+    `?expand=seller` nests the relations listed in its `Meta.expandable_fields`.
+    The serializer has to use `DynamicFieldsMixin`. Values based lists select
+    only the remaining columns on their own; instance querysets are narrowed
+    with `get_sparse_queryset()`.
+    """
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+
+    def get_query_param_list(self, name):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        return {item.strip() for item in value.split(",") if item.strip()}
+
+    def get_sparse_fieldset(self):
+        if not hasattr(self, "_sparse_fieldset"):
+            self._sparse_fieldset = self.parse_sparse_fieldset()
+        return self._sparse_fieldset
+
+    def parse_sparse_fieldset(self):
+        if getattr(self, "swagger_fake_view", False) or self.request.method != "GET":
+            return None, set()
+        serializer_class = self.get_serializer_class()
+        fields = self.get_query_param_list(self.fields_query_param)
+        expand = self.get_query_param_list(self.expand_query_param) or set()
+        errors = {}
+        if fields is not None:
+            unknown = fields - set(serializer_class().fields)
+            if unknown:
+                errors[self.fields_query_param] = f"Unknown fields: {', '.join(sorted(unknown))}"
+        unknown = expand - set(getattr(serializer_class.Meta, "expandable_fields", {}))
+        if unknown:
+            errors[self.expand_query_param] = f"Fields cannot be expanded: {', '.join(sorted(unknown))}"
+        if errors:
+            raise ValidationError(errors)
+        return fields, expand
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_sparse_fieldset()
+        kwargs.setdefault("fields", fields)
+        kwargs.setdefault("expand", expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_sparse_queryset(self, queryset):
+        values_serializer = self.values_serializer_class(
+            context=self.get_serializer_context(), serializer=self.get_serializer()
+        )
+        return values_serializer.narrow(queryset)
@@ -28,7 +28,18 @@ class IsDeletedModel(BaseModel):
     def delete(self, *args, **kwargs):
         self.is_deleted = True
         self.deleted_at = timezone.now()
-        self.save(update_fields=["is_deleted", "deleted_at"])
+        # updated_at moves too, so readers syncing on it see the delete.
+        self.save(update_fields=["is_deleted", "deleted_at", "updated_at"])
 
     def hard_delete(self, *args, **kwargs):
         super().delete(*args, **kwargs)
+
+
+class StoredFile(BaseModel):
+    """Reference count of a file kept by `ContentAddressedStorage`."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    references = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,194 @@
+import decimal
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models
+from rest_framework import fields as drf_fields
+from rest_framework import relations, serializers
+from rest_framework.settings import api_settings
+
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for model serializers: `fields` keeps only the named fields
+    and `expand` swaps the relations listed in `Meta.expandable_fields` for their
+    nested serializers.
+    """
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in expand:
+            self.fields[name] = self.Meta.expandable_fields[name](read_only=True)
+        if fields is not None:
+            for name in set(self.fields) - set(fields) - set(expand):
+                self.fields.pop(name)
+
+
+class ValuesSerializer:
+    """
+    Read-only twin of a DRF serializer that renders rows of `QuerySet.values()`.
+
+    The DRF serializer is compiled once into a list of `(name, accessor)` pairs:
+    every accessor reads its column from the row and converts it exactly as the
+    DRF field would (UUIDs, ISO datetimes, quantized decimals, media URLs,
+    nested serializers), so the output is identical while no model instances or
+    field objects are touched per row.
+
+    Fields that are not backed by a column (properties, method fields) must be
+    listed in `computed_fields` with the columns they read, and implemented as
+    `compute_<name>(row)`.
+    """
+    serializer_class = None
+    computed_fields = {}
+    extra_lookups = ("id", "created_at")
+
+    def __init__(self, context=None, serializer=None):
+        self.context = context or {}
+        serializer = serializer or self.serializer_class(context=self.context)
+        self.model = serializer.Meta.model
+        self.lookups = set(self.extra_lookups)
+        self.plan = self.compile(serializer, self.model, "")
+
+    def prepare(self, queryset):
+        return queryset.prefetch_related(None).values(*sorted(self.lookups))
+
+    def narrow(self, queryset):
+        """
+        Instance counterpart of `prepare()`: loads the same columns through
+        `only()` and joins just the relations they cross.
+        """
+        relations = {lookup.rsplit("__", 1)[0] for lookup in self.lookups if "__" in lookup}
+        return queryset.select_related(None).select_related(*sorted(relations)).only(*sorted(self.lookups))
+
+    def serialize(self, rows):
+        plan = self.plan
+        return [{name: accessor(row) for name, accessor in plan} for row in rows]
+
+    def compile(self, serializer, model, prefix):
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if not prefix and name in self.computed_fields:
+                self.lookups.update(self.computed_fields[name])
+                plan.append((name, getattr(self, f"compute_{name}")))
+                continue
+            plan.append((name, self.compile_field(field, model, prefix)))
+        return plan
+
+    def compile_field(self, field, model, prefix):
+        if field.source == "*" or not all(field.source_attrs):
+            raise ImproperlyConfigured(
+                f"{type(self).__name__} cannot compile field {field.field_name!r}; "
+                f"list it in computed_fields"
+            )
+        lookup = prefix + "__".join(field.source_attrs)
+        model_field = self.resolve_model_field(model, field.source_attrs)
+
+        if isinstance(field, serializers.BaseSerializer):
+            nested_model = model_field.related_model
+            pk_lookup = f"{lookup}__{nested_model._meta.pk.name}"
+            self.lookups.add(pk_lookup)
+            nested_plan = self.compile(field, nested_model, f"{lookup}__")
+
+            def nested(row):
+                if row[pk_lookup] is None:
+                    return None
+                return {name: accessor(row) for name, accessor in nested_plan}
+
+            return nested
+
+        if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+            self.lookups.add(lookup)
+            return lambda row: row[lookup]
+
+        self.lookups.add(lookup)
+        convert = self.get_converter(field, model_field)
+
+        def accessor(row):
+            value = row[lookup]
+            return None if value is None else convert(value)
+
+        return accessor
+
+    @staticmethod
+    def resolve_model_field(model, attrs):
+        field = None
+        for attr in attrs:
+            try:
+                field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{'.'.join(attrs)} is not a database column of {model.__name__}"
+                )
+            if field.is_relation and field.related_model is not None:
+                model = field.related_model
+        return field
+
+    def get_converter(self, field, model_field):
+        if isinstance(field, drf_fields.UUIDField) and field.uuid_format == "hex_verbose":
+            return str
+        if isinstance(field, drf_fields.DateTimeField):
+            return self.datetime_converter(field)
+        if isinstance(field, drf_fields.DecimalField):
+            return self.decimal_converter(field)
+        if isinstance(field, drf_fields.FileField):
+            return self.file_converter(field, model_field)
+        if isinstance(field, drf_fields.CharField) and isinstance(model_field, models.FileField):
+            # str() of a FieldFile is its name, or "" when the name is empty.
+            return lambda value: value or ""
+        if isinstance(field, (drf_fields.CharField, drf_fields.IntegerField, drf_fields.BooleanField)):
+            return lambda value: value
+        return field.to_representation
+
+    @staticmethod
+    def datetime_converter(field):
+        output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+        if output_format is None or isinstance(output_format, str) and output_format.lower() != "iso-8601":
+            return field.to_representation
+        timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+
+        def convert(value):
+            if timezone is not None:
+                value = value.astimezone(timezone)
+            value = value.isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return convert
+
+    @staticmethod
+    def decimal_converter(field):
+        coerce_to_string = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+        if field.localize or field.decimal_places is None:
+            return field.to_representation
+        exponent = decimal.Decimal(".1") ** field.decimal_places
+        context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            context.prec = field.max_digits
+        rounding = field.rounding
+
+        def convert(value):
+            if not isinstance(value, decimal.Decimal):
+                value = decimal.Decimal(str(value).strip())
+            quantized = value.quantize(exponent, rounding=rounding, context=context)
+            return f"{quantized:f}" if coerce_to_string else quantized
+
+        return convert
+
+    def file_converter(self, field, model_field):
+        use_url = getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL)
+        if not use_url:
+            return lambda value: value or None
+        storage = model_field.storage
+        request = self.context.get("request")
+
+        def convert(value):
+            if not value:
+                return None
+            url = storage.url(value)
+            if request is not None:
+                return request.build_absolute_uri(url)
+            return url
+
+        return convert
@@ -0,0 +1,83 @@
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+from apps.common.storage import ContentAddressedStorage
+
+
+def get_tracked_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def release_on_commit(field, name):
+    if name and name != field.default:
+        transaction.on_commit(lambda: field.storage.delete(name))
+
+
+def loaded_names(instance, fields):
+    # Raw values, so loading a row does not build FieldFile objects; deferred fields are left out.
+    names = {}
+    for field in fields:
+        if field.attname in instance.__dict__:
+            value = instance.__dict__[field.attname]
+            names[field.attname] = getattr(value, "name", value) or ""
+    return names
+
+
+def remember_loaded_files(sender, instance, **kwargs):
+    instance._stored_files = loaded_names(instance, get_tracked_fields(sender))
+
+
+def remember_replaced_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Compares the tracked names with the ones the instance was loaded with: a
+    name assigned from an existing file gains a reference now (uploads gain
+    theirs in the storage) and the name it replaced is released after the save.
+    """
+    instance._replaced_files = {}
+    if raw:
+        return
+    fields = get_tracked_fields(sender)
+    if update_fields is not None:
+        fields = [field for field in fields if field.name in update_fields or field.attname in update_fields]
+    fields = [field for field in fields if field.attname in instance.__dict__]
+    adding = instance._state.adding
+    previous = {} if adding else dict(getattr(instance, "_stored_files", {}))
+    unknown = [field.attname for field in fields if not adding and field.attname not in previous]
+    if unknown:
+        previous.update(sender._base_manager.filter(pk=instance.pk).values(*unknown).first() or {})
+    for field in fields:
+        file = getattr(instance, field.attname)
+        old = previous.get(field.attname) or ""
+        if file.name == old:
+            continue
+        if old:
+            instance._replaced_files[field.attname] = old
+        if file.name and file._committed and file.name != field.default:
+            field.storage.retain(file.name)
+
+
+def release_replaced_files(sender, instance, **kwargs):
+    for field in get_tracked_fields(sender):
+        previous = getattr(instance, "_replaced_files", {}).get(field.attname)
+        if previous and previous != getattr(instance, field.attname).name:
+            release_on_commit(field, previous)
+    instance._stored_files = loaded_names(instance, get_tracked_fields(sender))
+
+
+def release_deleted_files(sender, instance, **kwargs):
+    for field in get_tracked_fields(sender):
+        release_on_commit(field, getattr(instance, field.attname).name)
+
+
+def connect_file_signals():
+    """Keeps the reference counts of every model field stored in a `ContentAddressedStorage`."""
+    for model in apps.get_models():
+        if get_tracked_fields(model):
+            post_init.connect(remember_loaded_files, sender=model)
+            pre_save.connect(remember_replaced_files, sender=model)
+            post_save.connect(release_replaced_files, sender=model)
+            post_delete.connect(release_deleted_files, sender=model)
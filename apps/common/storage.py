@@ -0,0 +1,76 @@
+import hashlib
+import os
+import posixpath
+import re
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from apps.common.models import StoredFile
+
+content_name_re = re.compile(r"(^|/)[0-9a-f]{2}/[0-9a-f]{64}(\.[\w]+)?$")
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that names files after the SHA-256 of their content,
+    `<upload_to>/<2 hex>/<sha256><ext>`. Uploading bytes that are already stored
+    only adds a reference, and `delete()` removes the file with its last
+    reference. A name never changes content, so its URL can be cached forever.
+
+    Only names with a `StoredFile` row are counted; files without one (older
+    media, names written by hand) are never removed by `delete()`.
+    """
+
+    @staticmethod
+    def hash_content(content):
+        digest = hashlib.sha256()
+        size = 0
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        content.seek(0)
+        return digest.hexdigest(), size
+
+    @staticmethod
+    def is_immutable(name):
+        return bool(content_name_re.search(name))
+
+    def content_name(self, name, digest):
+        directory, basename = posixpath.split(name.replace("\\", "/"))
+        extension = os.path.splitext(basename)[1].lower()
+        return posixpath.join(directory, digest[:2], f"{digest}{extension}")
+
+    def _save(self, name, content):
+        digest, size = self.hash_content(content)
+        name = self.content_name(name, digest)
+        with transaction.atomic():
+            stored, _ = StoredFile.objects.select_for_update().get_or_create(name=name, defaults={"size": size})
+            if not self.exists(name):
+                saved_name = super()._save(name, content)
+                if saved_name != name:
+                    # Another process stored the same bytes first; keep its copy.
+                    super().delete(saved_name)
+            StoredFile.objects.filter(pk=stored.pk).update(references=F("references") + 1)
+        return name
+
+    def retain(self, *names):
+        """Adds a reference to each of the stored `names`, e.g. assigned to one more row."""
+        for name, count in Counter(name for name in names if name).items():
+            StoredFile.objects.filter(name=name).update(references=F("references") + count)
+
+    def delete(self, name):
+        with transaction.atomic():
+            released = StoredFile.objects.filter(name=name, references__gt=0).update(
+                references=F("references") - 1
+            )
+            if not released:
+                # Not tracked: other rows may use the file without being counted.
+                return
+            removed, _ = StoredFile.objects.filter(name=name, references=0).delete()
+        if removed:
+            super().delete(name)
@@ -1,3 +1,99 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from apps.common.models import StoredFile
+from apps.common.storage import ContentAddressedStorage
+from apps.shop.models import Category, Product
+from apps.shop.tests import create_product
+
+
+def image_file(color, name):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffer, format="PNG")
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+class ContentAddressedStorageTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, THUMBNAIL_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.category = Category.objects.create(name="Shoes", image="category_images/shoes.jpg")
+
+    def references(self, name):
+        return StoredFile.objects.filter(name=name).values_list("references", flat=True).first()
+
+    def test_identical_uploads_share_one_file(self):
+        self.assertIsInstance(default_storage._wrapped, ContentAddressedStorage)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = create_product(category=self.category, image1=image_file("red", "a.PNG"))
+            second = create_product(category=self.category, image1=image_file("red", "b.png"))
+        name = first.image1.name
+        self.assertEqual(second.image1.name, name)
+        self.assertRegex(name, r"^product_images/[0-9a-f]{2}/[0-9a-f]{64}\.png$")
+        self.assertEqual(self.references(name), 2)
+        self.assertEqual(len(os.listdir(os.path.dirname(default_storage.path(name)))), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.hard_delete()
+        self.assertEqual(self.references(name), 1)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.image1 = image_file("blue", "c.png")
+            second.save()
+        self.assertIsNone(self.references(name))
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual(self.references(second.image1.name), 1)
+
+    def test_untracked_and_reassigned_names(self):
+        untracked = default_storage.save("product_images/legacy.jpg", ContentFile(b"legacy"))
+        StoredFile.objects.filter(name=untracked).delete()
+        product = create_product(category=self.category, image1=untracked)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.hard_delete()
+        self.assertTrue(default_storage.exists(untracked))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first = create_product(category=self.category, image1=image_file("red", "a.png"))
+        name = first.image1.name
+        with self.captureOnCommitCallbacks(execute=True):
+            second = create_product(category=self.category, image1=name)
+            second.image2 = first.image1
+            second.save()
+        self.assertEqual(self.references(name), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.hard_delete()
+            second.image2 = None
+            second.save()
+        self.assertEqual(self.references(name), 1)
+        self.assertTrue(default_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.unfiltered().get(pk=second.pk).hard_delete()
+        self.assertIsNone(self.references(name))
+        self.assertFalse(default_storage.exists(name))
+
+    def test_serve_media(self):
+        name = default_storage.save("product_images/a.txt", ContentFile(b"hello"))
+        response = self.client.get(f"/media/{name}")
+        self.assertEqual(b"".join(response.streaming_content), b"hello")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        with override_settings(MEDIA_SENDFILE_HEADER="X-Accel-Redirect"):
+            response = self.client.get(f"/media/{name}")
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{name}")
+        self.assertEqual(response.content, b"")
+
+        self.assertEqual(self.client.get("/media/../manage.py").status_code, 404)
+        self.assertEqual(self.client.get("/media/product_images/missing.jpg").status_code, 404)
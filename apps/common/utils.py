@@ -1,15 +1,64 @@
+import os
 import secrets
+import socket
+import time
+import zlib
 
-from apps.common.models import BaseModel
+from django.conf import settings
 
+# Crockford's base 32: no I, L, O or U, so codes survive being read out loud.
+BASE32_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+LEGACY_CODE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ123456789"
 
-def generate_unique_code(model: BaseModel, field: str) -> str:
-    allowed_chars = "ABCDEFGHIJKLMNOPQRSTUVWXYZ123456789"
-    unique_code = "".join(secrets.choice(allowed_chars) for _ in range(12))
-    similar_object_exists = model.objects.filter(**{field: unique_code}).exists()
-    if not similar_object_exists:
-        return unique_code
-    return generate_unique_code(model, field)
+_node_tag = (None, None)
+
+
+def encode_base32(number: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        number, index = divmod(number, 32)
+        chars.append(BASE32_ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+def get_node_tag() -> str:
+    """
+    Two base-32 characters naming this process, from `TX_REF_NODE` or a hash of
+    the host name and pid. Recomputed after a fork.
+    """
+    global _node_tag
+    pid = os.getpid()
+    if _node_tag[0] != pid:
+        node = getattr(settings, "TX_REF_NODE", None)
+        if node is None:
+            node = zlib.crc32(f"{socket.gethostname()}:{pid}".encode())
+        _node_tag = (pid, encode_base32(node % 1024, 2))
+    return _node_tag[1]
+
+
+def generate_random_code(length: int = 12, alphabet: str = LEGACY_CODE_ALPHABET) -> str:
+    return "".join(secrets.choice(alphabet) for _ in range(length))
+
+
+def generate_sortable_code() -> str:
+    """
+    24 characters: a millisecond timestamp (10), the node tag (2) and 60 random
+    bits (12). Codes sort by creation time and two of them only collide if the
+    same process draws the same 60 bits within one millisecond.
+    """
+    timestamp = encode_base32(time.time_ns() // 1_000_000, 10)
+    return timestamp + get_node_tag() + encode_base32(secrets.randbits(60), 12)
+
+
+def generate_tx_ref() -> str:
+    """
+    Transaction reference for a new order, in the `TX_REF_FORMAT` setting:
+    "sortable" (default) or "legacy" for the old 12 character random codes.
+    Neither looks the code up; the unique index catches the rare collision.
+    """
+    if getattr(settings, "TX_REF_FORMAT", "sortable") == "legacy":
+        return generate_random_code()
+    return generate_sortable_code()
 
 
 def set_dict_attr(obj, data):
@@ -1,3 +1,43 @@
-from django.shortcuts import render
+import mimetypes
 
-# Create your views here.
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+
+from apps.common.storage import ContentAddressedStorage
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+def serve_media(request, name):
+    """
+    Serves media files. With `MEDIA_SENDFILE_HEADER` set the body is left to the
+    front server (`X-Accel-Redirect` for nginx, `X-Sendfile` for Apache) and
+    Django only answers with headers; otherwise the file is streamed, which is
+    meant for development. Content-addressed names are cached as immutable.
+    """
+    try:
+        path = default_storage.path(name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not default_storage.exists(name):
+        raise Http404
+
+    header = getattr(settings, "MEDIA_SENDFILE_HEADER", None)
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if header == "X-Accel-Redirect":
+        response = HttpResponse(content_type=content_type)
+        response[header] = getattr(settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/") + name
+    elif header:
+        response = HttpResponse(content_type=content_type)
+        response[header] = path
+    else:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+
+    if ContentAddressedStorage.is_immutable(name):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=getattr(settings, "MEDIA_MAX_AGE", 60 * 60))
+    return response
@@ -0,0 +1,56 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from apps.common.utils import generate_random_code
+from apps.profiles.models import Order
+
+User = get_user_model()
+
+
+def lookup_tx_ref():
+    """The previous generator: a random code checked with a query until it is free."""
+    while True:
+        code = generate_random_code()
+        if not Order.objects.filter(tx_ref=code).exists():
+            return code
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares order inserts/sec, one transaction per insert as at checkout, for "
+        "the previous lookup-based tx_ref generator and the sortable and legacy "
+        "formats. The generated user and orders are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--existing", type=int, default=100000, help="Orders in the table before timing")
+        parser.add_argument("--inserts", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        user = User.objects.create(first_name="Bench", last_name="User", email="bench-tx-ref@example.com")
+        try:
+            Order.objects.bulk_create(
+                (Order(user=user, tx_ref=generate_random_code()) for _ in range(options["existing"])),
+                batch_size=2000,
+            )
+            self.run("lookup", user, options["inserts"], lookup=True)
+            for tx_ref_format in ("legacy", "sortable"):
+                with override_settings(TX_REF_FORMAT=tx_ref_format):
+                    self.run(tx_ref_format, user, options["inserts"])
+        finally:
+            user.delete()
+
+    def run(self, label, user, inserts, lookup=False):
+        started = time.perf_counter()
+        for _ in range(inserts):
+            with transaction.atomic():
+                if lookup:
+                    Order.objects.create(user=user, tx_ref=lookup_tx_ref())
+                else:
+                    Order.objects.create(user=user)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{label:>8}: {inserts / elapsed:,.0f} inserts/sec")
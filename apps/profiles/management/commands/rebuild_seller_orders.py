@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.profiles.models import Order, SellerOrder
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the per-seller order rows from the items of the existing orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        written = 0
+        with transaction.atomic():
+            SellerOrder.objects.all().delete()
+            order_ids = Order.objects.order_by("created_at", "id").values_list("id", flat=True)
+            batch = []
+            for order_id in order_ids.iterator(chunk_size=batch_size):
+                batch.append(order_id)
+                if len(batch) >= batch_size:
+                    written += SellerOrder.objects.project(batch)
+                    batch = []
+            if batch:
+                written += SellerOrder.objects.project(batch)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} seller orders"))
@@ -1,4 +1,4 @@
-# Generated by Django 6.0.1 on 2026-02-02 21:21
+# Generated by Django 5.2.18 on 2026-10-18 17:18
 
 import django.db.models.deletion
 import uuid
@@ -101,7 +101,7 @@ class Migration(migrations.Migration):
                         blank=True,
                         null=True,
                         on_delete=django.db.models.deletion.CASCADE,
-                        related_name="order_items",
+                        related_name="orderitems",
                         to="profiles.order",
                     ),
                 ),
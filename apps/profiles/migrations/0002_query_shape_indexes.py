@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0001_initial"),
+        ("shop", "0003_query_shape_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="order_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                condition=models.Q(("order__isnull", True)),
+                fields=["user", "created_at", "id"],
+                name="orderitem_open_cart_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderitem",
+            index=models.Index(
+                fields=["order", "created_at", "id"], name="orderitem_order_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:54
+
+from django.db import migrations, models
+
+
+def snapshot_existing_orders(apps, schema_editor):
+    """Existing orders get the current prices, the best that is left of the real ones."""
+    Order = apps.get_model("profiles", "Order")
+    OrderItem = apps.get_model("profiles", "OrderItem")
+    items = OrderItem.objects.filter(order__isnull=False).select_related("product")
+    subtotals = {}
+    batch = []
+    for item in items.iterator(chunk_size=2000):
+        item.unit_price = item.product.price_current
+        item.line_total = item.unit_price * item.quantity
+        subtotals[item.order_id] = subtotals.get(item.order_id, 0) + item.line_total
+        batch.append(item)
+        if len(batch) >= 2000:
+            OrderItem.objects.bulk_update(batch, ["unit_price", "line_total"])
+            batch = []
+    OrderItem.objects.bulk_update(batch, ["unit_price", "line_total"])
+    orders = [Order(id=order_id, subtotal=subtotal, total=subtotal) for order_id, subtotal in subtotals.items()]
+    Order.objects.bulk_update(orders, ["subtotal", "total"], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0002_query_shape_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="subtotal",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="total",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="line_total",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=12, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="unit_price",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+        migrations.RunPython(snapshot_existing_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_cart_lines(apps, schema_editor):
+    """Keeps the most recent open line per user and product."""
+    OrderItem = apps.get_model("profiles", "OrderItem")
+    seen = set()
+    duplicates = []
+    lines = OrderItem.objects.filter(order__isnull=True).order_by("-created_at")
+    for pk, user_id, product_id in lines.values_list("pk", "user_id", "product_id").iterator():
+        if (user_id, product_id) in seen:
+            duplicates.append(pk)
+        seen.add((user_id, product_id))
+    OrderItem.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0003_order_totals"),
+        ("shop", "0006_stock_reservations"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_cart_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="orderitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("order__isnull", True)),
+                fields=("user", "product"),
+                name="orderitem_open_cart_line_uniq",
+            ),
+        ),
+    ]
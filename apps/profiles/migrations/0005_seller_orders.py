@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:07
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("profiles", "0004_open_cart_line_unique"),
+        ("sellers", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SellerOrder",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("item_count", models.PositiveIntegerField()),
+                ("subtotal", models.DecimalField(decimal_places=2, max_digits=12)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "PENDING"),
+                            ("PACKING", "PACKING"),
+                            ("SHIPPING", "SHIPPING"),
+                            ("ARRIVING", "ARRIVING"),
+                            ("SUCCESS", "SUCCESS"),
+                        ],
+                        default="PENDING",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="seller_orders",
+                        to="profiles.order",
+                    ),
+                ),
+                (
+                    "seller",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="seller_orders",
+                        to="sellers.seller",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["seller", "created_at", "id"],
+                        name="seller_order_created_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("seller", "order"),
+                        name="seller_order_seller_order_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
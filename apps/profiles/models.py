@@ -1,10 +1,12 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
 from apps.common.models import BaseModel
 from django.contrib.auth import get_user_model
 
-from apps.profiles.manages import OrderItemManager
+from apps.profiles.manages import OrderItemManager, SellerOrderManager
+from apps.sellers.models import Seller
 from apps.shop.models import Product
-from apps.common.utils import generate_unique_code
+from apps.common.utils import generate_tx_ref
 
 User = get_user_model()
 
@@ -42,6 +44,9 @@ PAYMENT_STATUS_CHOICES = (
     ("FAILED", "FAILED"),
 )
 
+# Inserts tried with a fresh tx_ref before a collision is raised.
+TX_REF_ATTEMPTS = 5
+
 
 class Order(BaseModel):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
@@ -62,23 +67,32 @@ class Order(BaseModel):
     country = models.CharField(max_length=100, null=True)
     zipcode = models.CharField(max_length=6, null=True)
 
-    @property
-    def get_cart_subtotal(self):
-        orderitems = self.order_items.all()
-        total = sum([item.get_total for item in orderitems])
-        return total
+    # Filled once at checkout from the line totals of the items.
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
-    @property
-    def get_cart_total(self):
-        return self.get_cart_subtotal
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"], name="order_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.full_name}'s order"
 
     def save(self, *args, **kwargs):
-        if not self.created_at:
-            self.tx_ref = generate_unique_code(Order, "tx_ref")
-        return super().save(*args, **kwargs)
+        if not self._state.adding or self.tx_ref:
+            return super().save(*args, **kwargs)
+        # Not looked up first: a collision fails the insert on the unique index
+        # and is retried with a new tx_ref. The savepoint keeps the checkout
+        # transaction usable after a failed insert.
+        for attempt in range(TX_REF_ATTEMPTS):
+            self.tx_ref = generate_tx_ref()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if attempt == TX_REF_ATTEMPTS - 1:
+                    raise
 
 
 class OrderItem(BaseModel):
@@ -92,16 +106,64 @@ class OrderItem(BaseModel):
     )
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Price snapshot taken at checkout; empty while the item is in the cart.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
 
     objects = models.Manager()
     select = OrderItemManager()
 
     @property
     def get_total(self):
+        if self.line_total is not None:
+            return self.line_total
         return self.product.price_current * self.quantity
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "created_at", "id"],
+                condition=Q(order__isnull=True),
+                name="orderitem_open_cart_idx",
+            ),
+            models.Index(fields=["order", "created_at", "id"], name="orderitem_order_created_idx"),
+        ]
+        constraints = [
+            # One open cart line per product; the cart flush upserts against it.
+            models.UniqueConstraint(
+                fields=["user", "product"],
+                condition=Q(order__isnull=True),
+                name="orderitem_open_cart_line_uniq",
+            ),
+        ]
 
     def __str__(self):
         return self.product.name
+
+
+class SellerOrder(BaseModel):
+    """
+    The share of an order that belongs to one seller, written at checkout so a
+    seller's orders are a range scan on `(seller, created_at, id)` instead of a
+    join through the order items. `created_at` is the order's and `status`
+    follows its `delivery_status`.
+    """
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name="seller_orders")
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="seller_orders")
+    item_count = models.PositiveIntegerField()
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(max_length=20, default="PENDING", choices=DELIVERY_STATUS_CHOICES)
+
+    objects = SellerOrderManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["seller", "order"], name="seller_order_seller_order_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["seller", "created_at", "id"], name="seller_order_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.seller_id} share of {self.order_id}"
@@ -1,3 +1,97 @@
-from django.test import TestCase
+import re
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.profiles.models import Order, OrderItem, ShippingAddress
+from apps.shop.models import Product
+from apps.shop.tests import QueryPlanTestMixin, create_product, create_user
+
+
+class OrdersQueryPlanTestCase(QueryPlanTestMixin, TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(user=self.user, order=self.order, product=create_product())
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_order_endpoints_use_indexes(self):
+        self.assertUsesIndexes("/profile/orders/")
+        self.assertUsesIndexes(f"/profile/orers/{self.order.tx_ref}/")
+
+
+class OrderTotalsTestCase(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.shipping = ShippingAddress.objects.create(
+            user=self.user, full_name="Test User", email="buyer@example.com", phone="123",
+            address="addr", city="city", country="country", zipcode="123",
+        )
+        self.lamp = create_product(name="Lamp", price_current="10.50", is_stock=10)
+        self.desk = create_product(name="Desk", price_current="99.99", is_stock=10)
+
+    def checkout(self, *items):
+        for product, quantity in items:
+            self.client.post("/shop/cart/", {"slug": product.slug, "quantity": quantity}, format="json")
+        response = self.client.post("/shop/checkout/", {"shipping_id": str(self.shipping.id)}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_totals_are_snapshotted_at_checkout(self):
+        response = self.checkout((self.lamp, 3), (self.desk, 1))
+        self.assertEqual(response.data["item"]["subtotal"], "131.49")
+        self.assertEqual(response.data["item"]["total"], "131.49")
+        self.assertEqual(
+            sorted(OrderItem.objects.values_list("unit_price", "line_total")),
+            [(Decimal("10.50"), Decimal("31.50")), (Decimal("99.99"), Decimal("99.99"))],
+        )
+
+        Product.objects.filter(pk=self.lamp.pk).update(price_current=1)
+        orders = self.client.get("/profile/orders/").data["results"]
+        self.assertEqual(orders[0]["total"], "131.49")
+
+    def test_order_list_has_no_per_order_queries(self):
+        self.checkout((self.lamp, 1))
+        with CaptureQueriesContext(connection) as single:
+            self.client.get("/profile/orders/")
+        for _ in range(3):
+            self.checkout((self.lamp, 1), (self.desk, 2))
+        with CaptureQueriesContext(connection) as several:
+            response = self.client.get("/profile/orders/")
+        self.assertEqual(len(response.data["results"]), 4)
+        self.assertEqual(len(several), len(single))
+
+
+class TxRefTestCase(TestCase):
+    def setUp(self):
+        self.user = create_user()
+
+    def test_orders_are_inserted_without_lookups(self):
+        with CaptureQueriesContext(connection) as queries:
+            order = Order.objects.create(user=self.user)
+        self.assertFalse([query for query in queries if query["sql"].startswith("SELECT")])
+        self.assertRegex(order.tx_ref, r"^[0-9A-HJKMNP-TV-Z]{24}$")
+
+    def test_sortable_refs_follow_creation_order(self):
+        refs = [Order.objects.create(user=self.user).tx_ref for _ in range(3)]
+        self.assertEqual(len(set(refs)), 3)
+        self.assertEqual(sorted(ref[:10] for ref in refs), [ref[:10] for ref in refs])
+
+    @override_settings(TX_REF_FORMAT="legacy")
+    def test_legacy_format(self):
+        tx_ref = Order.objects.create(user=self.user).tx_ref
+        self.assertTrue(re.fullmatch(r"[A-Z1-9]{12}", tx_ref))
+
+    def test_collision_is_retried(self):
+        taken = Order.objects.create(user=self.user).tx_ref
+        with mock.patch("apps.profiles.models.generate_tx_ref", side_effect=[taken, "FRESH"]):
+            order = Order.objects.create(user=self.user)
+        self.assertEqual(order.tx_ref, "FRESH")
+        self.assertEqual(Order.objects.count(), 2)
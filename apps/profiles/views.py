@@ -3,10 +3,12 @@ from rest_framework.exceptions import NotFound
 from rest_framework.generics import RetrieveUpdateDestroyAPIView, ListCreateAPIView, ListAPIView
 from rest_framework.response import Response
 
+from apps.common.mixins import ValuesListMixin
+from apps.common.pagination import KeysetPagination
 from apps.common.permissions import IsOwner
 from apps.profiles.models import ShippingAddress, Order, OrderItem
 from apps.profiles.serializers import ProfileSerializer, ShippingAddressSerializer
-from apps.shop.serializers import OrderSerializer, CheckItemOrderSerializer
+from apps.shop.serializers import OrderSerializer, CheckItemOrderSerializer, OrderValuesSerializer
 
 tags = ["Profiles"]
 
@@ -120,15 +122,16 @@ class ShippingAddressViewID(RetrieveUpdateDestroyAPIView):
         super().delete(request, *args, **kwargs)
 
 
-class OrdersView(ListAPIView):
+class OrdersView(ValuesListMixin, ListAPIView):
     serializer_class = OrderSerializer
+    values_serializer_class = OrderValuesSerializer
     permission_classes = [IsOwner]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return (Order.objects
+                .filter(user=self.request.user)
                 .select_related('user')
-                .prefetch_related('orderitems', 'orderitems__product')
-                .order_by('-created_at')
                 )
 
     @extend_schema(
@@ -144,6 +147,7 @@ class OrdersView(ListAPIView):
 class OrderItemsView(ListAPIView):
     serializer_class = CheckItemOrderSerializer
     permission_classes = [IsOwner]
+    pagination_class = KeysetPagination
 
     def get_order(self):
         order = Order.objects.get_or_none(tx_ref=self.kwargs['tx_ref'])
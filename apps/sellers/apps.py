@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 
 class SellersConfig(AppConfig):
-    name = 'apps.sellers'
\ No newline at end of file
+    name = 'apps.sellers'
+
+    def ready(self):
+        from apps.sellers import signals  # noqa: F401
@@ -0,0 +1,30 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from apps.profiles.models import Order
+from apps.sellers.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recomputes the daily seller sales rollups of a date window (all history by default) from the orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First day, YYYY-MM-DD")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last day, YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+        if start is None or end is None:
+            bounds = Order.objects.aggregate(first=Min("created_at"), last=Max("created_at"))
+            if bounds["first"] is None:
+                self.stdout.write("There are no orders")
+                return
+            start = start or timezone.localdate(bounds["first"])
+            end = end or timezone.localdate(bounds["last"])
+        if start > end:
+            raise CommandError("--start must not be after --end")
+        written = rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup rows from {start} to {end}"))
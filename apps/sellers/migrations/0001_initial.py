@@ -1,4 +1,4 @@
-# Generated by Django 6.0.1 on 2026-02-02 21:21
+# Generated by Django 5.2.18 on 2026-10-18 17:18
 
 import autoslug.fields
 import django.db.models.deletion
@@ -29,3 +29,24 @@ class Seller(BaseModel):
 
     def __str__(self):
         return f"Seller for {self.business_name}"
+
+
+class ProductSalesDay(BaseModel):
+    """
+    Sales of one product on one day, kept current by `apps.sellers.rollups` as
+    orders are placed and change status. Orders whose payment was cancelled or
+    failed are not counted.
+    """
+    seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name="sales_days")
+    product = models.ForeignKey("shop.Product", on_delete=models.CASCADE, related_name="sales_days")
+    day = models.DateField()
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    delivered_units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["seller", "day", "product"], name="product_sales_day_uniq"),
+        ]
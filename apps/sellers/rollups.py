@@ -0,0 +1,148 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate, TruncWeek
+from django.utils import timezone
+
+from apps.profiles.models import OrderItem
+from apps.sellers.models import ProductSalesDay
+from apps.shop.models import Product
+
+METRICS = ("orders", "units", "revenue", "paid_revenue", "delivered_units")
+UNCOUNTED_PAYMENT_STATUSES = ("CANCELLED", "FAILED")
+
+
+def order_weights(payment_status, delivery_status):
+    counted = payment_status not in UNCOUNTED_PAYMENT_STATUSES
+    return {
+        "counted": counted,
+        "paid": payment_status == "SUCCESSFUL",
+        "delivered": counted and delivery_status == "SUCCESS",
+    }
+
+
+def contribution(group, weights):
+    return {
+        "orders": 1 if weights["counted"] else 0,
+        "units": group["units"] if weights["counted"] else 0,
+        "revenue": group["revenue"] if weights["counted"] else 0,
+        "paid_revenue": group["revenue"] if weights["paid"] else 0,
+        "delivered_units": group["units"] if weights["delivered"] else 0,
+    }
+
+
+def record_order(order, previous=None):
+    """
+    Adds a newly placed order to the daily rollups or, given its `previous`
+    `(payment_status, delivery_status)`, applies the change of its status.
+    """
+    weights = order_weights(order.payment_status, order.delivery_status)
+    old_weights = order_weights(*previous) if previous is not None else None
+    if weights == old_weights:
+        return
+    groups = (OrderItem.objects
+              .filter(order=order, product__seller__isnull=False)
+              .order_by()
+              .values("product_id", "product__seller_id")
+              .annotate(units=Sum("quantity"), revenue=Coalesce(Sum("line_total"), Value(0), output_field=DecimalField())))
+    day = timezone.localdate(order.created_at)
+    for group in groups:
+        new = contribution(group, weights)
+        old = contribution(group, old_weights) if old_weights else dict.fromkeys(METRICS, 0)
+        add(group["product__seller_id"], group["product_id"], day, {name: new[name] - old[name] for name in METRICS})
+
+
+def add(seller_id, product_id, day, delta):
+    changes = {name: F(name) + value for name, value in delta.items() if value}
+    if not changes:
+        return
+    rows = ProductSalesDay.objects.filter(seller_id=seller_id, product_id=product_id, day=day)
+    if rows.update(**changes, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            ProductSalesDay.objects.create(
+                seller_id=seller_id, product_id=product_id, day=day,
+                **{name: max(value, 0) for name, value in delta.items()},
+            )
+    except IntegrityError:
+        # Created by a concurrent order in the meantime.
+        rows.update(**changes, updated_at=timezone.now())
+
+
+def rebuild(start, end):
+    """Recomputes the rollups of the days from `start` to `end` from the order items."""
+    counted = ~Q(order__payment_status__in=UNCOUNTED_PAYMENT_STATUSES)
+    money = DecimalField(max_digits=14, decimal_places=2)
+    groups = (OrderItem.objects
+              .filter(order__isnull=False, product__seller__isnull=False)
+              .annotate(day=TruncDate("order__created_at"))
+              .filter(day__range=(start, end))
+              .order_by()
+              .values("product__seller_id", "product_id", "day")
+              .annotate(
+                  orders=Count("order_id", distinct=True, filter=counted),
+                  units=Coalesce(Sum("quantity", filter=counted), 0),
+                  revenue=Coalesce(Sum("line_total", filter=counted), Value(0), output_field=money),
+                  paid_revenue=Coalesce(
+                      Sum("line_total", filter=Q(order__payment_status="SUCCESSFUL")), Value(0), output_field=money
+                  ),
+                  delivered_units=Coalesce(Sum("quantity", filter=counted & Q(order__delivery_status="SUCCESS")), 0),
+              ))
+    with transaction.atomic():
+        ProductSalesDay.objects.filter(day__range=(start, end)).delete()
+        rows = ProductSalesDay.objects.bulk_create(
+            (
+                ProductSalesDay(
+                    seller_id=group["product__seller_id"],
+                    product_id=group["product_id"],
+                    day=group["day"],
+                    **{name: group[name] for name in METRICS},
+                )
+                for group in groups.iterator(chunk_size=2000)
+                if any(group[name] for name in METRICS)
+            ),
+            batch_size=2000,
+        )
+    return len(rows)
+
+
+def default_window():
+    end = timezone.localdate()
+    return end - timedelta(days=29), end
+
+
+def sales_report(seller, start, end, interval="day", product=None):
+    """
+    Sums the rollups of `seller` per product and day or week (weeks start on
+    Monday) between `start` and `end`, without reading orders.
+    """
+    rows = ProductSalesDay.objects.filter(seller=seller, day__range=(start, end))
+    if product is not None:
+        rows = rows.filter(product=product)
+    period = TruncWeek("day") if interval == "week" else F("day")
+    rows = list(
+        rows.annotate(period=period)
+        .order_by("period", "product_id")
+        .values("period", "product_id")
+        .annotate(**{name: Sum(name) for name in METRICS})
+    )
+    products = {
+        product_id: {"slug": slug, "name": name}
+        for product_id, slug, name in Product.objects.unfiltered()
+        .filter(pk__in={row["product_id"] for row in rows})
+        .values_list("id", "slug", "name")
+    }
+    totals = dict.fromkeys(METRICS, 0)
+    results = []
+    for row in rows:
+        for name in METRICS:
+            totals[name] += row[name]
+        results.append({
+            "period": row["period"],
+            "product": products.get(row["product_id"]),
+            **{name: row[name] for name in METRICS},
+        })
+    # `orders` of the totals counts an order once per product it contains.
+    return {"start": start, "end": end, "interval": interval, "totals": totals, "results": results}
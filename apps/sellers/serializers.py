@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from apps.sellers.models import Seller
+from apps.sellers.rollups import default_window
 
 
 class SellerSerializer(serializers.ModelSerializer):
@@ -14,3 +15,64 @@ class SellerSerializer(serializers.ModelSerializer):
                 'allow_null': True,
             }
         }
+
+
+class ProductImportFileSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=('csv', 'jsonl'), required=False)
+
+
+class ProductImportErrorSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    errors = serializers.DictField()
+
+
+class ProductImportReportSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    error_count = serializers.IntegerField()
+    errors = ProductImportErrorSerializer(many=True)
+
+
+class SalesQuerySerializer(serializers.Serializer):
+    max_days = 366
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=('day', 'week'), default='day')
+    product = serializers.SlugField(required=False)
+
+    def validate(self, attrs):
+        start, end = default_window()
+        attrs.setdefault('end', end)
+        attrs.setdefault('start', attrs['end'] - (end - start))
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': "Must not be after end"})
+        if (attrs['end'] - attrs['start']).days >= self.max_days:
+            raise serializers.ValidationError({'start': f"The window is limited to {self.max_days} days"})
+        return attrs
+
+
+class SalesProductSerializer(serializers.Serializer):
+    slug = serializers.SlugField()
+    name = serializers.CharField()
+
+
+class SalesFiguresSerializer(serializers.Serializer):
+    orders = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    paid_revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    delivered_units = serializers.IntegerField()
+
+
+class SalesRowSerializer(SalesFiguresSerializer):
+    period = serializers.DateField()
+    product = SalesProductSerializer(allow_null=True)
+
+
+class SalesReportSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    interval = serializers.CharField()
+    totals = SalesFiguresSerializer()
+    results = SalesRowSerializer(many=True)
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.profiles.models import Order, SellerOrder
+from apps.sellers.rollups import record_order
+
+STATUS_FIELDS = {"payment_status", "delivery_status"}
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, update_fields=None, **kwargs):
+    instance._previous_status = None
+    if instance._state.adding or (update_fields is not None and not STATUS_FIELDS.intersection(update_fields)):
+        return
+    instance._previous_status = (
+        Order.objects.filter(pk=instance.pk).values_list("payment_status", "delivery_status").first()
+    )
+
+
+@receiver(post_save, sender=Order)
+def update_sales_rollups(sender, instance, created, **kwargs):
+    # New orders have no items yet; checkout records them once they do.
+    previous = getattr(instance, "_previous_status", None)
+    if not created and previous is not None:
+        record_order(instance, previous)
+
+
+@receiver(post_save, sender=Order)
+def sync_seller_order_status(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_status", None)
+    if not created and previous is not None and previous[1] != instance.delivery_status:
+        SellerOrder.objects.filter(order=instance).update(status=instance.delivery_status, updated_at=timezone.now())
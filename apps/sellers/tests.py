@@ -1,3 +1,278 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import urlencode
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.common.models import StoredFile
+from apps.profiles.models import Order, SellerOrder, ShippingAddress
+from apps.sellers.models import ProductSalesDay
+
+from apps.shop.exporters import ProductExporter
+from apps.shop.models import Category, Product
+from apps.shop.search import search_products
+from apps.shop.tests import QueryPlanTestMixin, create_product, create_seller, create_user
+
+CSV = b"""name,desc,price_current,category_slug,is_stock,image1
+Red shoe,Leather,10.50,shoes,3,product_images/red.jpg
+Broken,No price,,shoes,1,product_images/x.jpg
+Blue shoe,Suede,12,hats,1,product_images/blue.jpg
+Green shoe,Canvas,7,shoes,,product_images/green.jpg
+"""
+
+JSONL = b"""{"name": "Boot", "desc": "Winter", "price_current": "99.90", "category_slug": "shoes", "image1": "product_images/boot.jpg"}
+not json
+
+{"name": "Sandal", "desc": "Summer", "price_current": "-", "category_slug": "shoes", "image1": "product_images/s.jpg"}
+"""
+
+
+class ProductImportTestCase(TestCase):
+    def setUp(self):
+        self.user = create_user("seller@example.com", account_type="SELLER")
+        self.seller = create_seller(self.user)
+        Category.objects.create(name="Shoes", image="category_images/shoes.jpg")
+        StoredFile.objects.bulk_create(
+            StoredFile(name=f"product_images/{name}.jpg", size=3, references=1)
+            for name in ("red", "x", "blue", "green", "boot", "s")
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **data):
+        return self.client.post(
+            "/sellers/products/import/",
+            {"file": SimpleUploadedFile(name, content), **data},
+            format="multipart",
+        )
+
+    def test_csv_import_reports_row_errors(self):
+        response = self.upload("catalog.csv", CSV)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["error_count"], 2)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+        self.assertIn("price_current", response.data["errors"][0]["errors"])
+        self.assertIn("category_slug", response.data["errors"][1]["errors"])
+
+        products = Product.objects.filter(seller=self.seller).order_by("name")
+        self.assertEqual([product.slug for product in products], ["green-shoe", "red-shoe"])
+        self.assertEqual(products[0].is_stock, 5)
+        self.assertEqual(StoredFile.objects.get(name="product_images/red.jpg").references, 2)
+        self.assertEqual(search_products(Product.objects.all(), "leather"), [products[1]])
+
+    def test_jsonl_import(self):
+        response = self.upload("catalog.txt", JSONL, format="jsonl")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+
+    def test_rejects_unknown_and_unsafe_images(self):
+        rows = [
+            {"name": "Boot", "desc": "Winter", "price_current": "9", "category_slug": "shoes", "image1": image}
+            for image in ("product_images/boot.jpg", "../../../etc/passwd", "/etc/passwd", "no/such/file.png")
+        ]
+        content = "\n".join(json.dumps(row) for row in rows).encode()
+        response = self.upload("catalog.jsonl", content)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(sorted(error["row"] for error in response.data["errors"]), [2, 3, 4])
+        self.assertTrue(all("image1" in error["errors"] for error in response.data["errors"]))
+        self.assertEqual(list(Product.objects.values_list("image1", flat=True)), ["product_images/boot.jpg"])
+
+    def test_unknown_format(self):
+        response = self.upload("catalog.txt", JSONL)
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        stdout = io.StringIO()
+        with tempfile.NamedTemporaryFile(suffix=".csv") as file:
+            file.write(CSV)
+            file.flush()
+            call_command("import_products", file.name, seller=self.seller.slug, stdout=stdout, stderr=io.StringIO())
+        self.assertIn("Imported 2 products, 2 rows failed", stdout.getvalue())
+
+
+class ProductExportTestCase(TestCase):
+    def setUp(self):
+        self.user = create_user("seller@example.com", account_type="SELLER")
+        self.seller = create_seller(self.user)
+        self.products = [create_product(seller=self.seller, name=f"Product {i}") for i in range(5)]
+        create_product(name="Other seller")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, query=""):
+        with mock.patch.object(ProductExporter, "chunk_size", 2):
+            response = self.client.get(f"/sellers/products/export/?{query}")
+            self.assertEqual(response.status_code, 200)
+            return response, b"".join(response.streaming_content)
+
+    def test_csv(self):
+        response, content = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual([row["slug"] for row in rows], [product.slug for product in self.products])
+        self.assertEqual(rows[0]["seller_slug"], self.seller.slug)
+        self.assertEqual(rows[0]["category_slug"], "category")
+        self.assertEqual(rows[0]["price_old"], "")
+
+    def test_gzip_jsonl_resumes_after_cursor(self):
+        response, content = self.export("file_format=jsonl&gzip=true")
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        rows = [json.loads(line) for line in gzip.decompress(content).decode().splitlines()]
+        self.assertEqual(len(rows), 5)
+
+        last = rows[1]
+        query = urlencode({"file_format": "jsonl", "since": last["updated_at"], "after": last["id"]})
+        _, content = self.export(query)
+        resumed = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(resumed, rows[2:])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/sellers/products/export/?since=yesterday")
+        self.assertEqual(response.status_code, 400)
+
+    def test_staff_export_requires_admin(self):
+        self.assertEqual(self.client.get("/shop/products/export/").status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get("/shop/products/export/?file_format=jsonl")
+        self.assertEqual(len(b"".join(response.streaming_content).splitlines()), 6)
+
+
+class SellerOrdersTestCase(QueryPlanTestMixin, TestCase):
+    def setUp(self):
+        self.buyer = create_user()
+        self.seller = create_seller(create_user("seller@example.com", account_type="SELLER"))
+        other = create_seller(create_user("other@example.com", account_type="SELLER"))
+        self.lamp = create_product(name="Lamp", seller=self.seller, price_current="10.00", is_stock=10)
+        self.bulb = create_product(name="Bulb", seller=self.seller, price_current="2.50", is_stock=10)
+        self.desk = create_product(name="Desk", seller=other, price_current="99.00", is_stock=10)
+        shipping = ShippingAddress.objects.create(
+            user=self.buyer, full_name="Test User", email="buyer@example.com", phone="123",
+            address="addr", city="city", country="country", zipcode="123",
+        )
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        client.post(
+            "/shop/cart/batch/",
+            {"items": [{"slug": "lamp", "quantity": 1}, {"slug": "bulb", "quantity": 4}, {"slug": "desk", "quantity": 1}]},
+            format="json",
+        )
+        response = client.post("/shop/checkout/", {"shipping_id": str(shipping.id)}, format="json")
+        self.tx_ref = response.data["item"]["tx_ref"]
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller.user)
+
+    def test_checkout_writes_seller_shares(self):
+        self.assertEqual(
+            sorted(SellerOrder.objects.values_list("seller__business_name", "item_count", "subtotal")),
+            [("other@example.com store", 1, Decimal("99.00")), ("seller@example.com store", 2, Decimal("20.00"))],
+        )
+        orders = self.client.get("/sellers/orders/").data["results"]
+        self.assertEqual(len(orders), 1)
+        self.assertEqual(orders[0]["tx_ref"], self.tx_ref)
+        self.assertEqual((orders[0]["item_count"], orders[0]["subtotal"], orders[0]["total"]), (2, "20.00", "119.00"))
+        self.assertEqual(orders[0]["shipping_details"]["full_name"], "Test User")
+
+        order = Order.objects.get()
+        order.delivery_status = "SUCCESS"
+        order.save()
+        self.assertEqual(set(SellerOrder.objects.values_list("status", flat=True)), {"SUCCESS"})
+
+    def test_order_items_are_limited_to_the_seller(self):
+        items = self.client.get(f"/sellers/orders/{self.tx_ref}/").data["results"]
+        self.assertEqual(sorted(item["product"]["name"] for item in items), ["Bulb", "Lamp"])
+        self.assertEqual(self.client.get("/sellers/orders/UNKNOWN/").status_code, 404)
+
+    def test_seller_order_endpoints_use_indexes(self):
+        self.assertUsesIndexes("/sellers/orders/")
+        self.assertUsesIndexes(f"/sellers/orders/{self.tx_ref}/")
+
+    def test_rebuild_matches_checkout(self):
+        expected = sorted(SellerOrder.objects.values_list("seller_id", "order_id", "item_count", "subtotal", "created_at"))
+        SellerOrder.objects.all().delete()
+        call_command("rebuild_seller_orders", "--batch-size", "1", stdout=io.StringIO())
+        rebuilt = sorted(SellerOrder.objects.values_list("seller_id", "order_id", "item_count", "subtotal", "created_at"))
+        self.assertEqual(rebuilt, expected)
+        self.assertEqual(rebuilt[0][-1], Order.objects.get().created_at)
+
+
+class SellerAnalyticsTestCase(TestCase):
+    def setUp(self):
+        self.seller = create_seller(create_user("seller@example.com", account_type="SELLER"))
+        self.lamp = create_product(name="Lamp", seller=self.seller, price_current="10.00", is_stock=100)
+        self.bulb = create_product(name="Bulb", seller=self.seller, price_current="2.50", is_stock=100)
+        self.orders = [self.place("one@example.com", lamp=2, bulb=4), self.place("two@example.com", lamp=1)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller.user)
+
+    def place(self, email, **quantities):
+        buyer = create_user(email)
+        shipping = ShippingAddress.objects.create(
+            user=buyer, full_name="Test User", email=email, phone="123",
+            address="addr", city="city", country="country", zipcode="123",
+        )
+        client = APIClient()
+        client.force_authenticate(buyer)
+        items = [{"slug": slug, "quantity": quantity} for slug, quantity in quantities.items()]
+        client.post("/shop/cart/batch/", {"items": items}, format="json")
+        response = client.post("/shop/checkout/", {"shipping_id": str(shipping.id)}, format="json")
+        return Order.objects.get(tx_ref=response.data["item"]["tx_ref"])
+
+    def figures(self):
+        return {
+            name: (orders, units, str(revenue), str(paid_revenue), delivered_units)
+            for name, orders, units, revenue, paid_revenue, delivered_units in ProductSalesDay.objects.values_list(
+                "product__name", "orders", "units", "revenue", "paid_revenue", "delivered_units"
+            )
+        }
+
+    def test_checkout_and_status_changes_update_rollups(self):
+        self.assertEqual(self.figures(), {"Lamp": (2, 3, "30.00", "0.00", 0), "Bulb": (1, 4, "10.00", "0.00", 0)})
+
+        order = self.orders[0]
+        order.payment_status = "SUCCESSFUL"
+        order.delivery_status = "SUCCESS"
+        order.save()
+        self.assertEqual(self.figures(), {"Lamp": (2, 3, "30.00", "20.00", 2), "Bulb": (1, 4, "10.00", "10.00", 4)})
+
+        order.payment_status = "CANCELLED"
+        order.save(update_fields=["payment_status"])
+        self.assertEqual(self.figures(), {"Lamp": (1, 1, "10.00", "0.00", 0), "Bulb": (0, 0, "0.00", "0.00", 0)})
+
+    def test_rebuild_matches_incremental_rollups(self):
+        self.orders[1].payment_status = "SUCCESSFUL"
+        self.orders[1].save()
+        expected = self.figures()
+        ProductSalesDay.objects.all().delete()
+        call_command("rebuild_sales_rollups", stdout=io.StringIO())
+        self.assertEqual(self.figures(), expected)
+
+    def test_report_reads_only_rollups(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/sellers/analytics/?interval=week")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if "profiles_order" in query["sql"]])
+        self.assertEqual(response.data["totals"]["revenue"], "40.00")
+        self.assertEqual(response.data["totals"]["units"], 7)
+        self.assertEqual(
+            sorted((row["product"]["slug"], row["units"]) for row in response.data["results"]),
+            [("bulb", 4), ("lamp", 3)],
+        )
 
-# Create your tests here.
+        response = self.client.get("/sellers/analytics/", {"product": "lamp", "start": "2000-01-01", "end": "2000-01-31"})
+        self.assertEqual(response.data["results"], [])
+        self.assertEqual(self.client.get("/sellers/analytics/?start=2000-01-01&end=2010-01-01").status_code, 400)
+        self.assertEqual(self.client.get("/sellers/analytics/?product=nope").status_code, 404)
@@ -1,11 +1,15 @@
 from django.urls import path
 
-from apps.sellers.views import SellerProductsView, SellersView, SellerOrdersView, SellerOrderItemsView
+from apps.sellers.views import SellerProductsView, SellersView, SellerOrdersView, SellerOrderItemsView, \
+    SellerProductsImportView, SellerProductsExportView, SellerAnalyticsView
 
 urlpatterns = [
     path("", SellersView.as_view()),
     path("products/", SellerProductsView.as_view()),
+    path("products/import/", SellerProductsImportView.as_view()),
+    path("products/export/", SellerProductsExportView.as_view()),
     path("products/<slug:slug>/", SellerProductsView.as_view()),
     path('orders/', SellerOrdersView.as_view()),
-    path('orders/<str:tx_ref>/', SellerOrderItemsView.as_view())
+    path('orders/<str:tx_ref>/', SellerOrderItemsView.as_view()),
+    path('analytics/', SellerAnalyticsView.as_view()),
 ]
@@ -1,16 +1,25 @@
 # Create your views here.
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema
-from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.generics import GenericAPIView, CreateAPIView, ListCreateAPIView, ListAPIView
 from rest_framework.mixins import UpdateModelMixin, DestroyModelMixin
 from rest_framework.response import Response
 
+from apps.common.mixins import SPARSE_FIELDSET_PARAMETERS, SparseFieldsetMixin, ValuesListMixin
+from apps.common.pagination import KeysetPagination
 from apps.common.permissions import IsSeller
-from apps.profiles.models import Order, OrderItem
+from apps.profiles.models import OrderItem, SellerOrder
 from apps.sellers.models import Seller
-from apps.sellers.serializers import SellerSerializer
+from apps.sellers.rollups import sales_report
+from apps.sellers.serializers import SellerSerializer, ProductImportFileSerializer, ProductImportReportSerializer, \
+    SalesQuerySerializer, SalesReportSerializer
+from apps.shop.importers import ProductImporter, detect_format
 from apps.shop.models import Category, Product
-from apps.shop.serializers import ProductSerializer, CreateProductSerializer, OrderSerializer, CheckItemOrderSerializer
+from apps.shop.pagination import ProductPagination
+from apps.shop.serializers import ProductSerializer, CreateProductSerializer, CheckItemOrderSerializer, \
+    ProductValuesSerializer, SellerOrderSerializer, SellerOrderValuesSerializer
+from apps.shop.views import EXPORT_PARAMETERS, ProductsExportView
 
 tags = ["Sellers"]
 
@@ -35,18 +44,20 @@ class SellersView(CreateAPIView):
         return Response(data=serializer.data, status=201)
 
 
-class SellerProductsView(ListCreateAPIView):
+class SellerProductsView(SparseFieldsetMixin, ValuesListMixin, ListCreateAPIView):
     serializer_class = ProductSerializer
+    values_serializer_class = ProductValuesSerializer
     permission_classes = [IsSeller]
+    pagination_class = ProductPagination
 
     def get_seller(self):
         seller = Seller.objects.get_or_none(user=self.request.user, is_approved=True)
         if not seller:
-            return NotFound(detail={"message": "Access is denied"})
+            raise NotFound(detail={"message": "Access is denied"})
         return seller
 
     def get_queryset(self):
-        return Product.objects.filter(seller=self.get_object())
+        return Product.objects.filter(seller=self.get_seller())
 
     def get_category(self, category_slug):
         category = Category.objects.get_or_none(slug=category_slug)
@@ -63,6 +74,7 @@ class SellerProductsView(ListCreateAPIView):
             Products can be filtered by name, sizes or colors.
         """,
         tags=tags,
+        parameters=SPARSE_FIELDSET_PARAMETERS,
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
@@ -88,6 +100,63 @@ class SellerProductsView(ListCreateAPIView):
         return Response(serializer.data, status=201)
 
 
+class SellerProductsImportView(GenericAPIView):
+    serializer_class = ProductImportFileSerializer
+    permission_classes = [IsSeller]
+
+    def get_seller(self):
+        seller = Seller.objects.get_or_none(user=self.request.user, is_approved=True)
+        if not seller:
+            raise NotFound(detail={"message": "Access is denied"})
+        return seller
+
+    @extend_schema(
+        summary="Bulk import products",
+        description="""
+            This endpoint imports products from an uploaded CSV or JSON Lines file.
+            Columns match product creation, with category_slug and image paths in storage.
+            Invalid rows are reported and skipped, the valid ones are created.
+        """,
+        tags=tags,
+        request={"multipart/form-data": ProductImportFileSerializer},
+        responses=ProductImportReportSerializer,
+    )
+    def post(self, request, *args, **kwargs):
+        seller = self.get_seller()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        file = serializer.validated_data["file"]
+        file_format = serializer.validated_data.get("format") or detect_format(file.name)
+        if file_format is None:
+            raise ValidationError({"format": "Cannot detect the file format, pass csv or jsonl"})
+        report = ProductImporter(seller).import_file(file, file_format)
+        return Response(data=report.as_dict(), status=201 if report.created else 200)
+
+
+class SellerProductsExportView(ProductsExportView):
+    permission_classes = [IsSeller]
+
+    def get_queryset(self):
+        seller = Seller.objects.get_or_none(user=self.request.user, is_approved=True)
+        if not seller:
+            raise NotFound(detail={"message": "Access is denied"})
+        return Product.objects.filter(seller=seller)
+
+    @extend_schema(
+        operation_id="seller_products_export",
+        summary="Seller Products Export",
+        description="""
+            This endpoint streams the seller catalog ordered by updated_at and id as CSV or JSON Lines.
+            Pass the updated_at and id of the last received row as since and after to resume.
+        """,
+        tags=tags,
+        parameters=EXPORT_PARAMETERS,
+        responses={(200, "text/csv"): OpenApiTypes.BINARY},
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
 class SellerProductView(UpdateModelMixin, DestroyModelMixin, GenericAPIView):
     serializer_class = CreateProductSerializer
     permission_classes = [IsSeller]
@@ -114,23 +183,19 @@ class SellerProductView(UpdateModelMixin, DestroyModelMixin, GenericAPIView):
         return super().destroy(request, *args, **kwargs)
 
 
-class SellerOrdersView(ListAPIView):
-    serializer_class = OrderSerializer
+class SellerOrdersView(ValuesListMixin, ListAPIView):
+    serializer_class = SellerOrderSerializer
+    values_serializer_class = SellerOrderValuesSerializer
     permission_classes = [IsSeller]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        seller = self.request.user.seller
-        orders = (Order.objects
-                  .filter(orderitems__product__seller=seller)
-                  .distinct()
-                  .order_by('-created_at')
-                  )
-        return orders
+        return SellerOrder.objects.filter(seller=self.request.user.seller).select_related('order__user')
 
     @extend_schema(
         operation_id="seller_orders_view",
         summary="Seller Orders Fetch",
-        description='This endpoint returns all orders for a particular seller.',
+        description='This endpoint returns all orders for a particular seller, with the seller share of each.',
         tags=tags
     )
     def get(self, request, *args, **kwargs):
@@ -140,17 +205,19 @@ class SellerOrdersView(ListAPIView):
 class SellerOrderItemsView(ListAPIView):
     serializer_class = CheckItemOrderSerializer
     permission_classes = [IsSeller]
+    pagination_class = KeysetPagination
 
-    def get_order(self):
-        order = Order.objects.get_or_none(tx_ref=self.kwargs['tx_ref'])
-        if not order:
-            return Response(data={"message": "Order does not exist!"}, status=404)
-        return order
+    def get_seller_order(self):
+        seller_order = SellerOrder.objects.get_or_none(
+            seller=self.request.user.seller, order__tx_ref=self.kwargs['tx_ref']
+        )
+        if not seller_order:
+            raise NotFound(detail={"message": "Order does not exist!"})
+        return seller_order
 
     def get_queryset(self):
-        seller = self.request.user.seller
-        order = self.get_order()
-        return OrderItem.objects.filter(order=order, seller=seller)
+        seller_order = self.get_seller_order()
+        return OrderItem.select.filter(order_id=seller_order.order_id, product__seller_id=seller_order.seller_id)
 
     @extend_schema(
         operation_id="seller_order_items_view",
@@ -160,3 +227,32 @@ class SellerOrderItemsView(ListAPIView):
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
+
+
+class SellerAnalyticsView(GenericAPIView):
+    serializer_class = SalesQuerySerializer
+    permission_classes = [IsSeller]
+
+    @extend_schema(
+        summary="Seller Sales Analytics",
+        description="""
+            This endpoint returns the orders, units, revenue, paid revenue and delivered units of the
+            seller per product and day or week between start and end (the last 30 days by default).
+            It reads daily rollups that are updated as orders are placed and change status.
+        """,
+        tags=tags,
+        parameters=[SalesQuerySerializer],
+        responses=SalesReportSerializer,
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data
+        seller = request.user.seller
+        product = None
+        if 'product' in query:
+            product = Product.objects.unfiltered().filter(slug=query['product'], seller=seller).first()
+            if product is None:
+                raise NotFound(detail={"message": "No Product with that slug"})
+        report = sales_report(seller, query['start'], query['end'], query['interval'], product)
+        return Response(SalesReportSerializer(report).data)
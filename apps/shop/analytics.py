@@ -0,0 +1,314 @@
+import json
+import os
+import shutil
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # Only the sales snapshots need NumPy.
+    np = None
+
+from apps.profiles.models import PAYMENT_STATUS_CHOICES, OrderItem
+from apps.sellers.models import Seller
+from apps.sellers.rollups import UNCOUNTED_PAYMENT_STATUSES
+from apps.shop.models import Category
+
+EPOCH = date(1970, 1, 1)
+DIMENSIONS = ("category", "seller", "country")
+INTERVALS = ("day", "week", "month")
+PAYMENT_STATUSES = tuple(value for value, _ in PAYMENT_STATUS_CHOICES)
+# One file per column, one entry per ordered line.
+COLUMNS = {
+    "day": "int32",  # local date of the order, in days since EPOCH
+    "order": "int32",  # dense order number; the lines of an order are adjacent, by category
+    "category": "int32",  # codes into the dictionaries of meta.json
+    "seller": "int32",
+    "country": "int32",
+    "status": "int8",  # index into PAYMENT_STATUSES
+    "quantity": "int32",
+    "amount": "int64",  # line total in cents
+}
+POINTER = "CURRENT"
+
+
+def get_snapshot_dir():
+    return Path(getattr(settings, "SALES_SNAPSHOT_DIR", settings.BASE_DIR / "snapshots" / "sales"))
+
+
+def require_numpy():
+    if np is None:
+        raise ImproperlyConfigured("Sales snapshots require NumPy.")
+
+
+def to_day(value):
+    return (value - EPOCH).days
+
+
+def to_money(cents):
+    return Decimal(int(round(cents))).scaleb(-2)
+
+
+def period_start(key, interval):
+    if interval == "month":
+        return date(1970 + int(key) // 12, int(key) % 12 + 1, 1)
+    if interval == "week":
+        # Day 0 is a Thursday, so weeks counted from day -3 start on Monday.
+        return EPOCH + timedelta(days=int(key) * 7 - 3)
+    return EPOCH + timedelta(days=int(key))
+
+
+def bucket(days, interval):
+    if interval == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if interval == "week":
+        return (days.astype(np.int64) + 3) // 7
+    return days.astype(np.int64)
+
+
+class SalesSnapshot:
+    """
+    One exported snapshot: the ordered lines as memory-mapped NumPy columns and
+    the dictionaries that turn their codes back into slugs and countries.
+    """
+
+    def __init__(self, path):
+        self.name = path.name
+        self.meta = json.loads((path / "meta.json").read_text())
+        self.columns = {column: np.load(path / f"{column}.npy", mmap_mode="r") for column in COLUMNS}
+        self.codes = {
+            dimension: {value: code for code, value in enumerate(labels)}
+            for dimension, labels in self.meta["dictionaries"].items()
+        }
+
+    def select(self, start=None, end=None, payment_status=None, **filters):
+        """
+        Boolean mask of the lines in the date range whose order has the given
+        payment status, or any counted one, and the given dimension values.
+        """
+        columns = self.columns
+        statuses = columns["status"]
+        if payment_status is not None:
+            mask = statuses == PAYMENT_STATUSES.index(payment_status)
+        else:
+            counted = np.array([status not in UNCOUNTED_PAYMENT_STATUSES for status in PAYMENT_STATUSES])
+            mask = counted[statuses]
+        if start is not None:
+            mask &= columns["day"] >= to_day(start)
+        if end is not None:
+            mask &= columns["day"] <= to_day(end)
+        for dimension, value in filters.items():
+            if value is None:
+                continue
+            code = self.codes[dimension].get(value)
+            if code is None:
+                return np.zeros_like(mask)
+            mask &= columns[dimension] == code
+        return mask
+
+    def summarize(self, keys, size, orders, amounts, quantities, percentiles=()):
+        """
+        Groups the lines by `keys`, dense codes below `size`, and returns one
+        entry per key with lines: its GMV, units, order count and the
+        percentiles of its order values. An order counts once per key it has
+        lines under, with the value of those lines.
+
+        Lines come grouped by order (see `export()`), so the `(order, key)`
+        pairs of keys that are the same for all lines of an order, like the
+        day or the country, are already sorted, and for the others sorting
+        only reorders the lines inside each order.
+        """
+        keys = keys.astype(np.int64)
+        gmv = np.bincount(keys, weights=amounts, minlength=size)
+        units = np.bincount(keys, weights=quantities, minlength=size)
+        pairs = orders * size + keys
+        if len(pairs) and (pairs[1:] < pairs[:-1]).any():
+            by_pair = np.argsort(pairs, kind="stable")
+            pairs, amounts = pairs[by_pair], amounts[by_pair]
+        starts = np.flatnonzero(np.concatenate(([True], pairs[1:] != pairs[:-1]))) if len(pairs) else pairs
+        pair_keys = pairs[starts] % size
+        order_counts = np.bincount(pair_keys, minlength=size)
+        present = np.flatnonzero(order_counts)
+        groups = [
+            {
+                "key": int(key),
+                "gmv": to_money(gmv[key]),
+                "units": int(units[key]),
+                "orders": int(order_counts[key]),
+            }
+            for key in present
+        ]
+        if percentiles and groups:
+            values = np.add.reduceat(amounts, starts)
+            quantiles = self.quantiles(values, pair_keys, size, order_counts[present], percentiles)
+            for group, row in zip(groups, quantiles):
+                group["order_value"] = {
+                    f"p{percentile:g}": to_money(quantile) for percentile, quantile in zip(percentiles, row)
+                }
+        return groups
+
+    @staticmethod
+    def quantiles(values, keys, size, counts, percentiles):
+        """
+        Percentiles of `values` per key, as `np.percentile()` interpolates them,
+        for all keys at once: one sort by value, then a stable sort by key that
+        keeps the values of every key in order. `counts` are the numbers of
+        values of the keys that have any, in key order.
+        """
+        if len(counts) == 1:
+            return np.percentile(values, percentiles)[None, :]
+        by_value = np.argsort(values)
+        values, keys = values[by_value], keys[by_value]
+        # Small codes sort by radix sort.
+        by_key = np.argsort(keys.astype(np.uint16) if size <= 1 << 16 else keys, kind="stable")
+        values = values[by_key]
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        last = (counts - 1)[:, None]
+        positions = last * (np.asarray(percentiles, dtype=np.float64) / 100)
+        lower = np.floor(positions).astype(np.int64)
+        fraction = positions - lower
+        lower += offsets[:, None]
+        upper = np.minimum(lower + 1, offsets[:, None] + last)
+        return values[lower] * (1 - fraction) + values[upper] * fraction
+
+    def report(self, group_by="category", interval="day", percentiles=(50, 90, 99), **filters):
+        """
+        GMV, units and orders in total, per `group_by` value (highest GMV first)
+        and per day, week or month, from the lines matching the filters of `select()`.
+        """
+        mask = self.select(**filters)
+        lines = {column: np.asarray(self.columns[column][mask]) for column in ("day", "order", "quantity", "amount")}
+        orders = lines["order"].astype(np.int64)
+        amounts, quantities = lines["amount"].astype(np.float64), lines["quantity"].astype(np.float64)
+        empty = {"gmv": Decimal("0.00"), "units": 0, "orders": 0}
+        if percentiles:
+            empty["order_value"] = {f"p{percentile:g}": None for percentile in percentiles}
+
+        totals = self.summarize(np.zeros(len(orders), np.int8), 1, orders, amounts, quantities, percentiles)
+        labels = self.meta["dictionaries"][group_by]
+        groups = self.summarize(
+            np.asarray(self.columns[group_by][mask]), max(len(labels), 1), orders, amounts, quantities, percentiles
+        )
+        for group in groups:
+            group["key"] = labels[group["key"]]
+        groups.sort(key=lambda group: group["gmv"], reverse=True)
+        periods = bucket(lines["day"], interval)
+        first = int(periods.min()) if len(periods) else 0
+        series = self.summarize(
+            periods - first, int(periods.max()) - first + 1 if len(periods) else 1, orders, amounts, quantities
+        )
+        for row in series:
+            row["period"] = period_start(row.pop("key") + first, interval)
+        return {
+            "snapshot": {"name": self.name, "built_at": self.meta["built_at"], "lines": self.meta["lines"]},
+            "totals": {key: value for key, value in (totals[0] if totals else empty).items() if key != "key"},
+            "group_by": group_by,
+            "groups": groups,
+            "interval": interval,
+            "series": series,
+        }
+
+
+class SnapshotStore:
+    """
+    Order lines exported into a columnar snapshot for staff analytics, which
+    then never query the order tables. `export()` writes a new snapshot
+    directory next to the current one and swaps the `CURRENT` pointer file;
+    every process maps the snapshot the pointer names and remaps it when the
+    pointer changes. Run `export_sales_snapshot` from cron; reports are as
+    fresh as the last export. Both need NumPy, which the rest of the shop does not.
+    """
+    keep = 2
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+
+    def current(self):
+        """The current snapshot, or None before the first export."""
+        require_numpy()
+        root = get_snapshot_dir()
+        try:
+            name = (root / POINTER).read_text().strip()
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            if self.snapshot is None or self.snapshot.name != name:
+                self.snapshot = SalesSnapshot(root / name)
+            return self.snapshot
+
+    def export(self, batch_size=5000):
+        """Writes a snapshot of all ordered lines, makes it current and returns it."""
+        require_numpy()
+        codes = {dimension: {} for dimension in DIMENSIONS}
+        orders = {}
+        statuses = {status: code for code, status in enumerate(PAYMENT_STATUSES)}
+        chunks = {column: [] for column in COLUMNS}
+        batch = {column: [] for column in COLUMNS}
+
+        def flush():
+            for column, dtype in COLUMNS.items():
+                chunks[column].append(np.array(batch[column], dtype=dtype))
+                batch[column] = []
+
+        built_at = timezone.now()
+        rows = (OrderItem.objects
+                .filter(order__isnull=False)
+                .order_by("order_id", "product__category_id", "created_at", "id")
+                .values_list("order_id", "order__created_at", "order__payment_status", "order__country",
+                             "product__category_id", "product__seller_id", "quantity", "line_total")
+                .iterator(chunk_size=batch_size))
+        for order_id, created_at, payment_status, country, category_id, seller_id, quantity, line_total in rows:
+            batch["day"].append(to_day(timezone.localdate(created_at)))
+            batch["order"].append(orders.setdefault(order_id, len(orders)))
+            batch["category"].append(codes["category"].setdefault(category_id, len(codes["category"])))
+            batch["seller"].append(codes["seller"].setdefault(seller_id, len(codes["seller"])))
+            country = (country or "").strip() or None
+            batch["country"].append(codes["country"].setdefault(country, len(codes["country"])))
+            batch["status"].append(statuses[payment_status])
+            batch["quantity"].append(quantity)
+            batch["amount"].append(int(line_total * 100) if line_total is not None else 0)
+            if len(batch["day"]) >= batch_size:
+                flush()
+        flush()
+
+        categories = dict(Category.objects.filter(id__in=list(codes["category"])).values_list("id", "slug"))
+        sellers = dict(Seller.objects.filter(id__in=list(codes["seller"])).values_list("id", "slug"))
+        meta = {
+            "built_at": built_at.isoformat(),
+            "lines": sum(len(chunk) for chunk in chunks["day"]),
+            "orders": len(orders),
+            "dictionaries": {
+                "category": [categories.get(key) for key in codes["category"]],
+                "seller": [sellers.get(key) for key in codes["seller"]],
+                "country": list(codes["country"]),
+            },
+        }
+
+        root = get_snapshot_dir()
+        name = built_at.strftime("%Y%m%dT%H%M%S%f")
+        staging = root / f"{name}.tmp"
+        staging.mkdir(parents=True)
+        for column in COLUMNS:
+            np.save(staging / f"{column}.npy", np.concatenate(chunks[column]))
+        (staging / "meta.json").write_text(json.dumps(meta))
+        os.rename(staging, root / name)
+        (root / f"{POINTER}.tmp").write_text(name)
+        os.replace(root / f"{POINTER}.tmp", root / POINTER)
+        self.prune(root, name)
+        return self.current()
+
+    def prune(self, root, current):
+        # Processes may still read the previous snapshot until they see the new pointer.
+        names = sorted(path.name for path in root.iterdir() if path.is_dir() and path.name <= current)
+        for name in names[:-self.keep]:
+            shutil.rmtree(root / name, ignore_errors=True)
+
+
+sales_snapshots = SnapshotStore()
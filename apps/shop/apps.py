@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 
 class ShopConfig(AppConfig):
-    name = 'apps.shop'
\ No newline at end of file
+    name = 'apps.shop'
+
+    def ready(self):
+        from apps.shop import signals  # noqa: F401
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+STATS = ("hits", "misses", "evictions")
+
+
+class ProductDetailCache:
+    """
+    Read-through cache of serialized product payloads keyed by slug. Entries are
+    dropped after the writing transaction commits, so a concurrent reader cannot
+    put the pre-commit state back into the cache.
+    """
+    prefix = "shop:product-detail"
+
+    def key(self, slug):
+        return f"{self.prefix}:{slug}"
+
+    def stat_key(self, name):
+        return f"{self.prefix}:stats:{name}"
+
+    def get_timeout(self):
+        return getattr(settings, "PRODUCT_DETAIL_CACHE_TIMEOUT", 300)
+
+    def peek(self, slug):
+        """Returns the cached payload without loading it or touching the counters."""
+        return cache.get(self.key(slug))
+
+    def get_or_set(self, slug, loader):
+        payload = cache.get(self.key(slug))
+        if payload is not None:
+            self.count("hits")
+            return payload
+        self.count("misses")
+        payload = loader()
+        cache.set(self.key(slug), payload, timeout=self.get_timeout())
+        return payload
+
+    def invalidate(self, *slugs):
+        slugs = {slug for slug in slugs if slug}
+        if not slugs:
+            return
+
+        def evict():
+            cache.delete_many([self.key(slug) for slug in slugs])
+            self.count("evictions", len(slugs))
+
+        transaction.on_commit(evict)
+
+    def count(self, name, delta=1):
+        try:
+            cache.incr(self.stat_key(name), delta)
+        except ValueError:
+            cache.add(self.stat_key(name), 0, timeout=None)
+            cache.incr(self.stat_key(name), delta)
+
+    def stats(self):
+        values = cache.get_many([self.stat_key(name) for name in STATS])
+        return {name: values.get(self.stat_key(name), 0) for name in STATS}
+
+    def reset_stats(self):
+        cache.delete_many([self.stat_key(name) for name in STATS])
+
+
+product_cache = ProductDetailCache()
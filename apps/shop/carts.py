@@ -0,0 +1,282 @@
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from apps.common.serializers import ValuesSerializer
+from apps.profiles.models import OrderItem
+from apps.shop.models import Product
+from apps.shop.serializers import OrderItemProductSerializer, OrderItemSerializer
+
+
+class CartStore:
+    """
+    Open carts kept in the cache as `{product_id: [quantity, added_at]}` per user,
+    rendered from cached product cards, so toggling and reading a cart does not
+    touch the `OrderItem` table.
+
+    Writes are persisted behind: the first write to a clean cart appends the user
+    to a journal of numbered cache keys, and `flush()` replays the journal into
+    `OrderItem` rows, which is also where a cart is loaded from after the cache
+    lost it. Checkout persists the cart itself before it reads the items.
+    Changes made since the last flush are lost if the cache is wiped, so run
+    `flush_carts` from cron every `CART_FLUSH_INTERVAL` seconds with a shared
+    cache backend.
+
+    Positions come from an atomic `incr`, so appending never rewrites shared
+    state. A position whose entry is missing for `journal_hole_grace` seconds
+    (a writer died, or the cache evicted it) is skipped; the clean marker of a
+    cart expires after the flush interval, so its next write journals it again.
+    """
+    prefix = "shop:cart"
+    lock_attempts = 50
+    journal_hole_grace = 60
+
+    def __init__(self):
+        self.total_field = ValuesSerializer.decimal_converter(OrderItemSerializer().fields["total"])
+
+    def key(self, user_id):
+        return f"{self.prefix}:{user_id}"
+
+    def dirty_key(self, user_id):
+        return f"{self.prefix}:dirty:{user_id}"
+
+    def journal_key(self, position):
+        return f"{self.prefix}:journal:{position}"
+
+    def card_key(self, product_id):
+        return f"{self.prefix}:product:{product_id}"
+
+    def get_timeout(self):
+        return getattr(settings, "CART_CACHE_TIMEOUT", 30 * 24 * 60 * 60)
+
+    def get_card_timeout(self):
+        return getattr(settings, "CART_PRODUCT_CACHE_TIMEOUT", 300)
+
+    def get_flush_interval(self):
+        return getattr(settings, "CART_FLUSH_INTERVAL", 30)
+
+    # Cart contents
+
+    def get(self, user_id):
+        cart = cache.get(self.key(user_id))
+        if cart is None:
+            rows = OrderItem.objects.filter(user_id=user_id, order=None).values_list(
+                "product_id", "quantity", "created_at"
+            )
+            cart = {str(product_id): [quantity, created_at.timestamp()] for product_id, quantity, created_at in rows}
+            cache.add(self.key(user_id), cart, timeout=self.get_timeout())
+        return cart
+
+    def set_quantity(self, user_id, product_id, quantity):
+        """Sets or (with 0) removes an item and returns whether it was new."""
+        return str(product_id) in self.set_quantities(user_id, {product_id: quantity})
+
+    def set_quantities(self, user_id, quantities):
+        """
+        Applies `{product_id: quantity}` in one cache write, removing the items
+        set to 0, and returns the ids of the items that were not in the cart.
+        """
+        added_at = timezone.now().timestamp()
+        created = set()
+        with self.lock(user_id):
+            cart = self.get(user_id)
+            for product_id, quantity in quantities.items():
+                product_id = str(product_id)
+                if product_id not in cart:
+                    created.add(product_id)
+                if quantity:
+                    cart[product_id] = [quantity, cart.get(product_id, (0, added_at))[1]]
+                else:
+                    cart.pop(product_id, None)
+            cache.set(self.key(user_id), cart, timeout=self.get_timeout())
+        self.mark_dirty(user_id)
+        return created
+
+    def clear(self, user_id):
+        cache.delete_many([self.key(user_id), self.dirty_key(user_id)])
+
+    def lock(self, user_id):
+        return CacheLock(f"{self.prefix}:lock:{user_id}", self.lock_attempts)
+
+    # Rendering
+
+    def render(self, user_id):
+        """The cart as `OrderItemSerializer` would render its items, newest first."""
+        cart = self.get(user_id)
+        cards = self.get_cards(cart)
+        items = sorted(cart.items(), key=lambda item: item[1][1], reverse=True)
+        return [
+            self.render_item(cards[product_id], quantity)
+            for product_id, (quantity, _) in items if product_id in cards
+        ]
+
+    def render_item(self, card, quantity):
+        return {
+            "product": card,
+            "quantity": quantity,
+            "total": self.total_field(Decimal(card["price"]) * quantity),
+        }
+
+    def get_cards(self, product_ids):
+        keys = {self.card_key(product_id): product_id for product_id in product_ids}
+        cached = cache.get_many(keys)
+        cards = {keys[key]: card for key, card in cached.items()}
+        missing = [product_id for product_id in product_ids if product_id not in cards]
+        if missing:
+            products = Product.objects.unfiltered().select_related("seller__user").filter(pk__in=missing)
+            loaded = {str(product.pk): OrderItemProductSerializer(product).data for product in products}
+            cache.set_many(
+                {self.card_key(product_id): card for product_id, card in loaded.items()},
+                timeout=self.get_card_timeout(),
+            )
+            cards.update(loaded)
+        return cards
+
+    def invalidate_products(self, *product_ids):
+        keys = [self.card_key(product_id) for product_id in product_ids]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    # Write-behind
+
+    def mark_dirty(self, user_id):
+        if cache.add(self.dirty_key(user_id), 1, timeout=self.get_flush_interval()):
+            cache.set(self.journal_key(self.next_position()), str(user_id), timeout=None)
+
+    def next_position(self):
+        # A lost end counter restarts from the flushed position, not from 0.
+        for _ in range(2):
+            cache.add(self.journal_key("end"), cache.get(self.journal_key("start"), 0), timeout=None)
+            try:
+                return cache.incr(self.journal_key("end"))
+            except ValueError:
+                continue
+        raise CartBusy()
+
+    def skip_hole(self, position):
+        """Whether the entry at `position` has been missing long enough to give up on it."""
+        key = self.journal_key(f"hole:{position}")
+        seen = cache.get(key)
+        if seen is None:
+            cache.set(key, time.time(), timeout=self.journal_hole_grace * 10)
+            return False
+        if time.time() - seen < self.journal_hole_grace:
+            return False
+        cache.delete(key)
+        return True
+
+    def flush(self, batch_size=500):
+        """Persists the carts written since the last flush and returns how many."""
+        if not cache.add(self.journal_key("flushing"), 1, timeout=60):
+            return 0
+        flushed = 0
+        try:
+            start = cache.get(self.journal_key("start"), 0)
+            end = cache.get(self.journal_key("end"), 0)
+            while start < end:
+                positions = range(start + 1, min(start + batch_size, end) + 1)
+                entries = cache.get_many([self.journal_key(position) for position in positions])
+                for position in positions:
+                    user_id = entries.get(self.journal_key(position))
+                    if user_id is None and not self.skip_hole(position):
+                        # Appended but maybe not written yet; pick it up next time.
+                        return flushed
+                    if user_id is not None:
+                        # Cleared first, so a write during the flush journals the cart again.
+                        cache.delete(self.dirty_key(user_id))
+                        self.persist(user_id)
+                        flushed += 1
+                    start = position
+                    cache.set(self.journal_key("start"), start, timeout=None)
+                    cache.delete(self.journal_key(position))
+        finally:
+            cache.delete(self.journal_key("flushing"))
+        return flushed
+
+    def persist(self, user_id):
+        """Makes the open `OrderItem` rows of the user match the cached cart."""
+        cart = cache.get(self.key(user_id))
+        if cart is None:
+            return
+        with transaction.atomic():
+            OrderItem.objects.filter(user_id=user_id, order=None).exclude(product_id__in=list(cart)).delete()
+            upsert_cart_lines(user_id, {product_id: quantity for product_id, (quantity, _) in cart.items()})
+
+
+def upsert_cart_lines(user_id, quantities):
+    """
+    Writes `{product_id: quantity}` as open cart lines of the user with one
+    INSERT ... ON CONFLICT against `orderitem_open_cart_line_uniq`. Backends
+    without conflict targets on partial indexes update and insert separately.
+    """
+    if not quantities:
+        return
+    if connection.vendor not in ("sqlite", "postgresql"):
+        rows = {
+            str(item.product_id): item
+            for item in OrderItem.objects.filter(user_id=user_id, order=None, product_id__in=list(quantities))
+        }
+        for product_id, row in rows.items():
+            row.quantity = quantities[product_id]
+        OrderItem.objects.bulk_update(rows.values(), ["quantity"])
+        OrderItem.objects.bulk_create(
+            OrderItem(user_id=user_id, product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities.items() if product_id not in rows
+        )
+        return
+
+    meta = OrderItem._meta
+    fields = [meta.get_field(name) for name in ("id", "created_at", "updated_at", "user", "product", "quantity")]
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    now = timezone.now()
+    params = []
+    for product_id, quantity in quantities.items():
+        values = (uuid.uuid4(), now, now, user_id, product_id, quantity)
+        params.extend(field.get_db_prep_save(value, connection) for field, value in zip(fields, values))
+    row = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    quantity, updated_at = quote("quantity"), quote("updated_at")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(quote(field.column) for field in fields)}) "
+            f"VALUES {', '.join([row] * len(quantities))} "
+            f"ON CONFLICT ({quote('user_id')}, {quote('product_id')}) WHERE {quote('order_id')} IS NULL "
+            f"DO UPDATE SET {quantity} = excluded.{quantity}, {updated_at} = excluded.{updated_at} "
+            f"WHERE {table}.{quantity} <> excluded.{quantity}",
+            params,
+        )
+
+
+class CartBusy(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = {"message": "Cart Is Being Updated, Try Again"}
+    default_code = "cart_busy"
+
+
+class CacheLock:
+    """Mutex on a cache key; raises `CartBusy` after `attempts` tries."""
+
+    def __init__(self, key, attempts, timeout=5):
+        self.key = key
+        self.attempts = attempts
+        self.timeout = timeout
+
+    def __enter__(self):
+        for _ in range(self.attempts):
+            if cache.add(self.key, 1, timeout=self.timeout):
+                return self
+            time.sleep(0.01)
+        raise CartBusy()
+
+    def __exit__(self, *exc_info):
+        cache.delete(self.key)
+
+
+carts = CartStore()
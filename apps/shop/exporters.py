@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+import uuid
+import zlib
+
+from django.utils.dateparse import parse_datetime
+
+from apps.common.pagination import KeysetPagination
+from apps.shop.models import Product
+
+FORMATS = ("csv", "jsonl")
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+COLUMNS = {
+    "id": "id",
+    "name": "name",
+    "slug": "slug",
+    "desc": "desc",
+    "price_current": "price_current",
+    "price_old": "price_old",
+    "category_slug": "category__slug",
+    "seller_slug": "seller__slug",
+    "is_stock": "is_stock",
+    "image1": "image1",
+    "image2": "image2",
+    "image3": "image3",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+ORDERING = ("updated_at", "id")
+
+
+def parse_cursor(since, after=None):
+    """
+    Parses the resume position: `since` is the `updated_at` of the last exported
+    row and `after` its id. Raises ValueError for malformed values.
+    """
+    if not since:
+        if after:
+            raise ValueError("after requires since")
+        return None
+    updated_at = parse_datetime(since)
+    if updated_at is None:
+        raise ValueError("since must be an ISO 8601 datetime")
+    return {"updated_at": updated_at, "id": uuid.UUID(after) if after else None}
+
+
+def to_text(value):
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        # Full precision, so the value can be passed back as the resume cursor.
+        return value.isoformat()
+    if isinstance(value, (int, str)):
+        return value
+    return str(value)
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class ProductExporter:
+    """
+    Streams products ordered by `(updated_at, id)` as CSV or JSON Lines. Rows are
+    read with `.iterator()` in chunks, so memory stays constant and an export can
+    resume after the last row it delivered.
+    """
+    chunk_size = 2000
+
+    def __init__(self, queryset=None, cursor=None):
+        self.queryset = Product.objects.all() if queryset is None else queryset
+        self.cursor = cursor
+
+    def get_queryset(self):
+        queryset = self.queryset.order_by(*ORDERING)
+        if self.cursor is not None:
+            if self.cursor["id"] is None:
+                queryset = queryset.filter(updated_at__gt=self.cursor["updated_at"])
+            else:
+                queryset = queryset.filter(KeysetPagination.seek_filter(ORDERING, self.cursor))
+        return queryset.values_list(*COLUMNS.values())
+
+    def iter_chunks(self):
+        chunk = []
+        for row in self.get_queryset().iterator(chunk_size=self.chunk_size):
+            chunk.append([to_text(value) for value in row])
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def iter_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(COLUMNS)
+        for chunk in self.iter_chunks():
+            writer.writerows(chunk)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    def iter_jsonl(self):
+        names = list(COLUMNS)
+        for chunk in self.iter_chunks():
+            yield "".join(
+                json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n" for row in chunk
+            ).encode()
+
+    def stream(self, file_format, compress=False):
+        chunks = self.iter_csv() if file_format == "csv" else self.iter_jsonl()
+        return gzip_stream(chunks) if compress else chunks
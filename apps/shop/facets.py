@@ -0,0 +1,265 @@
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from apps.sellers.models import Seller
+from apps.shop.models import Category, Product
+
+FACETS = ("category", "seller", "price", "stock")
+GENERATION_CACHE_KEY = "shop:facets:generation"
+IN_STOCK = "in_stock"
+OUT_OF_STOCK = "out_of_stock"
+
+
+def get_price_buckets():
+    return getattr(settings, "PRODUCT_FACET_PRICE_BUCKETS", (0, 10, 50, 100, 500, 1000))
+
+
+def iter_bits(bitmap):
+    while bitmap:
+        lowest = bitmap & -bitmap
+        yield lowest.bit_length() - 1
+        bitmap ^= lowest
+
+
+class FacetIndex:
+    """
+    In-process bitmap index over the live products. Every product gets a bit
+    position and every facet value keeps a posting list as a Python int bitmap,
+    so the counts for any combination of active filters are popcounts of ANDed
+    bitmaps instead of GROUP BY queries.
+
+    Writes made in this process are applied through signals once they commit;
+    writes from other processes are picked up from `updated_at` on the next read, and
+    hard deletes bump a generation number in the cache that forces a rebuild.
+    """
+    columns = ("id", "category_id", "seller_id", "price_current", "is_stock", "is_deleted")
+    sync_overlap = timedelta(seconds=5)
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.loaded = False
+
+    def reset(self):
+        with self.lock:
+            self.loaded = False
+
+    def clear(self):
+        self.positions = {}
+        self.free_positions = []
+        self.next_position = 0
+        self.values = {}
+        self.prices = {}
+        self.postings = {facet: {} for facet in FACETS}
+        self.alive = 0
+        edges = tuple(get_price_buckets())
+        self.price_buckets = [
+            (f"{lower}-{upper}", Decimal(lower), Decimal(upper))
+            for lower, upper in zip(edges, edges[1:])
+        ] + [(f"{edges[-1]}+", Decimal(edges[-1]), None)]
+
+    def rebuild(self):
+        with self.lock:
+            self.clear()
+            self.generation = cache.get(GENERATION_CACHE_KEY, 0)
+            self.synced_at = Product.objects.unfiltered().aggregate(Max("updated_at"))["updated_at__max"]
+            self.checked_at = time.monotonic()
+            rows = Product.objects.values_list(*self.columns).iterator(chunk_size=2000)
+            for row in rows:
+                self._apply_row(row)
+            self.loaded = True
+
+    def sync(self):
+        with self.lock:
+            if not self.loaded or cache.get(GENERATION_CACHE_KEY, 0) != self.generation:
+                self.rebuild()
+                return
+            interval = getattr(settings, "PRODUCT_FACETS_SYNC_INTERVAL", 1.0)
+            if time.monotonic() - self.checked_at < interval:
+                return
+            self.checked_at = time.monotonic()
+            if self.synced_at is None:
+                changed = Product.objects.unfiltered()
+            else:
+                changed = Product.objects.unfiltered().filter(
+                    updated_at__gte=self.synced_at - self.sync_overlap
+                )
+            for row in changed.order_by("updated_at").values_list(*self.columns, "updated_at"):
+                self._apply_row(row[:-1])
+                self.synced_at = row[-1]
+
+    def apply(self, product):
+        self.apply_rows([tuple(getattr(product, column) for column in self.columns)])
+
+    def apply_on_commit(self, *products):
+        # Rows are read now; a rolled back write never reaches the bitmaps.
+        rows = [tuple(getattr(product, column) for column in self.columns) for product in products]
+        transaction.on_commit(lambda: self.apply_rows(rows))
+
+    def apply_rows(self, rows):
+        with self.lock:
+            if self.loaded:
+                for row in rows:
+                    self._apply_row(row)
+
+    def remove_on_commit(self, product_id):
+        transaction.on_commit(lambda: self.remove(product_id))
+
+    def remove(self, product_id):
+        with self.lock:
+            if self.loaded:
+                self._remove(product_id)
+        try:
+            cache.incr(GENERATION_CACHE_KEY)
+        except ValueError:
+            cache.set(GENERATION_CACHE_KEY, 1, timeout=None)
+        if self.loaded:
+            self.generation = cache.get(GENERATION_CACHE_KEY, 0)
+
+    def price_bucket(self, price):
+        for label, _, upper in self.price_buckets:
+            if upper is None or price < upper:
+                return label
+
+    def _apply_row(self, row):
+        product_id, category_id, seller_id, price, stock, is_deleted = row
+        self._remove(product_id)
+        if is_deleted:
+            return
+        price = Decimal(price)
+        if self.free_positions:
+            position = self.free_positions.pop()
+        else:
+            position = self.next_position
+            self.next_position += 1
+        values = {
+            "category": category_id,
+            "seller": seller_id,
+            "price": self.price_bucket(price),
+            "stock": IN_STOCK if stock > 0 else OUT_OF_STOCK,
+        }
+        bit = 1 << position
+        for facet, value in values.items():
+            postings = self.postings[facet]
+            postings[value] = postings.get(value, 0) | bit
+        self.positions[product_id] = position
+        self.values[position] = values
+        self.prices[position] = price
+        self.alive |= bit
+
+    def _remove(self, product_id):
+        position = self.positions.pop(product_id, None)
+        if position is None:
+            return
+        bit = 1 << position
+        for facet, value in self.values.pop(position).items():
+            postings = self.postings[facet]
+            postings[value] &= ~bit
+            if not postings[value]:
+                del postings[value]
+        del self.prices[position]
+        self.alive &= ~bit
+        self.free_positions.append(position)
+
+    def _price_mask(self, min_price, max_price):
+        """
+        ORs the posting lists of the buckets fully inside the range and only checks
+        individual prices for the buckets cut by its bounds.
+        """
+        mask = 0
+        lower_bound = Decimal(min_price) if min_price else None
+        upper_bound = Decimal(max_price) if max_price else None
+        for label, lower, upper in self.price_buckets:
+            bitmap = self.postings["price"].get(label, 0)
+            if not bitmap:
+                continue
+            if upper_bound is not None and lower > upper_bound:
+                continue
+            if lower_bound is not None and upper is not None and upper <= lower_bound:
+                continue
+            inside = (
+                (lower_bound is None or lower >= lower_bound)
+                and (upper_bound is None or (upper is not None and upper <= upper_bound))
+            )
+            if inside:
+                mask |= bitmap
+                continue
+            for position in iter_bits(bitmap):
+                price = self.prices[position]
+                if lower_bound is not None and price < lower_bound:
+                    continue
+                if upper_bound is not None and price > upper_bound:
+                    continue
+                mask |= 1 << position
+        return mask
+
+    def _filter_masks(self, filters):
+        masks = {}
+        if filters.get("category") is not None:
+            masks["category"] = self.postings["category"].get(filters["category"], 0)
+        if filters.get("seller") is not None:
+            masks["seller"] = self.postings["seller"].get(filters["seller"], 0)
+        if filters.get("in_stock") is not None:
+            value = IN_STOCK if filters["in_stock"] else OUT_OF_STOCK
+            masks["stock"] = self.postings["stock"].get(value, 0)
+        if filters.get("min_price") or filters.get("max_price"):
+            masks["price"] = self._price_mask(filters.get("min_price"), filters.get("max_price"))
+        return masks
+
+    def counts(self, filters=None):
+        """
+        Returns `{facet: {value: count}}`. Each facet is counted under every active
+        filter except its own, so the client can still see the alternatives.
+        """
+        self.sync()
+        with self.lock:
+            masks = self._filter_masks(filters or {})
+            result = {}
+            for facet in FACETS:
+                mask = self.alive
+                for other, other_mask in masks.items():
+                    if other != facet:
+                        mask &= other_mask
+                result[facet] = {
+                    value: count
+                    for value, bitmap in self.postings[facet].items()
+                    if (count := (bitmap & mask).bit_count())
+                }
+            return result
+
+    def describe(self, filters=None):
+        """Facet counts shaped for API responses, with slugs instead of ids."""
+        counts = self.counts(filters)
+        categories = dict(
+            Category.objects.filter(id__in=counts["category"]).values_list("id", "slug")
+        )
+        sellers = dict(
+            Seller.objects.filter(id__in=[key for key in counts["seller"] if key]).values_list("id", "slug")
+        )
+        return {
+            "category": [
+                {"value": categories[key], "count": count}
+                for key, count in counts["category"].items() if key in categories
+            ],
+            "seller": [
+                {"value": sellers[key], "count": count}
+                for key, count in counts["seller"].items() if key in sellers
+            ],
+            "price": [
+                {"value": label, "count": counts["price"][label]}
+                for label, _, _ in self.price_buckets if label in counts["price"]
+            ],
+            "stock": [
+                {"value": value, "count": counts["stock"][value]}
+                for value in (IN_STOCK, OUT_OF_STOCK) if value in counts["stock"]
+            ],
+        }
+
+
+product_facets = FacetIndex()
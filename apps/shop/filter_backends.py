@@ -1,32 +1,74 @@
-from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import BaseFilterBackend
-from rest_framework.response import Response
+
+from apps.sellers.models import Seller
+from apps.shop.models import Category
+
+UNKNOWN = object()
 
 
 class ProductsFilterBackend(BaseFilterBackend):
-    def filter_queryset(self, request, queryset, view):
-        products = queryset
+    def get_price_range(self, request):
         max_price_str = request.query_params.get('max_price')
         min_price_str = request.query_params.get('min_price')
 
         try:
-            max_price = int(max_price_str)
-            min_price = int(min_price_str)
-        except (ValueError, TypeError):
-            return Response(
-                data={"message": "min_price и max_price должны быть целыми числами"},
-                status=status.HTTP_400_BAD_REQUEST
+            max_price = int(max_price_str) if max_price_str else None
+            min_price = int(min_price_str) if min_price_str else None
+        except ValueError:
+            raise ValidationError(
+                detail={"message": "min_price и max_price должны быть целыми числами"}
             )
 
         if max_price and min_price:
             if max_price <= min_price:
-                return Response(
-                    data={"message": "Максимальная цена должна быть больше минимальной"},
-                    status=status.HTTP_400_BAD_REQUEST
+                raise ValidationError(
+                    detail={"message": "Максимальная цена должна быть больше минимальной"}
                 )
+        return min_price, max_price
 
+    def filter_queryset(self, request, queryset, view):
+        products = queryset
+        min_price, max_price = self.get_price_range(request)
         if max_price:
-            products = queryset.filter(price_current__lte=max_price)
+            products = products.filter(price_current__lte=max_price)
         if min_price:
-            products = queryset.filter(price_current__gte=min_price)
+            products = products.filter(price_current__gte=min_price)
         return products
+
+
+class ProductFacetsFilterBackend(BaseFilterBackend):
+    """
+    Filters products by the `category` and `seller` slugs and by `in_stock`.
+    Unknown slugs resolve to UNKNOWN so they match no product.
+    """
+    def get_facet_filters(self, request):
+        filters = {"category": None, "seller": None, "in_stock": None}
+        category_slug = request.query_params.get('category')
+        if category_slug:
+            category_id = Category.objects.filter(slug=category_slug).values_list('id', flat=True).first()
+            filters["category"] = category_id or UNKNOWN
+        seller_slug = request.query_params.get('seller')
+        if seller_slug:
+            seller_id = Seller.objects.filter(slug=seller_slug).values_list('id', flat=True).first()
+            filters["seller"] = seller_id or UNKNOWN
+        in_stock = request.query_params.get('in_stock')
+        if in_stock:
+            if in_stock.lower() not in ('true', 'false', '1', '0'):
+                raise ValidationError(detail={"message": "in_stock должен быть true или false"})
+            filters["in_stock"] = in_stock.lower() in ('true', '1')
+        return filters
+
+    def filter_queryset(self, request, queryset, view):
+        filters = self.get_facet_filters(request)
+        if UNKNOWN in (filters["category"], filters["seller"]):
+            return queryset.none()
+        if filters["category"]:
+            queryset = queryset.filter(category_id=filters["category"])
+        if filters["seller"]:
+            queryset = queryset.filter(seller_id=filters["seller"])
+        if filters["in_stock"] is True:
+            queryset = queryset.filter(is_stock__gt=0)
+        elif filters["in_stock"] is False:
+            queryset = queryset.filter(is_stock__lte=0)
+        return queryset
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+class FlashSaleGate:
+    """
+    Admission control for products on flash sale. While a sale is open the cache
+    holds a token counter per product slug, started from the stock: every cart
+    request takes as many tokens as the quantity it asks for and gives them back
+    when it is done, and committed stock changes are mirrored into the counter.
+    A request that cannot get its tokens is turned away without reading or
+    locking the product row, so only as many buyers as there is stock ever reach
+    the database at once.
+
+    The counter is an admission estimate, the conditional stock UPDATE stays the
+    source of truth. Tokens cover the whole requested quantity, so a buyer
+    raising the quantity of a held item needs tokens for all of it. Stock edited outside `apps.shop.inventory` (a seller saving
+    the product) is picked up by opening the sale again.
+
+    The counter is stored with `offset` added, so it never reaches 0: Memcached
+    clamps `decr` at 0, which would hide a request taking more than is left and
+    make `give_back()` add tokens that were never taken.
+    """
+    prefix = "shop:flash-sale"
+    offset = 1 << 32
+
+    def key(self, slug):
+        return f"{self.prefix}:{slug}"
+
+    def get_duration(self):
+        return getattr(settings, "FLASH_SALE_DURATION", 60 * 60)
+
+    def open(self, product, duration=None):
+        cache.set(
+            self.key(product.slug), max(product.is_stock, 0) + self.offset, timeout=duration or self.get_duration()
+        )
+
+    def close(self, slug):
+        cache.delete(self.key(slug))
+
+    def remaining(self, slug):
+        """Tokens left, or None when the product is not on sale."""
+        tokens = cache.get(self.key(slug))
+        return None if tokens is None else tokens - self.offset
+
+    def admit(self, slug, quantity):
+        """
+        Takes `quantity` tokens. Returns None when the product is not on sale,
+        otherwise whether the request was admitted; admitted requests must
+        `give_back()` the same quantity once they are done.
+        """
+        try:
+            left = cache.decr(self.key(slug), quantity) - self.offset
+        except ValueError:
+            return None
+        if left < 0:
+            self.give_back(slug, quantity)
+            return False
+        return True
+
+    def give_back(self, slug, quantity):
+        self.add(slug, quantity)
+
+    def track(self, slug, delta):
+        """Mirrors a stock change of `delta` units once the transaction commits."""
+        if delta:
+            transaction.on_commit(lambda: self.add(slug, delta))
+
+    def add(self, slug, delta):
+        try:
+            cache.incr(self.key(slug), delta)
+        except ValueError:
+            pass
+
+
+flash_sales = FlashSaleGate()
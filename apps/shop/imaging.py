@@ -0,0 +1,65 @@
+# Runs in the thumbnail process pool: no Django imports, so spawned workers
+# start fast and never touch the database.
+import hashlib
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "method": 4},
+    "jpeg": {"format": "JPEG", "optimize": True, "progressive": True},
+}
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def variant_path(digest, width, image_format):
+    return os.path.join(digest[:2], digest, f"{width}.{EXTENSIONS[image_format]}")
+
+
+def render_variants(source_path, output_root, widths, formats, quality):
+    """
+    Writes every width/format variant of the image at `source_path` under
+    `output_root`, keyed by the content hash, and returns the hash. Widths above
+    the original are rendered at the original size; existing files are kept.
+    """
+    digest = file_digest(source_path)
+    missing = [
+        (width, image_format) for width in widths for image_format in formats
+        if not os.path.exists(os.path.join(output_root, variant_path(digest, width, image_format)))
+    ]
+    if not missing:
+        return digest
+
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    resized = {}
+    for width, image_format in missing:
+        if width not in resized:
+            target_width = min(width, image.width)
+            target_height = max(1, round(image.height * target_width / image.width))
+            resized[width] = image.resize((target_width, target_height), Image.Resampling.LANCZOS)
+        variant = resized[width]
+        if image_format == "jpeg" and variant.mode not in ("RGB", "L"):
+            variant = variant.convert("RGB")
+        path = os.path.join(output_root, variant_path(digest, width, image_format))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written next to the target and renamed, so readers never see a partial file.
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                variant.save(file, quality=quality, **SAVE_OPTIONS[image_format])
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+    return digest
@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+import posixpath
+from dataclasses import dataclass, field
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from rest_framework import serializers
+
+from apps.common.models import StoredFile
+from apps.common.signals import get_tracked_fields
+from apps.shop.caching import product_cache
+from apps.shop.facets import product_facets
+from apps.shop.models import Category, Product
+from apps.shop.search import index_products
+from apps.shop.serializers import CreateProductSerializer
+
+FORMATS = ("csv", "jsonl")
+IMAGE_FIELDS = ("image1", "image2", "image3")
+
+
+class ProductImportSerializer(CreateProductSerializer):
+    # Imported rows reference images already in storage instead of uploading them.
+    image1 = serializers.CharField(max_length=100)
+    image2 = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    image3 = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+    def validate_image_name(self, name):
+        if name and (posixpath.isabs(name) or "\\" in name or ".." in name.split("/")):
+            raise serializers.ValidationError("Must be a relative path inside the media storage.")
+        return name
+
+    validate_image1 = validate_image2 = validate_image3 = validate_image_name
+
+
+def detect_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension == "csv":
+        return "csv"
+    return None
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        # Empty cells fall back to the field defaults; cells without a header are ignored.
+        yield {key: value for key, value in row.items() if key is not None and value not in ("", None)}
+
+
+def read_jsonl(stream):
+    """Yields the objects of a JSON Lines stream; broken lines yield a `ValidationError`."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield serializers.ValidationError({"non_field_errors": ["Invalid JSON"]})
+            continue
+        if not isinstance(row, dict):
+            yield serializers.ValidationError({"non_field_errors": ["Expected a JSON object"]})
+            continue
+        yield row
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {"created": self.created, "error_count": self.error_count, "errors": self.errors}
+
+
+class ProductImporter:
+    """
+    Streams product rows from CSV or JSON Lines into a seller's catalog. One
+    serializer instance validates every row, category slugs are resolved from a
+    map loaded once, and valid rows are written with `bulk_create()` per batch.
+    Invalid rows are reported with their line number and do not stop the import;
+    so are rows naming images that are not in storage, checked per batch.
+
+    `bulk_create()` skips the model signals, so every batch also counts the
+    references to its stored images, indexes the new products for search and the
+    facets and evicts their slugs from the detail cache.
+    """
+    batch_size = 2000
+    max_reported_errors = 100
+
+    def __init__(self, seller, batch_size=None):
+        self.seller = seller
+        self.batch_size = batch_size or self.batch_size
+        self.serializer = ProductImportSerializer()
+        self.categories = dict(Category.objects.values_list("slug", "id"))
+
+    def import_file(self, file, file_format):
+        if isinstance(file, io.TextIOBase):
+            stream = file
+        else:
+            stream = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        rows = read_csv(stream) if file_format == "csv" else read_jsonl(stream)
+        return self.import_rows(rows)
+
+    def import_rows(self, rows):
+        report = ImportReport()
+        batch = []
+        for line, row in enumerate(rows, start=1):
+            if isinstance(row, serializers.ValidationError):
+                self.add_error(report, line, row.detail)
+                continue
+            product = self.build_product(report, line, row)
+            if product is None:
+                continue
+            batch.append((line, product))
+            if len(batch) >= self.batch_size:
+                report.created += self.save_batch(self.check_images(report, batch))
+                batch = []
+        if batch:
+            report.created += self.save_batch(self.check_images(report, batch))
+        return report
+
+    def build_product(self, report, line, row):
+        try:
+            data = self.serializer.run_validation(row)
+        except serializers.ValidationError as exc:
+            self.add_error(report, line, exc.detail)
+            return None
+        category_slug = data.pop("category")["slug"]
+        category_id = self.categories.get(category_slug)
+        if category_id is None:
+            self.add_error(report, line, {"category_slug": ["Category does not exist!"]})
+            return None
+        return Product(seller=self.seller, category_id=category_id, **data)
+
+    def check_images(self, report, batch):
+        """
+        Drops and reports the rows whose images are not in storage: names are
+        looked up in `StoredFile` in one query, and only the few untracked ones
+        left are checked in the storage itself.
+        """
+        names = {getattr(product, field).name for _, product in batch for field in IMAGE_FIELDS} - {""}
+        known = set(StoredFile.objects.filter(name__in=names).values_list("name", flat=True))
+        known.update(name for name in names - known if default_storage.exists(name))
+        products = []
+        for line, product in batch:
+            missing = {
+                field: ["File does not exist!"]
+                for field in IMAGE_FIELDS if getattr(product, field).name not in known | {""}
+            }
+            if missing:
+                self.add_error(report, line, missing)
+            else:
+                products.append(product)
+        return products
+
+    def add_error(self, report, line, errors):
+        report.error_count += 1
+        if len(report.errors) < self.max_reported_errors:
+            report.errors.append({"row": line, "errors": errors})
+
+    def save_batch(self, products):
+        if not products:
+            return 0
+        with transaction.atomic():
+            Product.objects.bulk_create(products)
+            for image in get_tracked_fields(Product):
+                image.storage.retain(*(getattr(product, image.attname).name for product in products))
+            index_products(products)
+            product_facets.apply_on_commit(*products)
+        product_cache.invalidate(*{product.slug for product in products})
+        return len(products)
@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.shop.caching import product_cache
+from apps.shop.flashsale import flash_sales
+from apps.shop.models import Product, StockReservation
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product, available):
+        super().__init__(f"Only {available} of {product.name} left in stock")
+        self.product = product
+        self.available = available
+
+
+def get_reservation_ttl():
+    return timedelta(seconds=getattr(settings, "CART_RESERVATION_TTL", 15 * 60))
+
+
+def adjust_stock(product, delta):
+    """
+    Takes `delta` units of stock, or gives them back when negative. Returns False
+    when there is not enough stock, leaving it untouched.
+    """
+    if delta > 0 and not Product.objects.filter(pk=product.pk).take_stock(delta):
+        return False
+    if delta < 0:
+        Product.objects.unfiltered().filter(pk=product.pk).return_stock(-delta)
+    if delta:
+        product_cache.invalidate(product.slug)
+        flash_sales.track(product.slug, -delta)
+    return True
+
+
+def claim_reservation(user, product):
+    """
+    Deletes the reservation of `user` for `product` and returns its quantity. The
+    quantity only counts if this call deleted the row, so a concurrent expiry
+    or checkout cannot hand the same stock out twice.
+    """
+    reservation = StockReservation.objects.filter(user=user, product=product).first()
+    if reservation is None:
+        return 0
+    deleted, _ = StockReservation.objects.filter(pk=reservation.pk).delete()
+    return reservation.quantity if deleted else 0
+
+
+def available_for(user, product):
+    is_stock = Product.objects.filter(pk=product.pk).values_list("is_stock", flat=True).first() or 0
+    reserved = StockReservation.objects.filter(user=user, product=product).values_list("quantity", flat=True).first()
+    return max(is_stock, 0) + (reserved or 0)
+
+
+def reserve(user, product, quantity):
+    """
+    Holds `quantity` units of `product` for the cart of `user`, replacing what
+    was held before, and restarts the reservation TTL. Zero releases the hold.
+    """
+    with transaction.atomic():
+        held = claim_reservation(user, product)
+        if not adjust_stock(product, quantity - held):
+            release_expired(product=product)
+            if not adjust_stock(product, quantity - held):
+                available = available_for(user, product) + held
+                raise InsufficientStock(product, available)
+        if quantity:
+            StockReservation.objects.create(
+                user=user, product=product, quantity=quantity, expires_at=timezone.now() + get_reservation_ttl()
+            )
+
+
+def release(user, product):
+    with transaction.atomic():
+        adjust_stock(product, -claim_reservation(user, product))
+
+
+def checkout(user, orderitems):
+    """
+    Turns the reservations of the cart items into sold stock and takes whatever
+    was not reserved, all or nothing. Must run inside the checkout transaction.
+    """
+    for item in orderitems:
+        held = claim_reservation(user, item.product)
+        if not adjust_stock(item.product, item.quantity - held):
+            release_expired(product=item.product)
+            if not adjust_stock(item.product, item.quantity - held):
+                raise InsufficientStock(item.product, available_for(user, item.product) + held)
+
+
+def release_expired(batch_size=500, product=None, now=None):
+    """
+    Gives the stock of expired reservations back, `batch_size` reservations per
+    transaction, and returns how many were released.
+    """
+    now = now or timezone.now()
+    expired = StockReservation.objects.filter(expires_at__lte=now).order_by("expires_at")
+    if product is not None:
+        expired = expired.filter(product=product)
+    released = 0
+    while True:
+        batch = list(expired.values_list("pk", "product_id", "quantity")[:batch_size])
+        if not batch:
+            return released
+        returned = {}
+        with transaction.atomic():
+            for pk, product_id, quantity in batch:
+                deleted, _ = StockReservation.objects.filter(pk=pk).delete()
+                if deleted:
+                    released += 1
+                    returned[product_id] = returned.get(product_id, 0) + quantity
+            for product_id, quantity in returned.items():
+                Product.objects.unfiltered().filter(pk=product_id).return_stock(quantity)
+            slugs = dict(Product.objects.unfiltered().filter(pk__in=returned).values_list("id", "slug"))
+            product_cache.invalidate(*slugs.values())
+            for product_id, quantity in returned.items():
+                flash_sales.track(slugs[product_id], quantity)
+        if len(batch) < batch_size:
+            return released
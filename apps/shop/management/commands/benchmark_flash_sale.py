@@ -0,0 +1,125 @@
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.profiles.models import OrderItem
+from apps.shop.carts import carts
+from apps.shop.flashsale import flash_sales
+from apps.shop.models import Category, Product, StockReservation
+from apps.shop.views import CartView
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulates a burst of buyers adding one product to their carts at once, "
+        "first without and then with the flash sale gate, and reports p50/p99 "
+        "latency and how long the requests waited for database write locks. The "
+        "generated users and product are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=200)
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--stock", type=int, default=20)
+        parser.add_argument(
+            "--lock-wait", type=float, default=5.0,
+            help="Milliseconds after which a BEGIN or write statement counts as waiting for the lock",
+        )
+
+    def handle(self, *args, **options):
+        category, _ = Category.objects.get_or_create(
+            name="Benchmark category", defaults={"image": "category_images/bench.jpg"}
+        )
+        product = Product.objects.create(
+            name="Flash sale benchmark", desc="Benchmark product", price_current=1,
+            category=category, image1="product_images/bench.jpg", is_stock=options["stock"],
+        )
+        users = User.objects.bulk_create(
+            User(first_name="Bench", last_name="User", email=f"bench-flash-{index}@example.com")
+            for index in range(options["buyers"])
+        )
+        try:
+            for gated in (False, True):
+                OrderItem.objects.filter(product=product).delete()
+                for user in users:
+                    carts.clear(user.pk)
+                StockReservation.objects.filter(product=product).delete()
+                Product.objects.filter(pk=product.pk).update(is_stock=options["stock"])
+                product.refresh_from_db()
+                if gated:
+                    flash_sales.open(product)
+                self.run("flash sale" if gated else "direct", product, users, options)
+                flash_sales.close(product.slug)
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            Product.objects.unfiltered().filter(pk=product.pk).delete()
+
+    def run(self, label, product, users, options):
+        factory = APIRequestFactory()
+        view = CartView.as_view()
+        pending = list(users)
+        lock = threading.Lock()
+        latencies = []
+        statuses = {}
+        lock_waits = []
+        threshold = options["lock_wait"] / 1000
+
+        def time_writes(execute, sql, params, many, context):
+            if sql.lstrip().split(" ", 1)[0].upper() not in ("BEGIN", "INSERT", "UPDATE", "DELETE"):
+                return execute(sql, params, many, context)
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                if elapsed >= threshold:
+                    lock_waits.append(elapsed)
+
+        def buy():
+            try:
+                with connection.execute_wrapper(time_writes):
+                    while True:
+                        with lock:
+                            if not pending:
+                                return
+                            user = pending.pop()
+                        request = factory.post(
+                            "/shop/cart/", {"slug": product.slug, "quantity": 1}, format="json",
+                            SERVER_NAME="localhost",
+                        )
+                        force_authenticate(request, user=user)
+                        started = time.perf_counter()
+                        try:
+                            code = view(request).status_code
+                        except OperationalError:
+                            code = "locked"
+                        latencies.append(time.perf_counter() - started)
+                        with lock:
+                            statuses[code] = statuses.get(code, 0) + 1
+            finally:
+                close_old_connections()
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=buy) for _ in range(options["threads"])]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+        product.refresh_from_db()
+        self.stdout.write(
+            f"{label:>10}: {len(latencies)} requests in {elapsed:.2f}s, p50 {p50:.1f}ms, p99 {p99:.1f}ms, "
+            f"{len(lock_waits)} lock waits ({sum(lock_waits):.2f}s), responses {statuses}, "
+            f"stock left {product.is_stock}"
+        )
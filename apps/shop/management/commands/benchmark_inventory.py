@@ -0,0 +1,84 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, transaction
+
+from apps.profiles.models import OrderItem
+from apps.shop import inventory
+from apps.shop.models import Category, Product
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammers one product with concurrent single-unit checkouts from many threads "
+        "and reports checkouts/sec and whether any stock was oversold. The generated "
+        "users and product are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--stock", type=int, default=1000)
+        parser.add_argument("--attempts", type=int, default=100, help="Checkouts tried per thread")
+
+    def handle(self, *args, **options):
+        category, _ = Category.objects.get_or_create(
+            name="Benchmark category", defaults={"image": "category_images/bench.jpg"}
+        )
+        product = Product.objects.create(
+            name="Benchmark product", desc="Benchmark product", price_current=1,
+            category=category, image1="product_images/bench.jpg", is_stock=options["stock"],
+        )
+        users = [
+            User.objects.create(first_name="Bench", last_name="User", email=f"bench-inventory-{index}@example.com")
+            for index in range(options["threads"])
+        ]
+        try:
+            self.run(product, users, options["attempts"])
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            Product.objects.unfiltered().filter(pk=product.pk).delete()
+
+    def run(self, product, users, attempts):
+        sold = []
+        retries = []
+
+        def buy(user):
+            try:
+                for _ in range(attempts):
+                    item = OrderItem(user=user, product=product, quantity=1)
+                    while True:
+                        try:
+                            with transaction.atomic():
+                                inventory.checkout(user, [item])
+                            sold.append(1)
+                            break
+                        except inventory.InsufficientStock:
+                            break
+                        except OperationalError:
+                            retries.append(1)
+                            time.sleep(0.001)
+            finally:
+                close_old_connections()
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=buy, args=(user,)) for user in users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        initial = product.is_stock
+        product.refresh_from_db()
+        self.stdout.write(
+            f"{len(users)} threads: {len(sold)} checkouts in {elapsed:.2f}s "
+            f"({len(sold) / elapsed:,.0f}/s), {len(retries)} lock retries, stock left {product.is_stock}"
+        )
+        if len(sold) + product.is_stock != initial or product.is_stock < 0:
+            self.stdout.write(self.style.ERROR(f"Oversold: {len(sold)} sold out of {initial}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("No oversell"))
@@ -0,0 +1,109 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from apps.profiles.models import Order, OrderItem
+from apps.shop.models import Category, Product
+from apps.shop.serializers import (
+    OrderItemSerializer,
+    OrderItemValuesSerializer,
+    OrderSerializer,
+    OrderValuesSerializer,
+    ProductSerializer,
+    ProductValuesSerializer,
+)
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares rows/sec of the DRF serializers and their .values() based twins "
+        "on generated lists, page by page as the list endpoints do. The data is created "
+        "in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options["rows"], options["page_size"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, page_size, repeat):
+        user = User.objects.create(first_name="Bench", last_name="User", email="bench@example.com")
+        category = Category.objects.create(name="Benchmark category", image="category_images/bench.jpg")
+        products = Product.objects.bulk_create(
+            Product(
+                name=f"Product {index}",
+                slug=f"product-{index}",
+                desc="Benchmark product",
+                price_current=index % 1000 + 0.99,
+                category=category,
+                image1="product_images/bench.jpg",
+            )
+            for index in range(rows)
+        )
+        orders = Order.objects.bulk_create(
+            Order(user=user, tx_ref=f"BENCH{index}", full_name="Bench User") for index in range(rows)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(user=user, order=order, product=product, quantity=2)
+            for order, product in zip(orders, products)
+        )
+
+        context = {"request": APIRequestFactory().get("/", SERVER_NAME="localhost")}
+        cases = [
+            ("products", ProductSerializer, ProductValuesSerializer, Product.select.all()),
+            ("order items", OrderItemSerializer, OrderItemValuesSerializer, OrderItem.select.all()),
+            (
+                "orders",
+                OrderSerializer,
+                OrderValuesSerializer,
+                Order.objects.select_related("user").prefetch_related("orderitems__product"),
+            ),
+        ]
+        renderer = JSONRenderer()
+        for name, serializer_class, values_serializer_class, queryset in cases:
+            pages = [
+                queryset.order_by("-created_at", "-id")[offset:offset + page_size]
+                for offset in range(0, rows, page_size)
+            ]
+            before = after = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                expected = [
+                    renderer.render(serializer_class(page.all(), many=True, context=context).data)
+                    for page in pages
+                ]
+                elapsed = time.perf_counter() - start
+                before = elapsed if before is None else min(before, elapsed)
+
+                start = time.perf_counter()
+                values_serializer = values_serializer_class(context=context)
+                actual = [
+                    renderer.render(values_serializer.serialize(values_serializer.prepare(page.all())))
+                    for page in pages
+                ]
+                elapsed = time.perf_counter() - start
+                after = elapsed if after is None else min(after, elapsed)
+
+            same = "identical" if actual == expected else "DIFFERENT"
+            self.stdout.write(
+                f"{name:12} {rows} rows: serializer {rows / before:,.0f} rows/s, "
+                f"values {rows / after:,.0f} rows/s ({before / after:.1f}x, output {same})"
+            )
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.sellers.models import Seller
+from apps.shop.exporters import FORMATS, ProductExporter, parse_cursor
+from apps.shop.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams products ordered by updated_at and id as CSV or JSON Lines. "
+        "Pass the updated_at and id of the last exported row as --since and --after to resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o", help="Defaults to stdout")
+        parser.add_argument("--seller", help="Slug of the seller to export")
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--since")
+        parser.add_argument("--after")
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options["seller"]:
+            seller = Seller.objects.get_or_none(slug=options["seller"])
+            if not seller:
+                raise CommandError(f"Seller {options['seller']!r} does not exist")
+            queryset = queryset.filter(seller=seller)
+        try:
+            cursor = parse_cursor(options["since"], options["after"])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        chunks = ProductExporter(queryset, cursor=cursor).stream(options["format"], compress=options["gzip"])
+        if options["output"]:
+            with open(options["output"], "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
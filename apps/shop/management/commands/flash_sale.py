@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.shop.flashsale import flash_sales
+from apps.shop.models import Product
+
+
+class Command(BaseCommand):
+    help = "Opens, closes or shows the flash sale admission counter of a product."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=("open", "close", "status"))
+        parser.add_argument("slug")
+        parser.add_argument("--duration", type=int, help="Seconds the sale stays open")
+
+    def handle(self, *args, **options):
+        slug = options["slug"]
+        if options["action"] == "close":
+            flash_sales.close(slug)
+            self.stdout.write(self.style.SUCCESS(f"Closed the flash sale of {slug}"))
+            return
+        if options["action"] == "status":
+            remaining = flash_sales.remaining(slug)
+            if remaining is None:
+                self.stdout.write(f"{slug} is not on flash sale")
+            else:
+                self.stdout.write(f"{slug} is on flash sale, {remaining} tokens left")
+            return
+        product = Product.objects.get_or_none(slug=slug)
+        if product is None:
+            raise CommandError(f"No product with the slug {slug}")
+        flash_sales.open(product, duration=options["duration"])
+        self.stdout.write(self.style.SUCCESS(f"Opened a flash sale of {slug} with {product.is_stock} in stock"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.shop.carts import carts
+
+
+class Command(BaseCommand):
+    help = "Writes the carts changed in the cache since the last flush to OrderItem."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        flushed = carts.flush(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} carts"))
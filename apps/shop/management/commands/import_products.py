@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.sellers.models import Seller
+from apps.shop.importers import FORMATS, ProductImporter, detect_format
+
+
+class Command(BaseCommand):
+    help = "Imports products for a seller from a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--seller", required=True, help="Slug of the seller that owns the products")
+        parser.add_argument("--format", choices=FORMATS, help="Defaults to the file extension")
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        seller = Seller.objects.get_or_none(slug=options["seller"])
+        if not seller:
+            raise CommandError(f"Seller {options['seller']!r} does not exist")
+        file_format = options["format"] or detect_format(options["path"])
+        if file_format is None:
+            raise CommandError("Cannot detect the file format, pass --format")
+
+        importer = ProductImporter(seller, batch_size=options["batch_size"])
+        with open(options["path"], "rb") as file:
+            report = importer.import_file(file, file_format)
+
+        for error in report.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f"... {report.error_count - len(report.errors)} more errors")
+        self.stdout.write(self.style.SUCCESS(f"Imported {report.created} products, {report.error_count} rows failed"))
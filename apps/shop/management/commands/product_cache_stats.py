@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.shop.caching import product_cache
+
+
+class Command(BaseCommand):
+    help = "Prints the hit/miss/eviction counters of the product detail cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters afterwards")
+
+    def handle(self, *args, **options):
+        stats = product_cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups * 100 if lookups else 0
+        for name, value in stats.items():
+            self.stdout.write(f"{name}: {value}")
+        self.stdout.write(f"hit rate: {hit_rate:.1f}%")
+        if options["reset"]:
+            product_cache.reset_stats()
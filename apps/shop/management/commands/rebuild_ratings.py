@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from apps.shop.managers import RATING_STARS, rating_count_field
+from apps.shop.models import Product, Review
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized rating aggregates of every product from its reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        fields = ["rating_avg", "rating_count"] + [rating_count_field(star) for star in RATING_STARS]
+        histograms = {
+            row["product_id"]: row
+            for row in (
+                Review.objects
+                .values("product_id")
+                .annotate(**{
+                    rating_count_field(star): Count("id", filter=Q(rating=star))
+                    for star in RATING_STARS
+                })
+            )
+        }
+
+        updated = 0
+        batch = []
+        with transaction.atomic():
+            for product in Product.objects.unfiltered().only("id", *fields).iterator(chunk_size=batch_size):
+                row = histograms.get(product.id, {})
+                for star in RATING_STARS:
+                    setattr(product, rating_count_field(star), row.get(rating_count_field(star), 0))
+                product.rating_count = sum(product.rating_histogram.values())
+                rating_sum = sum(star * count for star, count in product.rating_histogram.items())
+                product.rating_avg = round(rating_sum / product.rating_count, 2) if product.rating_count else 0
+                batch.append(product)
+                if len(batch) >= batch_size:
+                    Product.objects.unfiltered().bulk_update(batch, fields)
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                Product.objects.unfiltered().bulk_update(batch, fields)
+                updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ratings for {updated} products"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.shop.search import fts_enabled, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text product search index from the products table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not fts_enabled():
+            self.stdout.write("The database backend has no FTS5 index, search uses the fallback")
+            return
+        indexed = rebuild_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} products"))
@@ -1,6 +1,151 @@
-from django.db import models
+import uuid
 
+from django.db import connection, transaction
+from django.db.models import Case, Exists, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
 
-class ProductManager(models.Manager):
+from apps.common.managers import IsDeletedManager, IsDeletedQuerySet
+from apps.shop.caching import product_cache
+
+RATING_STARS = (1, 2, 3, 4, 5)
+
+
+def rating_count_field(star):
+    return f"rating_{star}_count"
+
+
+class ProductQuerySet(IsDeletedQuerySet):
+    def update_rating(self, removed=None, added=None):
+        """
+        Incrementally moves one review between the rating counters of the products
+        in the queryset. `removed`/`added` are the old and new star values (None when
+        the review did not count before or does not count anymore).
+        """
+        if removed == added:
+            return
+        deltas = {}
+        if removed is not None:
+            deltas[rating_count_field(removed)] = -1
+            deltas["rating_count"] = deltas.get("rating_count", 0) - 1
+        if added is not None:
+            deltas[rating_count_field(added)] = 1
+            deltas["rating_count"] = deltas.get("rating_count", 0) + 1
+        changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        with transaction.atomic():
+            self.update(**changes, updated_at=timezone.now())
+            self.update(rating_avg=self.rating_avg_expression())
+
+    def replace_rating(self, previous, added):
+        """
+        Like `update_rating()` for a review that is written over: the star it
+        counted before is read by the UPDATE itself from `previous`, a queryset
+        of that review while it is live, instead of being loaded first.
+        """
+
+        def counted(reviews):
+            return Case(When(Exists(reviews), then=Value(1)), default=Value(0), output_field=IntegerField())
+
+        changes = {
+            rating_count_field(star): (
+                F(rating_count_field(star)) - counted(previous.filter(rating=star)) + int(star == added)
+            )
+            for star in RATING_STARS
+        }
+        changes["rating_count"] = F("rating_count") - counted(previous) + 1
+        with transaction.atomic():
+            self.update(**changes, updated_at=timezone.now())
+            self.update(rating_avg=self.rating_avg_expression())
+
+    def take_stock(self, quantity):
+        """
+        Decrements `is_stock` by `quantity` only where enough is left, in one
+        conditional UPDATE. Returns the number of products updated.
+        """
+        return self.filter(is_stock__gte=quantity).update(
+            is_stock=F("is_stock") - quantity, updated_at=timezone.now()
+        )
+
+    def return_stock(self, quantity):
+        return self.update(is_stock=F("is_stock") + quantity, updated_at=timezone.now())
+
+    @staticmethod
+    def rating_avg_expression():
+        rating_sum = sum(F(rating_count_field(star)) * star for star in RATING_STARS)
+        return Case(
+            When(rating_count=0, then=Value(0.0)),
+            default=Round(
+                Cast(rating_sum, FloatField()) / F("rating_count"), 2
+            ),
+            output_field=FloatField(),
+        )
+
+
+class ActiveProductManager(IsDeletedManager):
+    queryset_class = ProductQuerySet
+
+
+class ProductManager(ActiveProductManager):
     def get_queryset(self):
         return super().get_queryset().select_related("category", "seller", "seller__user")
+
+
+class ReviewManager(IsDeletedManager):
+    def upsert(self, user, product, **values):
+        """
+        Writes the review of `user` for `product`, creating it, overwriting it or
+        bringing it back from a soft delete, with one INSERT ... ON CONFLICT
+        against `review_user_product_uniq`, and returns `(review, created)` from
+        the row the statement returns. The statement skips `Review.save()` and its
+        signals, so the rating counters of the product move in the same
+        transaction, after the product row is locked, and its cached detail is
+        evicted here. Backends without conflict targets fall back to
+        `update_or_create()`.
+        """
+        if connection.vendor not in ("sqlite", "postgresql"):
+            return self.unfiltered().update_or_create(
+                user=user, product=product, defaults={**values, "is_deleted": False, "deleted_at": None}
+            )
+
+        meta = self.model._meta
+        now = timezone.now()
+        review_id = uuid.uuid4()
+        row = {
+            "id": review_id,
+            "created_at": now,
+            "updated_at": now,
+            "is_deleted": False,
+            "deleted_at": None,
+            "user": user.pk,
+            "product": product.pk,
+            **values,
+        }
+        # A new row takes the model defaults; an existing one keeps what was not sent.
+        updates = [name for name in row if name not in ("id", "created_at", "user", "product")]
+        for field in meta.concrete_fields:
+            if field.name not in row and field.has_default():
+                row[field.name] = field.get_default()
+        fields = [meta.get_field(name) for name in row]
+        params = [field.get_db_prep_save(value, connection) for field, value in zip(fields, row.values())]
+        quote = connection.ops.quote_name
+        updates = [quote(meta.get_field(name).column) for name in updates]
+        sql = (
+            f"INSERT INTO {quote(meta.db_table)} ({', '.join(quote(field.column) for field in fields)}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            f"ON CONFLICT ({quote('user_id')}, {quote('product_id')}) "
+            f"DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in updates)} "
+            f"RETURNING {', '.join(quote(field.column) for field in meta.concrete_fields)}"
+        )
+        products = type(product).objects.unfiltered().filter(pk=product.pk)
+        reviews = self.unfiltered().filter(user=user, product=product)
+        with transaction.atomic():
+            # Serializes writers of the product, so the review the counters take out
+            # is the one the upsert overwrites (SQLite locks the database already).
+            list(products.select_for_update().values_list("pk"))
+            rating = values.get("rating")
+            if rating is None:
+                rating = reviews.values_list("rating", flat=True).first() or row["rating"]
+            products.replace_rating(reviews.filter(is_deleted=False), rating)
+            review = next(iter(self.raw(sql, params)))
+            product_cache.invalidate(product.slug)
+        return review, review.pk == review_id
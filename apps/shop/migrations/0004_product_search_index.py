@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE shop_product_fts USING fts5("
+        "name, \"desc\", tokenize='unicode61 remove_diacritics 2')"
+    )
+    # Makes `ORDER BY rank` use BM25 with the name weighted above the description.
+    schema_editor.execute(
+        "INSERT INTO shop_product_fts (shop_product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE shop_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0003_query_shape_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductSearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_document",
+                        to="shop.product",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0006_stock_reservations"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                condition=models.Q(("is_deleted", False)),
+                fields=["product", "rating", "created_at", "id"],
+                name="review_product_rating_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+RATING_STARS = (1, 2, 3, 4, 5)
+
+
+def drop_duplicate_reviews(apps, schema_editor):
+    """
+    Keeps one review per user and product, the live one written last, and
+    recounts the ratings of the products that lost a counted review.
+    """
+    Review = apps.get_model("shop", "Review")
+    Product = apps.get_model("shop", "Product")
+    seen = set()
+    duplicates = []
+    products = set()
+    reviews = Review.objects.order_by("is_deleted", "-updated_at")
+    for pk, user_id, product_id, is_deleted in reviews.values_list("pk", "user_id", "product_id", "is_deleted").iterator():
+        if (user_id, product_id) in seen:
+            duplicates.append(pk)
+            if not is_deleted:
+                products.add(product_id)
+        seen.add((user_id, product_id))
+    Review.objects.filter(pk__in=duplicates).delete()
+
+    for product in Product.objects.filter(pk__in=products):
+        counts = Review.objects.filter(product=product, is_deleted=False).aggregate(
+            **{f"rating_{star}_count": Count("id", filter=Q(rating=star)) for star in RATING_STARS}
+        )
+        for field, count in counts.items():
+            setattr(product, field, count)
+        product.rating_count = sum(counts.values())
+        rating_sum = sum(star * counts[f"rating_{star}_count"] for star in RATING_STARS)
+        product.rating_avg = round(rating_sum / product.rating_count, 2) if product.rating_count else 0
+        product.save(update_fields=["rating_avg", "rating_count", *counts])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shop", "0007_review_rating_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_reviews, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="review",
+            name="review_user_product_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="review",
+            constraint=models.UniqueConstraint(
+                fields=("user", "product"), name="review_user_product_uniq"
+            ),
+        ),
+    ]
@@ -2,12 +2,13 @@ from xxlimited_35 import Null
 
 from autoslug import AutoSlugField
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q
 
 from apps.common.models import BaseModel, IsDeletedModel
 from apps.profiles.manages import OrderItemManager
 from apps.sellers.models import Seller
-from apps.shop.managers import ProductManager
+from apps.shop.managers import ActiveProductManager, ProductManager, RATING_STARS, ReviewManager, rating_count_field
 
 User = get_user_model()
 
@@ -40,16 +41,79 @@ class Product(IsDeletedModel):
 
     is_stock = models.IntegerField(default=5)
 
-    objects = models.Manager()
+    rating_avg = models.FloatField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+
+    objects = ActiveProductManager()
     select = ProductManager()
 
     image1 = models.ImageField(upload_to="product_images/")
     image2 = models.ImageField(upload_to="product_images/", blank=True)
     image3 = models.ImageField(upload_to="product_images/", blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["created_at", "id"],
+                condition=Q(is_deleted=False),
+                name="product_active_created_idx",
+            ),
+            models.Index(
+                fields=["category", "created_at", "id"],
+                condition=Q(is_deleted=False),
+                name="product_category_created_idx",
+            ),
+            models.Index(
+                fields=["seller", "created_at", "id"],
+                condition=Q(is_deleted=False),
+                name="product_seller_created_idx",
+            ),
+            models.Index(
+                fields=["price_current", "id"],
+                condition=Q(is_deleted=False),
+                name="product_active_price_idx",
+            ),
+            models.Index(fields=["updated_at"], name="product_updated_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, rating_count_field(star)) for star in RATING_STARS}
+
+
+class ProductSearchDocument(models.Model):
+    """Maps a product to the integer rowid of its row in the full-text index."""
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, related_name="search_document"
+    )
+
+
+class StockReservation(BaseModel):
+    """
+    Stock held for a cart item. The quantity is already taken off
+    `Product.is_stock` and goes back when the reservation expires.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="stock_reservations")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_reservations")
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "product"], name="stock_reservation_user_product_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id}"
+
 
 class Review(IsDeletedModel):
     RATING_CHOICES = ((1, 1), (2, 2), (3, 3), (4, 4), (5, 5))
@@ -63,3 +127,52 @@ class Review(IsDeletedModel):
     )
     rating = models.IntegerField(choices=RATING_CHOICES, default=5)
     text = models.TextField()
+
+    objects = ReviewManager()
+
+    class Meta:
+        constraints = [
+            # Also covers soft-deleted reviews, which the upsert brings back.
+            models.UniqueConstraint(fields=["user", "product"], name="review_user_product_uniq"),
+        ]
+        indexes = [
+            models.Index(
+                fields=["product", "created_at", "id"],
+                condition=Q(is_deleted=False),
+                name="review_product_created_idx",
+            ),
+            models.Index(
+                fields=["product", "rating", "created_at", "id"],
+                condition=Q(is_deleted=False),
+                name="review_product_rating_idx",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._counted_rating = instance.counted_rating
+        return instance
+
+    @property
+    def counted_rating(self):
+        if self.is_deleted:
+            return None
+        return self.rating
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.sync_product_rating(self.counted_rating)
+
+    def hard_delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self.sync_product_rating(None)
+            super().hard_delete(*args, **kwargs)
+
+    def sync_product_rating(self, rating):
+        previous = getattr(self, "_counted_rating", None)
+        Product.objects.unfiltered().filter(pk=self.product_id).update_rating(
+            removed=previous, added=rating
+        )
+        self._counted_rating = rating
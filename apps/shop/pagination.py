@@ -0,0 +1,44 @@
+from rest_framework.pagination import LimitOffsetPagination
+
+from apps.common.pagination import KeysetPagination
+
+
+class ProductPagination(KeysetPagination):
+    orderings = {
+        **KeysetPagination.orderings,
+        "price_current": ("price_current", "id"),
+        "-price_current": ("-price_current", "-id"),
+    }
+
+
+class ReviewPagination(KeysetPagination):
+    """
+    Pages of the reviews of one product. The response opens with the product's
+    `rating` summary, which `ReviewView` reads from the rating counters of the
+    product row.
+    """
+    orderings = {
+        **KeysetPagination.orderings,
+        "rating": ("rating", "created_at", "id"),
+        "-rating": ("-rating", "-created_at", "-id"),
+    }
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"] = {
+            "rating": {
+                "type": "object",
+                "properties": {
+                    "average": {"type": "number", "example": 4.5},
+                    "count": {"type": "integer", "example": 12},
+                    "histogram": {"type": "object", "additionalProperties": {"type": "integer"}},
+                },
+            },
+            **response_schema["properties"],
+        }
+        return response_schema
+
+
+class SearchPagination(LimitOffsetPagination):
+    default_limit = 20
+    max_limit = 100
@@ -1,22 +1,21 @@
 from rest_framework import permissions
 from rest_framework.permissions import BasePermission
 
-from apps.shop.models import Review
-
 
 class IsReviewer(BasePermission):
+    """
+    Anyone may read reviews; buyers write their own. The object check runs on
+    the row returned by the review upsert, so it needs no query of its own.
+    """
+
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return False
+        return request.user.is_authenticated and (
+            request.user.account_type != 'SELLER' or request.user.is_staff
+        )
 
     def has_object_permission(self, request, view, obj):
-        is_review = Review.objects.filter(user=request.user, product=obj.product).exists()
-        if (
-                obj.user == request.user and
-                request.user.is_authenticated and
-                request.user.seller.account_type != 'SELLER' and
-                not is_review
-        ) or request.user.is_staff:
+        if request.method in permissions.SAFE_METHODS:
             return True
-        return False
+        return obj.user_id == request.user.id or request.user.is_staff
@@ -0,0 +1,142 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from apps.shop.models import Product, ProductSearchDocument
+
+FTS_TABLE = "shop_product_fts"
+
+token_re = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_enabled():
+    return connection.vendor == "sqlite"
+
+
+def get_max_results():
+    return getattr(settings, "PRODUCT_SEARCH_MAX_RESULTS", 1000)
+
+
+def build_match_query(query):
+    """
+    Turns free user input into a safe FTS5 query: every word is quoted (so FTS
+    operators in the input are not interpreted) and the last one is a prefix term.
+    """
+    tokens = token_re.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def index_product(product):
+    if not fts_enabled():
+        return
+    if product.is_deleted:
+        remove_product(product.pk)
+        return
+    document, _ = ProductSearchDocument.objects.get_or_create(product_id=product.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [document.pk])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, "desc") VALUES (%s, %s, %s)',
+            [document.pk, product.name, product.desc],
+        )
+
+
+def index_products(products):
+    """Indexes freshly created products in one go, e.g. after `bulk_create()`."""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        _index_batch(cursor, [(product.pk, product.name, product.desc) for product in products if not product.is_deleted])
+
+
+def remove_product(product_id):
+    if not fts_enabled():
+        return
+    document = ProductSearchDocument.objects.filter(product_id=product_id).first()
+    if document is None:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [document.pk])
+    document.delete()
+
+
+def rebuild_index(batch_size=1000):
+    if not fts_enabled():
+        return 0
+    indexed = 0
+    with transaction.atomic():
+        ProductSearchDocument.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            products = Product.objects.values_list("id", "name", "desc").iterator(chunk_size=batch_size)
+            batch = []
+            for row in products:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    indexed += _index_batch(cursor, batch)
+                    batch = []
+            if batch:
+                indexed += _index_batch(cursor, batch)
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+def _index_batch(cursor, rows):
+    documents = ProductSearchDocument.objects.bulk_create(
+        [ProductSearchDocument(product_id=product_id) for product_id, _, _ in rows]
+    )
+    cursor.executemany(
+        f'INSERT INTO {FTS_TABLE} (rowid, name, "desc") VALUES (%s, %s, %s)',
+        [(document.pk, name, desc) for document, (_, name, desc) in zip(documents, rows)],
+    )
+    return len(rows)
+
+
+def search_products(queryset, query):
+    """
+    Returns the products of `queryset` matching `query`, most relevant first.
+    SQLite ranks with FTS5 BM25 in the same query as the filters of
+    `queryset`, so the result limit applies to the filtered matches; other
+    backends fall back to a name-first `icontains` match.
+    """
+    limit = get_max_results()
+    if fts_enabled():
+        match = build_match_query(query)
+        if match is None:
+            return []
+        documents = ProductSearchDocument._meta.db_table
+        products = connection.ops.quote_name(Product._meta.db_table)
+        matching = RawSQL(
+            f"SELECT document.product_id FROM {FTS_TABLE} "
+            f"JOIN {documents} document ON document.id = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH %s",
+            [match],
+        )
+        # Looked up by rowid, so each matching product reads only its own index entry.
+        rank = RawSQL(
+            f"SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = "
+            f"(SELECT document.id FROM {documents} document WHERE document.product_id = {products}.id)",
+            [match],
+        )
+        return list(queryset.filter(id__in=matching).annotate(search_rank=rank).order_by("search_rank")[:limit])
+
+    words = token_re.findall(query)
+    if not words:
+        return []
+    name_match = Q()
+    text_match = Q()
+    for word in words:
+        name_match &= Q(name__icontains=word)
+        text_match &= Q(name__icontains=word) | Q(desc__icontains=word)
+    return list(
+        queryset
+        .filter(text_match)
+        .annotate(search_rank=Case(When(name_match, then=Value(0)), default=Value(1), output_field=IntegerField()))
+        .order_by("search_rank", "-created_at")[:limit]
+    )
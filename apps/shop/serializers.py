@@ -1,13 +1,32 @@
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
-from apps.profiles.models import OrderItem, Order
+from apps.common.serializers import DynamicFieldsMixin, ValuesSerializer
+from apps.profiles.models import PAYMENT_STATUS_CHOICES, OrderItem, Order, SellerOrder
 from apps.profiles.serializers import ShippingAddressSerializer
 from apps.sellers.models import Seller
+from apps.shop.analytics import DIMENSIONS, INTERVALS
+from apps.shop.managers import RATING_STARS, rating_count_field
 from apps.shop.models import Category, Product, Review
+from apps.shop.thumbnails import thumbnails
+
+
+@extend_schema_field(OpenApiTypes.OBJECT)
+class ThumbnailsField(serializers.Field):
+    """URLs of the resized variants of an image field, as `{format: {width: url}}`."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return thumbnails.describe(str(value), self.context.get('request'))
 
 
 class CategorySerializer(serializers.ModelSerializer):
+    image_thumbnails = ThumbnailsField(source='image')
+
     class Meta:
         model = Category
         fields = '__all__'
@@ -23,15 +42,40 @@ class SellerShopSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug', 'avatar')
 
 
-class ProductSerializer(serializers.ModelSerializer):
-    rating = serializers.SerializerMethodField()
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    rating = serializers.FloatField(source="rating_avg", read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    image1_thumbnails = ThumbnailsField(source='image1')
+    image2_thumbnails = ThumbnailsField(source='image2')
+    image3_thumbnails = ThumbnailsField(source='image3')
 
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = (
+            'rating_avg',
+            'rating_1_count',
+            'rating_2_count',
+            'rating_3_count',
+            'rating_4_count',
+            'rating_5_count',
+        )
+        read_only_fields = ('rating_count',)
+        expandable_fields = {
+            'seller': SellerShopSerializer,
+            'category': CategorySerializer,
+        }
+
+
+class ProductValuesSerializer(ValuesSerializer):
+    serializer_class = ProductSerializer
+    # price_current is a pagination key, so cursors need it in sparse rows too.
+    extra_lookups = ('id', 'created_at', 'price_current')
+    computed_fields = {
+        'rating_histogram': tuple(rating_count_field(star) for star in RATING_STARS),
+    }
 
-    def get_rating(self, obj):
-        return sum([review for review in obj.product_reviews]) / len(obj.product_reviews)
+    def compute_rating_histogram(self, row):
+        return {str(star): row[rating_count_field(star)] for star in RATING_STARS}
 
 
 class CreateProductSerializer(serializers.ModelSerializer):
@@ -69,13 +113,37 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ('product', 'quantity', 'total')
 
 
+class OrderItemValuesSerializer(ValuesSerializer):
+    serializer_class = OrderItemSerializer
+    computed_fields = {'total': ('line_total', 'product__price_current', 'quantity')}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.total_field = self.decimal_converter(OrderItemSerializer().fields['total'])
+
+    def compute_total(self, row):
+        if row['line_total'] is not None:
+            return self.total_field(row['line_total'])
+        return self.total_field(row['product__price_current'] * row['quantity'])
+
+
 class ToggleCartItemSerializer(serializers.Serializer):
     slug = serializers.SlugField()
     quantity = serializers.IntegerField(min_value=0)
 
 
+class CartBatchSerializer(serializers.Serializer):
+    items = ToggleCartItemSerializer(many=True, allow_empty=False, max_length=100)
+
+    def validate_items(self, items):
+        slugs = [item['slug'] for item in items]
+        if len(set(slugs)) != len(slugs):
+            raise serializers.ValidationError("Each product can only be listed once")
+        return items
+
+
 class CheckoutSerializer(serializers.Serializer):
-    shipping_id = serializers.UUIDField
+    shipping_id = serializers.UUIDField()
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -83,12 +151,6 @@ class OrderSerializer(serializers.ModelSerializer):
     last_name = serializers.CharField(source='user.last_name')
     email = serializers.EmailField(source='user.email')
     shipping_details = serializers.SerializerMethodField()
-    subtotal = serializers.DecimalField(
-        max_digits=100, decimal_places=2, source='get_cart_subtotal'
-    )
-    total = serializers.DecimalField(
-        max_digits=100, decimal_places=2, source='get_cart_total'
-    )
 
     @extend_schema_field(ShippingAddressSerializer)
     def get_shipping_details(self, obj):
@@ -107,13 +169,68 @@ class OrderSerializer(serializers.ModelSerializer):
         )
 
 
+class OrderValuesSerializer(ValuesSerializer):
+    serializer_class = OrderSerializer
+    computed_fields = {
+        'shipping_details': tuple(ShippingAddressSerializer.Meta.fields),
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shipping_plan = self.compile(ShippingAddressSerializer(), Order, '')
+
+    def compute_shipping_details(self, row):
+        return {name: accessor(row) for name, accessor in self.shipping_plan}
+
+
+class SellerOrderSerializer(serializers.ModelSerializer):
+    tx_ref = serializers.CharField(source='order.tx_ref')
+    first_name = serializers.CharField(source='order.user.first_name')
+    last_name = serializers.CharField(source='order.user.last_name')
+    email = serializers.EmailField(source='order.user.email')
+    shipping_details = serializers.SerializerMethodField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, source='order.total')
+
+    @extend_schema_field(ShippingAddressSerializer)
+    def get_shipping_details(self, obj):
+        return ShippingAddressSerializer(obj.order).data
+
+    class Meta:
+        model = SellerOrder
+        fields = (
+            'tx_ref',
+            'first_name',
+            'last_name',
+            'email',
+            'shipping_details',
+            'item_count',
+            'subtotal',
+            'total',
+            'status',
+        )
+
+
+class SellerOrderValuesSerializer(ValuesSerializer):
+    serializer_class = SellerOrderSerializer
+    computed_fields = {
+        'shipping_details': tuple(f'order__{field}' for field in ShippingAddressSerializer.Meta.fields),
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shipping_plan = self.compile(ShippingAddressSerializer(), Order, 'order__')
+
+    def compute_shipping_details(self, row):
+        return {name: accessor(row) for name, accessor in self.shipping_plan}
+
+
 class CheckItemOrderSerializer(serializers.ModelSerializer):
     product = ProductSerializer()
     total = serializers.FloatField(source='get_total')
 
     class Meta:
         model = OrderItem
-        fields = ('product', 'quantity', 'total')
+        fields = ('product', 'quantity', 'unit_price', 'total')
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -122,7 +239,71 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ('user', 'product', 'rating', 'created_at', 'text')
 
 
+class ProductRatingSerializer(serializers.ModelSerializer):
+    average = serializers.FloatField(source='rating_avg')
+    count = serializers.IntegerField(source='rating_count')
+    histogram = serializers.DictField(source='rating_histogram', child=serializers.IntegerField())
+
+    class Meta:
+        model = Product
+        fields = ('average', 'count', 'histogram')
+
+
 class CreateReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ('rating', 'text')
+
+
+class SalesAnalyticsQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    group_by = serializers.ChoiceField(choices=DIMENSIONS, default='category')
+    interval = serializers.ChoiceField(choices=INTERVALS, default='day')
+    percentile = serializers.ListField(
+        child=serializers.FloatField(min_value=0, max_value=100), required=False, max_length=10
+    )
+    category = serializers.SlugField(required=False)
+    seller = serializers.SlugField(required=False)
+    country = serializers.CharField(required=False)
+    payment_status = serializers.ChoiceField(choices=PAYMENT_STATUS_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': "Must not be after end"})
+        attrs['percentile'] = tuple(attrs.get('percentile') or (50, 90, 99))
+        return attrs
+
+
+class SalesAnalyticsFiguresSerializer(serializers.Serializer):
+    gmv = serializers.DecimalField(max_digits=16, decimal_places=2)
+    units = serializers.IntegerField()
+    orders = serializers.IntegerField()
+
+
+class SalesAnalyticsGroupSerializer(SalesAnalyticsFiguresSerializer):
+    key = serializers.CharField(allow_null=True)
+    order_value = serializers.DictField(child=serializers.DecimalField(max_digits=16, decimal_places=2, allow_null=True))
+
+
+class SalesAnalyticsTotalsSerializer(SalesAnalyticsFiguresSerializer):
+    order_value = serializers.DictField(child=serializers.DecimalField(max_digits=16, decimal_places=2, allow_null=True))
+
+
+class SalesAnalyticsPeriodSerializer(SalesAnalyticsFiguresSerializer):
+    period = serializers.DateField()
+
+
+class SalesSnapshotSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    built_at = serializers.DateTimeField()
+    lines = serializers.IntegerField()
+
+
+class SalesAnalyticsSerializer(serializers.Serializer):
+    snapshot = SalesSnapshotSerializer()
+    totals = SalesAnalyticsTotalsSerializer()
+    group_by = serializers.CharField()
+    groups = SalesAnalyticsGroupSerializer(many=True)
+    interval = serializers.CharField()
+    series = SalesAnalyticsPeriodSerializer(many=True)
@@ -0,0 +1,90 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.sellers.models import Seller
+from apps.shop.caching import product_cache
+from apps.shop.carts import carts
+from apps.shop.facets import product_facets
+from apps.shop.models import Category, Product, Review
+from apps.shop.search import index_product, remove_product
+from apps.shop.thumbnails import thumbnails
+
+SEARCH_FIELDS = {"name", "desc", "is_deleted"}
+
+
+@receiver(post_save, sender=Product)
+def sync_product_search_document(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_FIELDS.intersection(update_fields):
+        return
+    index_product(instance)
+
+
+@receiver(post_save, sender=Product)
+def sync_product_facets(sender, instance, **kwargs):
+    product_facets.apply_on_commit(instance)
+
+
+@receiver(post_save, sender=Product)
+def schedule_product_thumbnails(sender, instance, **kwargs):
+    thumbnails.schedule_on_commit(instance.image1.name, instance.image2.name, instance.image3.name)
+
+
+@receiver(post_save, sender=Category)
+def schedule_category_thumbnails(sender, instance, **kwargs):
+    thumbnails.schedule_on_commit(instance.image.name)
+
+
+@receiver(pre_delete, sender=Product)
+def remove_product_search_document(sender, instance, **kwargs):
+    remove_product(instance.pk)
+
+
+@receiver(pre_delete, sender=Product)
+def remove_product_facets(sender, instance, **kwargs):
+    product_facets.remove_on_commit(instance.pk)
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_slug(sender, instance, **kwargs):
+    instance._cached_slug = None
+    if not instance._state.adding:
+        instance._cached_slug = (
+            Product.objects.unfiltered().filter(pk=instance.pk).values_list("slug", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    product_cache.invalidate(instance.slug, getattr(instance, "_cached_slug", None))
+
+
+@receiver(pre_delete, sender=Product)
+def evict_deleted_product(sender, instance, **kwargs):
+    product_cache.invalidate(instance.slug)
+
+
+@receiver(post_save, sender=Product)
+@receiver(pre_delete, sender=Product)
+def invalidate_cart_product(sender, instance, **kwargs):
+    carts.invalidate_products(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviewed_product(sender, instance, **kwargs):
+    product_cache.invalidate(
+        Product.objects.unfiltered().filter(pk=instance.product_id).values_list("slug", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Seller)
+@receiver(pre_delete, sender=Seller)
+def invalidate_seller_products(sender, instance, **kwargs):
+    products = dict(Product.objects.unfiltered().filter(seller=instance).values_list("id", "slug"))
+    product_cache.invalidate(*products.values())
+    carts.invalidate_products(*products)
+
+
+@receiver(post_save, sender=Category)
+def invalidate_category_products(sender, instance, **kwargs):
+    product_cache.invalidate(*Product.objects.filter(category=instance).values_list("slug", flat=True))
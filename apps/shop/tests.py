@@ -1,3 +1,1165 @@
-from django.test import TestCase
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, close_old_connections, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.profiles.models import Order, OrderItem, ShippingAddress
+from apps.sellers.models import Seller
+from apps.shop import inventory
+from apps.shop.analytics import sales_snapshots
+from apps.shop.caching import product_cache
+from apps.shop.carts import carts
+from apps.shop.facets import FacetIndex, product_facets
+from apps.shop.flashsale import flash_sales
+from apps.shop.models import Category, Product, ProductSearchDocument, Review, StockReservation
+from apps.shop.search import build_match_query
+from apps.shop.serializers import (
+    OrderItemSerializer,
+    OrderItemValuesSerializer,
+    OrderSerializer,
+    OrderValuesSerializer,
+    ProductSerializer,
+    ProductValuesSerializer,
+)
+from apps.shop.thumbnails import thumbnails
+from apps.shop.views import ProductsView
+
+User = get_user_model()
+
+
+def create_user(email="buyer@example.com", **extra_fields):
+    return User.objects.create_user(
+        first_name="Test", last_name="User", email=email, password="Str0ng-pass!", **extra_fields
+    )
+
+
+def create_seller(user):
+    return Seller.objects.create(
+        user=user,
+        business_name=f"{user.email} store",
+        inn_identification_number="123",
+        phone_number="123",
+        business_description="desc",
+        business_address="addr",
+        city="city",
+        postal_code="123",
+        bank_name="bank",
+        bank_bic_number="123",
+        bank_account_number="123",
+        bank_routing_number="123",
+        is_approved=True,
+    )
+
+
+def create_product(category=None, seller=None, **extra_fields):
+    if category is None:
+        category, _ = Category.objects.get_or_create(
+            name="Category", defaults={"image": "category_images/test.jpg"}
+        )
+    data = {
+        "name": "Product",
+        "desc": "desc",
+        "price_current": 10,
+        "image1": "product_images/test.jpg",
+    }
+    data.update(extra_fields)
+    return Product.objects.create(category=category, seller=seller, **data)
+
+
+class ProductRatingTestCase(TestCase):
+    def setUp(self):
+        self.product = create_product()
+        self.users = [create_user(f"user{i}@example.com") for i in range(3)]
+
+    def assertRating(self, avg, count, histogram):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_avg, avg)
+        self.assertEqual(self.product.rating_count, count)
+        self.assertEqual(self.product.rating_histogram, histogram)
+
+    def test_create_update_and_delete_reviews(self):
+        first = Review.objects.create(user=self.users[0], product=self.product, rating=5, text="")
+        second = Review.objects.create(user=self.users[1], product=self.product, rating=2, text="")
+        self.assertRating(3.5, 2, {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+
+        second.rating = 4
+        second.save()
+        self.assertRating(4.5, 2, {1: 0, 2: 0, 3: 0, 4: 1, 5: 1})
+
+        Review.objects.update_or_create(
+            user=self.users[0], product=self.product, defaults={"rating": 1}
+        )
+        self.assertRating(2.5, 2, {1: 1, 2: 0, 3: 0, 4: 1, 5: 0})
+
+        second.delete()
+        self.assertRating(1.0, 1, {1: 1, 2: 0, 3: 0, 4: 0, 5: 0})
+
+        Review.objects.get(pk=first.pk).hard_delete()
+        self.assertRating(0.0, 0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+
+    def test_rebuild_ratings_command(self):
+        Review.objects.create(user=self.users[0], product=self.product, rating=3, text="")
+        Review.objects.create(user=self.users[1], product=self.product, rating=4, text="")
+        Product.objects.update(rating_avg=0, rating_count=0, rating_3_count=0, rating_4_count=0)
+
+        call_command("rebuild_ratings", stdout=open("/dev/null", "w"))
+        self.assertRating(3.5, 2, {1: 0, 2: 0, 3: 1, 4: 1, 5: 0})
+
+
+class ReviewListTestCase(TestCase):
+    def setUp(self):
+        self.product = create_product()
+        self.other = create_product(name="Other")
+        self.users = [create_user(f"user{i}@example.com") for i in range(5)]
+        for user, rating in zip(self.users, (5, 3, 5, 1, 4)):
+            Review.objects.create(user=user, product=self.product, rating=rating, text="")
+        Review.objects.create(user=self.users[0], product=self.other, rating=2, text="")
+        self.url = f"/shop/product/{self.product.slug}/reviews/"
+
+    def test_public_listing_with_rating_summary(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().get(self.url, {"page_size": 2, "sort": "-rating"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 2)
+        self.assertFalse([query for query in queries if "COUNT(" in query["sql"] or "AVG(" in query["sql"]])
+        self.assertEqual(
+            response.data["rating"],
+            {"average": 3.6, "count": 5, "histogram": {"1": 1, "2": 0, "3": 1, "4": 1, "5": 2}},
+        )
+
+        ratings = [review["rating"] for review in response.data["results"]]
+        next_url = response.data["next"]
+        while next_url:
+            response = APIClient().get(next_url)
+            ratings += [review["rating"] for review in response.data["results"]]
+            next_url = response.data["next"]
+        self.assertEqual(ratings, [5, 5, 4, 3, 1])
+
+    def test_product_without_reviews(self):
+        response = APIClient().get(f"/shop/product/{self.other.slug}/reviews/?sort=rating")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([review["rating"] for review in response.data["results"]], [2])
+        Review.objects.get(product=self.other).delete()
+        response = APIClient().get(f"/shop/product/{self.other.slug}/reviews/")
+        self.assertEqual(response.data["results"], [])
+        self.assertEqual(response.data["rating"]["count"], 0)
+        self.assertEqual(APIClient().get("/shop/product/missing/reviews/").status_code, 404)
+
+
+class ReviewUpsertTestCase(TestCase):
+    def setUp(self):
+        self.product = create_product()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/shop/product/{self.product.slug}/review/"
+
+    def assertRating(self, avg, count, histogram):
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.rating_avg, self.product.rating_count), (avg, count))
+        self.assertEqual(self.product.rating_histogram, histogram)
+
+    def test_create_update_and_restore(self):
+        response = self.client.post(self.url, {"rating": 4, "text": "good"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["message"], "Created Review")
+        self.assertRating(4.0, 1, {1: 0, 2: 0, 3: 0, 4: 1, 5: 0})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {"rating": 2, "text": "meh"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"message": "Updated Review", "review": {"rating": 2, "text": "meh"}})
+        review_queries = [query["sql"] for query in queries if '"shop_review"' in query["sql"]]
+        self.assertEqual(len(review_queries), 2, review_queries)
+        self.assertTrue(review_queries[0].startswith("UPDATE"))
+        self.assertTrue(review_queries[1].startswith("INSERT"))
+        self.assertRating(2.0, 1, {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+
+        cache.clear()
+        detail = f"/shop/product/{self.product.slug}/"
+        self.assertEqual(self.client.get(detail).data["rating"], 2.0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(self.url, {"rating": 3, "text": "ok"}, format="json")
+        self.assertEqual(self.client.get(detail).data["rating"], 3.0)
+
+        Review.objects.get(user=self.user).delete()
+        self.assertRating(0.0, 0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+        response = self.client.post(self.url, {"rating": 5, "text": "again"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertRating(5.0, 1, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1})
+        review = Review.objects.get(user=self.user)
+        self.assertEqual((review.rating, review.text, review.deleted_at), (5, "again", None))
+
+    def test_rating_is_optional(self):
+        response = self.client.post(self.url, {"text": "nice"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["review"]["rating"], 5)
+        self.assertRating(5.0, 1, {1: 0, 2: 0, 3: 0, 4: 0, 5: 1})
+
+        self.client.post(self.url, {"rating": 2, "text": "meh"}, format="json")
+        response = self.client.post(self.url, {"text": "meh, edited"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        review = Review.objects.get(user=self.user)
+        self.assertEqual((review.rating, review.text), (2, "meh, edited"))
+        self.assertRating(2.0, 1, {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+
+    def test_unique_per_user_and_product(self):
+        Review.objects.create(user=self.user, product=self.product, rating=3, text="")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Review.objects.create(user=self.user, product=self.product, rating=4, text="")
+
+    def test_sellers_and_anonymous_users_cannot_review(self):
+        seller = create_user("seller@example.com", account_type="SELLER")
+        self.client.force_authenticate(seller)
+        self.assertEqual(self.client.post(self.url, {"rating": 4, "text": ""}, format="json").status_code, 403)
+        self.assertEqual(APIClient().post(self.url, {"rating": 4, "text": ""}, format="json").status_code, 401)
+        self.assertFalse(Review.objects.exists())
+        self.assertRating(0.0, 0, {1: 0, 2: 0, 3: 0, 4: 0, 5: 0})
+
+
+class ProductPaginationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.products = [create_product(name=f"Product {i}", price_current=i % 4 + 1) for i in range(7)]
+
+    def collect(self, url):
+        slugs = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            slugs.extend(product["slug"] for product in response.data["results"])
+            url = response.data["next"]
+        return slugs, response
+
+    def test_pages_follow_created_at(self):
+        slugs, response = self.collect("/shop/products/?page_size=3")
+        expected = [product.slug for product in sorted(
+            self.products, key=lambda p: (p.created_at, p.id), reverse=True
+        )]
+        self.assertEqual(slugs, expected)
+        self.assertNotIn("count", response.data)
+
+    def test_pages_follow_price(self):
+        slugs, _ = self.collect("/shop/products/?page_size=2&sort=price_current")
+        expected = [product.slug for product in sorted(
+            self.products, key=lambda p: (p.price_current, p.id)
+        )]
+        self.assertEqual(slugs, expected)
+
+    def test_previous_link_and_count(self):
+        first = self.client.get("/shop/products/?page_size=3&count=true")
+        self.assertEqual(first.data["count"], 7)
+        self.assertIsNone(first.data["previous"])
+        second = self.client.get(first.data["next"])
+        previous = self.client.get(second.data["previous"])
+        self.assertEqual(previous.data["results"], first.data["results"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/shop/products/?cursor=garbage")
+        self.assertEqual(response.status_code, 404)
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+class QueryPlanTestMixin:
+    table_scan = re.compile(r"^SCAN (\w+)$")
+
+    def get_query_plans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query["sql"].startswith("SELECT"):
+                    continue
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plans.append((query["sql"], [row[-1] for row in cursor.fetchall()]))
+        return plans
+
+    def assertUsesIndexes(self, url):
+        for sql, plan in self.get_query_plans(url):
+            for step in plan:
+                self.assertIsNone(self.table_scan.match(step), f"{step} in plan for {sql}")
+                self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", step, sql)
+
+
+class ShopQueryPlanTestCase(QueryPlanTestMixin, TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.seller = create_seller(create_user("seller@example.com", account_type="SELLER"))
+        self.product = create_product(seller=self.seller)
+        Review.objects.create(user=self.user, product=self.product, rating=4, text="")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_catalog_endpoints_use_indexes(self):
+        self.assertUsesIndexes("/shop/products/")
+        self.assertUsesIndexes("/shop/products/?min_price=1&max_price=100&sort=price_current")
+        self.assertUsesIndexes(f"/shop/categories/{self.product.category.slug}/")
+        self.assertUsesIndexes(f"/shop/sellers/{self.seller.slug}/")
+
+    def test_cart_and_review_endpoints_use_indexes(self):
+        self.assertUsesIndexes("/shop/cart/")
+        self.assertUsesIndexes(f"/shop/product/{self.product.slug}/reviews/")
+        self.assertUsesIndexes(f"/shop/product/{self.product.slug}/reviews/?sort=-rating")
+
+
+class ProductSearchTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.shirt = create_product(name="Red shirt", desc="Cotton", price_current=30)
+        self.dress = create_product(name="Summer dress", desc="Goes well with a red shirt", price_current=80)
+        self.shoes = create_product(name="Shoes", desc="Leather", price_current=50)
+
+    def search(self, query):
+        response = self.client.get(f"/shop/products/search/?{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return [product["slug"] for product in response.data["results"]]
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(self.search("q=red shirt"), [self.shirt.slug, self.dress.slug])
+        self.assertEqual(self.search("q=sho"), [self.shoes.slug])
+
+    def test_applies_price_filters(self):
+        self.assertEqual(self.search("q=shirt&min_price=50"), [self.dress.slug])
+        # The limit applies after the filters, not to the best matches overall.
+        with override_settings(PRODUCT_SEARCH_MAX_RESULTS=1):
+            self.assertEqual(self.search("q=red shirt&min_price=50"), [self.dress.slug])
+            self.assertEqual(self.search("q=red shirt"), [self.shirt.slug])
+
+    def test_index_follows_product_writes(self):
+        self.shoes.name = "Red boots"
+        self.shoes.save()
+        self.assertEqual(self.search("q=boots"), [self.shoes.slug])
+
+        self.shirt.delete()
+        self.assertEqual(self.search("q=shirt"), [self.dress.slug])
+
+        self.dress.hard_delete()
+        self.assertEqual(self.search("q=shirt"), [])
+        self.assertFalse(ProductSearchDocument.objects.filter(product_id=self.dress.pk).exists())
+
+    def test_rebuild_search_index_command(self):
+        ProductSearchDocument.objects.all().delete()
+        call_command("rebuild_search_index", stdout=open("/dev/null", "w"))
+        self.assertEqual(self.search("q=leather"), [self.shoes.slug])
+
+    def test_match_query_escapes_operators(self):
+        self.assertEqual(build_match_query('red OR "shirt'), '"red" "OR" "shirt"*')
+        self.assertIsNone(build_match_query("***"))
+
+
+@override_settings(PRODUCT_FACETS_SYNC_INTERVAL=0)
+class ProductFacetsTestCase(TestCase):
+    def setUp(self):
+        product_facets.reset()
+        self.client = APIClient()
+        self.shoes = Category.objects.create(name="Shoes", image="category_images/test.jpg")
+        self.hats = Category.objects.create(name="Hats", image="category_images/test.jpg")
+        self.seller = create_seller(create_user("seller@example.com", account_type="SELLER"))
+        self.boot = create_product(category=self.shoes, seller=self.seller, price_current=60)
+        self.sneaker = create_product(category=self.shoes, price_current=5, is_stock=0)
+        self.cap = create_product(category=self.hats, seller=self.seller, price_current=20)
+
+    def facets(self, query=""):
+        response = self.client.get(f"/shop/products/?facets=true&{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return {
+            facet: {item["value"]: item["count"] for item in items}
+            for facet, items in response.data["facets"].items()
+        }
+
+    def test_counts_without_filters(self):
+        facets = self.facets()
+        self.assertEqual(facets["category"], {self.shoes.slug: 2, self.hats.slug: 1})
+        self.assertEqual(facets["seller"], {self.seller.slug: 2})
+        self.assertEqual(facets["price"], {"0-10": 1, "10-50": 1, "50-100": 1})
+        self.assertEqual(facets["stock"], {"in_stock": 2, "out_of_stock": 1})
+
+    def test_counts_intersect_other_filters(self):
+        facets = self.facets(f"category={self.shoes.slug}&min_price=10")
+        self.assertEqual(facets["category"], {self.shoes.slug: 1, self.hats.slug: 1})
+        self.assertEqual(facets["price"], {"0-10": 1, "50-100": 1})
+        self.assertEqual(facets["stock"], {"in_stock": 1})
+
+        response = self.client.get(f"/shop/products/?category={self.shoes.slug}&min_price=10")
+        self.assertEqual([product["slug"] for product in response.data["results"]], [self.boot.slug])
+
+    def test_counts_follow_product_writes(self):
+        self.facets()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sneaker.is_stock = 3
+            self.sneaker.save()
+            self.cap.delete()
+            self.boot.hard_delete()
+        facets = self.facets()
+        self.assertEqual(facets["category"], {self.shoes.slug: 1})
+        self.assertEqual(facets["stock"], {"in_stock": 1})
+
+    def test_rolled_back_writes_are_not_counted(self):
+        Product.objects.update(updated_at=timezone.now() - timezone.timedelta(hours=1))
+        self.facets()
+        Product.objects.filter(pk=self.cap.pk).update(updated_at=timezone.now())
+        self.facets()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.sneaker.is_stock = 3
+                    self.sneaker.save()
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+        self.assertEqual(product_facets.counts()["stock"], {"in_stock": 2, "out_of_stock": 1})
+
+    def test_picks_up_writes_from_other_processes(self):
+        self.facets()
+        Product.objects.filter(pk=self.sneaker.pk).update(category=self.hats, updated_at=timezone.now())
+        facets = self.facets()
+        self.assertEqual(facets["category"], {self.shoes.slug: 1, self.hats.slug: 2})
+
+    def test_picks_up_soft_deletes_from_other_processes(self):
+        Product.objects.unfiltered().update(updated_at=timezone.now() - timezone.timedelta(hours=1))
+        other = FacetIndex()
+        other.counts()
+        Product.objects.filter(pk=self.sneaker.pk).update(updated_at=timezone.now())
+        other.counts()
+        self.boot.delete()
+        Product.objects.filter(pk=self.cap.pk).delete()
+        self.assertEqual(other.counts()["stock"], {"out_of_stock": 1})
+
+
+class ProductDetailCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.product = create_product(name="Lamp")
+        self.url = f"/shop/product/{self.product.slug}/"
+
+    def test_second_read_is_served_from_cache(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.data["image1"].startswith("http://testserver/"))
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(product_cache.stats(), {"hits": 1, "misses": 1, "evictions": 0})
+
+    def test_writes_invalidate_the_payload(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price_current = 99
+            self.product.save()
+        self.assertEqual(self.client.get(self.url).data["price_current"], "99.00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(user=create_user(), product=self.product, rating=3, text="")
+        self.assertEqual(self.client.get(self.url).data["rating"], 3.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.category.save()
+        self.client.get(self.url)
+        self.assertEqual(product_cache.stats(), {"hits": 0, "misses": 4, "evictions": 3})
+
+    def test_soft_deleted_product_is_not_served(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.seller = create_seller(create_user("seller@example.com", account_type="SELLER"))
+        self.product = create_product(seller=self.seller)
+
+    def assertRevalidates(self, url, change, queries=1):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        self.assertNotIn("Last-Modified", first)
+
+        with self.assertNumQueries(queries):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+
+        change()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_categories(self):
+        self.assertRevalidates(
+            "/shop/categories/",
+            lambda: Category.objects.create(name="Other", image="category_images/test.jpg"),
+        )
+
+    def test_seller_products(self):
+        self.assertRevalidates(f"/shop/sellers/{self.seller.slug}/", self.product.delete, queries=2)
+
+    def test_product_detail(self):
+        def change():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.price_current = 11
+                self.product.save()
+
+        self.assertRevalidates(f"/shop/product/{self.product.slug}/", change, queries=0)
+
+    def test_missing_product(self):
+        self.assertEqual(self.client.get("/shop/product/missing/").status_code, 404)
+
+
+class ValuesSerializerTestCase(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        seller = create_seller(create_user("seller@example.com", account_type="SELLER"))
+        self.products = [
+            create_product(seller=seller, price_current="10.50", price_old="12.00", image2="product_images/b.png"),
+            create_product(name="No seller", price_current=3),
+        ]
+        Review.objects.create(user=self.user, product=self.products[0], rating=4, text="")
+        self.order = Order.objects.create(user=self.user, full_name="Buyer", country="RU")
+        Order.objects.create(user=self.user)
+        for index, product in enumerate(self.products):
+            OrderItem.objects.create(user=self.user, order=self.order, product=product, quantity=index + 2)
+            OrderItem.objects.create(user=self.user, product=product, quantity=1)
+        self.context = {"request": APIRequestFactory().get("/")}
+
+    def assertSameJSON(self, serializer_class, values_serializer_class, queryset):
+        expected = serializer_class(queryset, many=True, context=self.context).data
+        values_serializer = values_serializer_class(context=self.context)
+        actual = values_serializer.serialize(values_serializer.prepare(queryset))
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_products(self):
+        self.assertSameJSON(
+            ProductSerializer, ProductValuesSerializer, Product.select.order_by("created_at")
+        )
+
+    def test_order_items(self):
+        self.assertSameJSON(
+            OrderItemSerializer, OrderItemValuesSerializer, OrderItem.select.order_by("created_at")
+        )
+
+    def test_orders(self):
+        self.assertSameJSON(OrderSerializer, OrderValuesSerializer, Order.objects.order_by("created_at"))
+
+
+class SparseFieldsetTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        seller = create_seller(create_user("seller@example.com", account_type="SELLER"))
+        self.product = create_product(seller=seller, name="Lamp", desc="A very long description")
+        create_product(name="Chair")
+
+    def get_sql(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, " ".join(query["sql"] for query in queries.captured_queries)
+
+    def test_fields_trim_payload_and_columns(self):
+        response, sql = self.get_sql("/shop/products/?fields=name,slug,price_current,image1")
+        for item in response.data["results"]:
+            self.assertEqual(set(item), {"name", "slug", "price_current", "image1"})
+        self.assertNotIn('"desc"', sql)
+        self.assertNotIn("sellers_seller", sql)
+
+    def test_expand_nests_relations(self):
+        response, sql = self.get_sql("/shop/products/?fields=name&expand=seller,category&sort=created_at")
+        lamp, chair = response.data["results"]
+        self.assertEqual(set(lamp), {"name", "seller", "category"})
+        self.assertEqual(lamp["seller"]["name"], "seller@example.com store")
+        self.assertEqual(lamp["category"]["name"], "Category")
+        self.assertIsNone(chair["seller"])
+        self.assertIn("sellers_seller", sql)
+
+    def test_sparse_values_match_serializer(self):
+        request = APIRequestFactory().get("/")
+        serializer = ProductSerializer(
+            Product.select.order_by("created_at"), many=True, context={"request": request},
+            fields={"name", "rating_histogram"}, expand={"seller"},
+        )
+        values_serializer = ProductValuesSerializer(
+            context={"request": request},
+            serializer=ProductSerializer(context={"request": request}, fields={"name", "rating_histogram"}, expand={"seller"}),
+        )
+        rows = values_serializer.prepare(Product.objects.order_by("created_at"))
+        self.assertEqual(
+            JSONRenderer().render(values_serializer.serialize(rows)), JSONRenderer().render(serializer.data)
+        )
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get("/shop/products/?fields=name,secret&expand=desc")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("fields", response.data)
+        self.assertIn("expand", response.data)
+
+    def test_product_detail(self):
+        url = f"/shop/product/{self.product.slug}/"
+        response = self.client.get(f"{url}?fields=name,image1")
+        self.assertEqual(set(response.data), {"name", "image1"})
+        self.assertTrue(response.data["image1"].startswith("http://testserver/"))
+
+        response, sql = self.get_sql(f"{url}?fields=name&expand=seller")
+        self.assertEqual(response.data["seller"]["slug"], self.product.seller.slug)
+        self.assertNotIn('"desc"', sql)
+
+
+class StreamingListTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.products = [create_product(name=f"Product {i}", price_current=i + 1) for i in range(5)]
+
+    def stream(self, url):
+        with mock.patch.object(ProductsView, "stream_chunk_size", 2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def test_json_array_matches_pages(self):
+        expected = self.client.get("/shop/products/?sort=price_current&page_size=100").data["results"]
+        response, content = self.stream("/shop/products/?sort=price_current&stream=json")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(content), json.loads(JSONRenderer().render(expected)))
+
+    def test_ndjson(self):
+        response, content = self.stream("/shop/products/?fields=name&stream=ndjson&sort=created_at")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = content.decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{"name": product.name} for product in self.products])
+
+    def test_empty_list(self):
+        _, content = self.stream("/shop/products/?stream=json&min_price=1000")
+        self.assertEqual(content, b"[]")
+
+    def test_unknown_format(self):
+        response = self.client.get("/shop/products/?stream=xml")
+        self.assertEqual(response.status_code, 400)
+
+
+class ThumbnailTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, THUMBNAIL_WORKERS=0, THUMBNAIL_WIDTHS=(100, 400)
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+        self.client = APIClient()
+        os.makedirs(os.path.join(self.media_root, "product_images"))
+        Image.new("RGBA", (200, 100), (255, 0, 0, 128)).save(
+            os.path.join(self.media_root, "product_images/red.png")
+        )
+
+    def variant_path(self, url):
+        return os.path.join(self.media_root, url.removeprefix(settings.MEDIA_URL))
+
+    def test_rendered_after_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = create_product(image1="product_images/red.png")
+        for width, size in ((100, (100, 50)), (400, (200, 100))):
+            for image_format in ("webp", "jpeg"):
+                url = thumbnails.variant_url("product_images/red.png", width, image_format)
+                with Image.open(self.variant_path(url)) as image:
+                    self.assertEqual(image.size, size)
+                    self.assertEqual(image.format, image_format.upper())
+
+        data = self.client.get(f"/shop/product/{product.slug}/").data
+        self.assertEqual(
+            data["image1_thumbnails"]["webp"]["100"],
+            "http://testserver/shop/thumbnails/100/webp/product_images/red.png",
+        )
+        self.assertIsNone(data["image2_thumbnails"])
+        response = self.client.get("/shop/thumbnails/100/webp/product_images/red.png")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], thumbnails.variant_url("product_images/red.png", 100, "webp"))
+
+    def test_rendered_lazily_in_process_pool(self):
+        with override_settings(THUMBNAIL_WORKERS=1):
+            response = self.client.get("/shop/thumbnails/400/jpeg/product_images/red.png")
+            self.assertEqual(response["Location"], "/media/product_images/red.png")
+            self.assertIn("no-cache", response["Cache-Control"])
+            thumbnails.shutdown()
+        url = thumbnails.variant_url("product_images/red.png", 400, "jpeg")
+        self.assertTrue(os.path.exists(self.variant_path(url)))
+        response = self.client.get("/shop/thumbnails/400/jpeg/product_images/red.png")
+        self.assertEqual(response["Location"], url)
+
+    def test_unknown_variants(self):
+        for url in (
+            "/shop/thumbnails/123/webp/product_images/red.png",
+            "/shop/thumbnails/100/gif/product_images/red.png",
+            "/shop/thumbnails/100/webp/../secret.png",
+            "/shop/thumbnails/100/webp/product_images/missing.png",
+        ):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class InventoryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.product = create_product(name="Lamp", is_stock=5)
+        self.shipping = ShippingAddress.objects.create(
+            user=self.user, full_name="Test User", email="buyer@example.com", phone="123",
+            address="addr", city="city", country="country", zipcode="123",
+        )
+
+    def stock(self):
+        return Product.objects.values_list("is_stock", flat=True).get(pk=self.product.pk)
+
+    def toggle(self, quantity):
+        return self.client.post("/shop/cart/", {"slug": self.product.slug, "quantity": quantity}, format="json")
+
+    def test_cart_reserves_and_releases_stock(self):
+        self.assertEqual(self.toggle(3).status_code, 201)
+        self.assertEqual(self.stock(), 2)
+        self.assertEqual(self.toggle(5).status_code, 200)
+        self.assertEqual(self.stock(), 0)
+
+        response = self.toggle(6)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["available"], 5)
+        self.assertEqual(carts.get(self.user.pk)[str(self.product.pk)][0], 5)
+
+        self.assertEqual(self.toggle(0).status_code, 200)
+        self.assertEqual(self.stock(), 5)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_expired_reservations_are_released(self):
+        self.toggle(4)
+        other = create_user("other@example.com")
+        with self.assertRaises(inventory.InsufficientStock):
+            inventory.reserve(other, self.product, 2)
+
+        StockReservation.objects.update(expires_at=timezone.now() - timezone.timedelta(seconds=1))
+        # A short product reclaims expired holds before giving up.
+        inventory.reserve(other, self.product, 2)
+        self.assertEqual(self.stock(), 3)
+
+        StockReservation.objects.update(expires_at=timezone.now() - timezone.timedelta(seconds=1))
+        call_command("release_expired_reservations", "--batch-size", "1", stdout=open(os.devnull, "w"))
+        self.assertEqual(self.stock(), 5)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_takes_reserved_stock_once(self):
+        self.toggle(2)
+        response = self.client.post("/shop/checkout/", {"shipping_id": str(self.shipping.id)}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock(), 3)
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertFalse(OrderItem.objects.filter(order=None).exists())
+
+    def test_checkout_is_all_or_nothing(self):
+        other = create_product(name="Desk", is_stock=1)
+        self.toggle(2)
+        # An expired hold that someone else took the stock from in the meantime.
+        carts.set_quantity(self.user.pk, other.pk, 2)
+        response = self.client.post("/shop/checkout/", {"shipping_id": str(self.shipping.id)}, format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["product"], other.slug)
+        self.assertEqual(self.stock(), 3)
+        self.assertEqual(Product.objects.get(pk=other.pk).is_stock, 1)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+
+
+class CartStoreTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.seller = create_seller(create_user("seller@example.com", account_type="SELLER"))
+        self.lamp = create_product(name="Lamp", seller=self.seller, price_current="10.50", is_stock=10)
+        self.desk = create_product(name="Desk", price_current="99.99", is_stock=10)
+
+    def toggle(self, product, quantity):
+        return self.client.post("/shop/cart/", {"slug": product.slug, "quantity": quantity}, format="json")
+
+    def test_cart_is_not_written_to_order_items(self):
+        self.assertEqual(self.toggle(self.lamp, 2).status_code, 201)
+        self.assertEqual(self.toggle(self.desk, 1).status_code, 201)
+        self.assertFalse(OrderItem.objects.exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/shop/cart/")
+        self.assertFalse([query for query in queries if "profiles_orderitem" in query["sql"]])
+        expected = OrderItemSerializer(
+            [OrderItem(product=Product.objects.get(pk=product.pk), quantity=quantity)
+             for product, quantity in ((self.desk, 1), (self.lamp, 2))],
+            many=True,
+        ).data
+        self.assertEqual(JSONRenderer().render(response.data), JSONRenderer().render(expected))
+
+    def test_flush_persists_and_reloads_carts(self):
+        self.toggle(self.lamp, 2)
+        self.toggle(self.desk, 1)
+        self.toggle(self.desk, 0)
+        call_command("flush_carts", stdout=open(os.devnull, "w"))
+        self.assertEqual(list(OrderItem.objects.values_list("product_id", "quantity")), [(self.lamp.pk, 2)])
+
+        self.toggle(self.lamp, 3)
+        self.assertEqual(carts.flush(), 1)
+        self.assertEqual(OrderItem.objects.get().quantity, 3)
+        self.assertEqual(carts.flush(), 0)
+
+        cache.clear()
+        self.assertEqual(self.client.get("/shop/cart/").data[0]["quantity"], 3)
+
+    def test_flush_skips_lost_journal_entries(self):
+        self.toggle(self.lamp, 2)
+        cache.delete(carts.journal_key(1))
+        self.assertEqual(carts.flush(), 0)
+        with mock.patch("apps.shop.carts.time.time", return_value=time.time() + carts.journal_hole_grace):
+            self.assertEqual(carts.flush(), 0)
+        # Once the user's marker expires, the next write journals them again.
+        cache.delete(carts.dirty_key(self.user.pk))
+        self.toggle(self.desk, 1)
+        self.assertEqual(carts.flush(), 1)
+        self.assertEqual(
+            dict(OrderItem.objects.values_list("product__name", "quantity")), {"Lamp": 2, "Desk": 1}
+        )
+
+    def test_lost_journal_end_continues_after_start(self):
+        self.toggle(self.lamp, 2)
+        self.assertEqual(carts.flush(), 1)
+        cache.delete(carts.journal_key("end"))
+        cache.delete(carts.dirty_key(self.user.pk))
+        self.toggle(self.lamp, 3)
+        self.assertEqual(carts.flush(), 1)
+        self.assertEqual(OrderItem.objects.get().quantity, 3)
+
+    def test_busy_cart_is_not_written(self):
+        self.toggle(self.lamp, 2)
+        cache.add(f"{carts.prefix}:lock:{self.user.pk}", 1)
+        with mock.patch.object(carts, "lock_attempts", 1):
+            response = self.toggle(self.lamp, 5)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(carts.get(self.user.pk)[str(self.lamp.pk)][0], 2)
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+
+    def test_product_edits_reach_the_cart(self):
+        self.toggle(self.lamp, 2)
+        self.client.get("/shop/cart/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lamp.price_current = 20
+            self.lamp.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seller.business_name = "Lamps Ltd"
+            self.seller.save()
+        item = self.client.get("/shop/cart/").data[0]
+        self.assertEqual(item["total"], "40.00")
+        self.assertEqual(item["product"]["seller"]["name"], "Lamps Ltd")
+
+
+class CartBatchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.lamp = create_product(name="Lamp", is_stock=5)
+        self.desk = create_product(name="Desk", is_stock=1)
+        self.chair = create_product(name="Chair", is_stock=3)
+
+    def batch(self, *items):
+        return self.client.post(
+            "/shop/cart/batch/",
+            {"items": [{"slug": product.slug if hasattr(product, "slug") else product, "quantity": quantity}
+                       for product, quantity in items]},
+            format="json",
+        )
+
+    def stock(self):
+        return dict(Product.objects.values_list("name", "is_stock"))
+
+    def test_batch_applies_every_item(self):
+        self.batch((self.chair, 2))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.batch((self.lamp, 2), (self.desk, 1), (self.chair, 0))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted((item["product"]["slug"], item["quantity"]) for item in response.data["items"]),
+            [(self.desk.slug, 1), (self.lamp.slug, 2)],
+        )
+        self.assertEqual(self.stock(), {"Lamp": 3, "Desk": 0, "Chair": 3})
+        lookups = [query for query in queries if '"shop_product"."slug" IN (' in query["sql"]]
+        self.assertEqual(len(lookups), 1)
+
+        carts.flush()
+        self.assertEqual(
+            dict(OrderItem.objects.values_list("product__name", "quantity")), {"Lamp": 2, "Desk": 1}
+        )
+
+    def test_batch_is_all_or_nothing(self):
+        response = self.batch((self.lamp, 2), (self.desk, 2))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["product"], self.desk.slug)
+        self.assertEqual(self.stock(), {"Lamp": 5, "Desk": 1, "Chair": 3})
+        self.assertEqual(carts.get(self.user.pk), {})
+
+        response = self.batch((self.lamp, 1), ("no-such-product", 1))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.stock()["Lamp"], 5)
+
+    def test_duplicate_slugs_are_rejected(self):
+        self.assertEqual(self.batch((self.lamp, 1), (self.lamp, 2)).status_code, 400)
+
+    def test_open_cart_lines_are_unique(self):
+        OrderItem.objects.create(user=self.user, product=self.lamp)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            OrderItem.objects.create(user=self.user, product=self.lamp)
+        order = Order.objects.create(user=self.user)
+        OrderItem.objects.create(user=self.user, product=self.lamp, order=order)
+        OrderItem.objects.create(user=self.user, product=self.lamp, order=order)
+
+
+class FlashSaleTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(create_user())
+        self.product = create_product(name="Lamp", is_stock=2)
+        flash_sales.open(self.product)
+        self.addCleanup(cache.clear)
+
+    def toggle(self, quantity):
+        return self.client.post("/shop/cart/", {"slug": self.product.slug, "quantity": quantity}, format="json")
+
+    def test_sold_out_requests_are_rejected_without_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.toggle(2).status_code, 201)
+        self.assertEqual(flash_sales.remaining(self.product.slug), 0)
+
+        self.client.force_authenticate(create_user("other@example.com"))
+        with self.assertNumQueries(0):
+            response = self.toggle(1)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(flash_sales.remaining(self.product.slug), 0)
+
+    def test_released_stock_is_admitted_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.toggle(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.toggle(0).status_code, 200)
+        self.assertEqual(flash_sales.remaining(self.product.slug), 2)
+
+        StockReservation.objects.create(
+            user=create_user("other@example.com"), product=self.product, quantity=1,
+            expires_at=timezone.now() - timezone.timedelta(seconds=1),
+        )
+        Product.objects.filter(pk=self.product.pk).update(is_stock=1)
+        flash_sales.open(Product.objects.get(pk=self.product.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            inventory.release_expired()
+        self.assertEqual(flash_sales.remaining(self.product.slug), 2)
+
+    def test_oversized_request_takes_no_tokens(self):
+        self.assertIs(flash_sales.admit(self.product.slug, 3), False)
+        self.assertEqual(flash_sales.remaining(self.product.slug), 2)
+        self.assertIs(flash_sales.admit(self.product.slug, 2), True)
+        self.assertEqual(flash_sales.remaining(self.product.slug), 0)
+
+    def test_closed_sale_is_not_gated(self):
+        flash_sales.close(self.product.slug)
+        self.assertIsNone(flash_sales.admit(self.product.slug, 5))
+        self.assertEqual(self.toggle(3).status_code, 409)
+
+
+class SalesAnalyticsTestCase(TestCase):
+    def setUp(self):
+        snapshot_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, snapshot_dir)
+        settings_override = override_settings(SALES_SNAPSHOT_DIR=snapshot_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.snapshot_dir = snapshot_dir
+
+        books = Category.objects.create(name="Books", image="category_images/test.jpg")
+        games = Category.objects.create(name="Games", image="category_images/test.jpg")
+        seller = create_seller(create_user("seller@example.com", account_type="SELLER"))
+        self.book = create_product(category=books, seller=seller, name="Book", price_current="10.00")
+        self.game = create_product(category=games, name="Game", price_current="25.00")
+        self.buyer = create_user()
+        self.place("2024-01-01", "Kenya", "SUCCESSFUL", (self.book, 2), (self.game, 1))
+        self.place("2024-01-02", "Kenya", "PENDING", (self.book, 1))
+        self.place("2024-01-09", " Ghana ", "SUCCESSFUL", (self.game, 4))
+        self.place("2024-01-09", "Ghana", "CANCELLED", (self.game, 10))
+
+        self.staff = create_user("staff@example.com", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def place(self, day, country, payment_status, *lines):
+        order = Order.objects.create(user=self.buyer, country=country, payment_status=payment_status)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.make_aware(timezone.datetime.fromisoformat(day)))
+        for product, quantity in lines:
+            price = Decimal(product.price_current)
+            OrderItem.objects.create(
+                user=self.buyer, order=order, product=product, quantity=quantity,
+                unit_price=price, line_total=price * quantity,
+            )
+
+    def test_requires_snapshot_and_staff(self):
+        self.assertEqual(self.client.get("/shop/analytics/sales/").status_code, 503)
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get("/shop/analytics/sales/").status_code, 403)
+
+    def test_report_from_snapshot(self):
+        call_command("export_sales_snapshot", stdout=io.StringIO())
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/shop/analytics/sales/", {"group_by": "country", "interval": "week"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if "profiles_order" in query["sql"]])
+        data = response.data
+        self.assertEqual(data["snapshot"]["lines"], 5)
+        self.assertEqual(data["totals"]["gmv"], "155.00")
+        self.assertEqual(data["totals"]["units"], 8)
+        self.assertEqual(data["totals"]["orders"], 3)
+        self.assertEqual(data["totals"]["order_value"]["p50"], "45.00")
+        self.assertEqual(
+            [(group["key"], group["gmv"], group["orders"]) for group in data["groups"]],
+            [("Ghana", "100.00", 1), ("Kenya", "55.00", 2)],
+        )
+        self.assertEqual(
+            [(row["period"], row["gmv"], row["orders"]) for row in data["series"]],
+            [("2024-01-01", "55.00", 2), ("2024-01-08", "100.00", 1)],
+        )
+
+        response = self.client.get("/shop/analytics/sales/", {
+            "group_by": "category", "interval": "month", "percentile": [0, 100],
+            "end": "2024-01-05", "country": "Kenya",
+        })
+        data = response.data
+        self.assertEqual(
+            [(group["key"], group["gmv"], group["units"], group["order_value"]) for group in data["groups"]],
+            [("books", "30.00", 3, {"p0": "10.00", "p100": "20.00"}),
+             ("games", "25.00", 1, {"p0": "25.00", "p100": "25.00"})],
+        )
+        self.assertEqual([(row["period"], row["gmv"]) for row in data["series"]], [("2024-01-01", "55.00")])
+
+        response = self.client.get("/shop/analytics/sales/", {"payment_status": "CANCELLED", "group_by": "seller"})
+        self.assertEqual(response.data["totals"]["gmv"], "250.00")
+        self.assertEqual([group["key"] for group in response.data["groups"]], [None])
+        response = self.client.get("/shop/analytics/sales/", {"seller": "nope"})
+        self.assertEqual(response.data["totals"]["orders"], 0)
+        self.assertEqual(response.data["series"], [])
+
+    def test_export_swaps_snapshots(self):
+        first = sales_snapshots.export()
+        self.place("2024-02-01", "Kenya", "SUCCESSFUL", (self.book, 1))
+        for _ in range(2):
+            second = sales_snapshots.export()
+        self.assertEqual(second.meta["lines"], first.meta["lines"] + 1)
+        self.assertIs(sales_snapshots.current(), second)
+        self.assertEqual(len([name for name in os.listdir(self.snapshot_dir) if name != "CURRENT"]), 2)
+
+
+class InventoryConcurrencyTestCase(TransactionTestCase):
+    threads = 8
+    attempts = 5
+    stock = 20
+
+    def test_concurrent_buyers_never_oversell(self):
+        product = create_product(name="Lamp", is_stock=self.stock)
+        users = [create_user(f"buyer{index}@example.com") for index in range(self.threads)]
+        sold = []
+        errors = []
+
+        def buy(user):
+            try:
+                for _ in range(self.attempts):
+                    item = OrderItem(user=user, product=product, quantity=1)
+                    while True:
+                        try:
+                            with transaction.atomic():
+                                inventory.checkout(user, [item])
+                            sold.append(1)
+                            break
+                        except inventory.InsufficientStock:
+                            break
+                        except OperationalError:
+                            # SQLite allows one writer at a time; retry like a client would.
+                            time.sleep(0.001)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                close_old_connections()
+
+        workers = [threading.Thread(target=buy, args=(user,)) for user in users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(sold), self.stock)
+        self.assertEqual(Product.objects.get(pk=product.pk).is_stock, 0)
+
+
+class ReviewUpsertConcurrencyTestCase(TransactionTestCase):
+    threads = 8
+
+    def test_parallel_upserts_write_one_review(self):
+        product = create_product()
+        user = create_user()
+        created = []
+        errors = []
+        barrier = threading.Barrier(self.threads)
+
+        def post(rating):
+            try:
+                barrier.wait()
+                while True:
+                    try:
+                        _, was_created = Review.objects.upsert(user, product, rating=rating, text="ok")
+                        created.append(was_created)
+                        break
+                    except OperationalError:
+                        # SQLite allows one writer at a time; retry like a client would.
+                        time.sleep(0.001)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                close_old_connections()
+
+        workers = [threading.Thread(target=post, args=(index % 5 + 1,)) for index in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(created), [False] * (self.threads - 1) + [True])
+        review = Review.objects.unfiltered().get(user=user, product=product)
+        product.refresh_from_db()
+        self.assertEqual(product.rating_count, 1)
+        self.assertEqual(product.rating_histogram[review.rating], 1)
+        self.assertEqual(product.rating_avg, review.rating)
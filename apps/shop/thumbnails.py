@@ -0,0 +1,140 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.urls import reverse
+
+from apps.shop.imaging import render_variants, variant_path
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIRS = ("product_images/", "category_images/")
+
+
+def get_widths():
+    return tuple(getattr(settings, "THUMBNAIL_WIDTHS", (160, 320, 640)))
+
+
+def get_formats():
+    return tuple(getattr(settings, "THUMBNAIL_FORMATS", ("webp", "jpeg")))
+
+
+def is_source(name):
+    return bool(name) and name.startswith(SOURCE_DIRS) and ".." not in name.split("/")
+
+
+class ThumbnailGenerator:
+    """
+    Builds resized WebP/JPEG variants of uploaded images in a process pool.
+    Variants are stored under `MEDIA_ROOT/<THUMBNAIL_DIR>` keyed by the content
+    hash of the original, and the cache maps an image name to its hash once
+    the variants exist. Uploads schedule the work after commit; a variant that
+    is requested before it exists is scheduled then and the original is served
+    meanwhile. With `THUMBNAIL_WORKERS = 0` the work runs inline.
+    """
+    prefix = "shop:thumbnail"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.executor = None
+
+    def get_directory(self):
+        return getattr(settings, "THUMBNAIL_DIR", "thumbnails")
+
+    def get_workers(self):
+        return getattr(settings, "THUMBNAIL_WORKERS", 2)
+
+    def key(self, name):
+        return f"{self.prefix}:{name}"
+
+    def get_digest(self, name):
+        return cache.get(self.key(name))
+
+    def variant_name(self, digest, width, image_format):
+        return f"{self.get_directory()}/{variant_path(digest, width, image_format)}"
+
+    def variant_url(self, name, width, image_format):
+        """URL of the variant if it was rendered, otherwise None."""
+        digest = self.get_digest(name)
+        if digest is None:
+            return None
+        return default_storage.url(self.variant_name(digest, width, image_format))
+
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.get_workers(), mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.executor
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def schedule(self, *names):
+        names = [name for name in names if is_source(name) and self.get_digest(name) is None]
+        for name in names:
+            try:
+                source = default_storage.path(name)
+            except NotImplementedError:
+                # Remote storages have no local path to hand to the workers.
+                return
+            if not os.path.exists(source):
+                continue
+            with self.lock:
+                if name in self.pending:
+                    continue
+                self.pending.add(name)
+            args = (
+                source,
+                default_storage.path(self.get_directory()),
+                get_widths(),
+                get_formats(),
+                getattr(settings, "THUMBNAIL_QUALITY", 80),
+            )
+            if not self.get_workers():
+                self.finish(name, lambda: render_variants(*args))
+                continue
+            future = self.get_executor().submit(render_variants, *args)
+            future.add_done_callback(lambda future, name=name: self.finish(name, future.result))
+
+    def schedule_on_commit(self, *names):
+        names = [name for name in names if name]
+        if names:
+            transaction.on_commit(lambda: self.schedule(*names))
+
+    def finish(self, name, result):
+        try:
+            cache.set(self.key(name), result(), timeout=None)
+        except Exception:
+            logger.exception("Could not render thumbnails of %s", name)
+        finally:
+            with self.lock:
+                self.pending.discard(name)
+
+    def describe(self, name, request=None):
+        """Variant URLs of an image as `{format: {width: url}}`, served through the thumbnail view."""
+        if not name:
+            return None
+        # Reversed once per image instead of once per variant, this runs for every listed row.
+        prefix = reverse("thumbnail", kwargs={"width": 0, "image_format": "-", "name": "-"})[:-len("0/-/-")]
+        if request is not None:
+            prefix = request.build_absolute_uri(prefix)
+        name = quote(name)
+        return {
+            image_format: {str(width): f"{prefix}{width}/{image_format}/{name}" for width in get_widths()}
+            for image_format in get_formats()
+        }
+
+
+thumbnails = ThumbnailGenerator()
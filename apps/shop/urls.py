@@ -1,15 +1,21 @@
 from django.urls import path
 
 from apps.shop.views import CategoriesView, ProductsByCategoryView, ProductsBySellerView, ProductsView, ProductView, \
-    CartView, CheckoutView, ReviewView
+    ProductsSearchView, ProductsExportView, ThumbnailView, CartView, CartBatchView, CheckoutView, \
+    ReviewView, SalesAnalyticsView
 
 urlpatterns = [
     path("categories/", CategoriesView.as_view()),
-    path('categories/<int:pk>/', ProductsByCategoryView.as_view()),
+    path('categories/<slug:slug>/', ProductsByCategoryView.as_view()),
     path('sellers/<slug:slug>/', ProductsBySellerView.as_view()),
     path('products/', ProductsView.as_view()),
+    path('products/search/', ProductsSearchView.as_view()),
+    path('products/export/', ProductsExportView.as_view()),
+    path('analytics/sales/', SalesAnalyticsView.as_view()),
     path('product/<slug:slug>/', ProductView.as_view()),
+    path('thumbnails/<int:width>/<str:image_format>/<path:name>', ThumbnailView.as_view(), name='thumbnail'),
     path('cart/', CartView.as_view()),
+    path('cart/batch/', CartBatchView.as_view()),
     path('checkout/', CheckoutView.as_view()),
     path('product/<slug:slug>/reviews/', ReviewView.as_view()),
     path('product/<slug:slug>/review/', ReviewView.as_view()),
@@ -1,24 +1,44 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
-from rest_framework.exceptions import NotFound
-from rest_framework.filters import OrderingFilter
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import ListAPIView, ListCreateAPIView, RetrieveAPIView, CreateAPIView, GenericAPIView
 from rest_framework.mixins import DestroyModelMixin
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import status
 
-from apps.profiles.models import OrderItem, ShippingAddress, Order
+from apps.common.mixins import ConditionalGetMixin, SPARSE_FIELDSET_PARAMETERS, SparseFieldsetMixin, ValuesListMixin
+from apps.profiles.models import OrderItem, SellerOrder, ShippingAddress, Order
+from apps.sellers import rollups
 from apps.sellers.models import Seller
-from apps.shop.filter_backends import ProductsFilterBackend
+from apps.shop import inventory
+from apps.shop.analytics import sales_snapshots
+from apps.shop.caching import product_cache
+from apps.shop.carts import carts
+from apps.shop.exporters import CONTENT_TYPES, FORMATS, ProductExporter, parse_cursor
+from apps.shop.facets import product_facets
+from apps.shop.flashsale import flash_sales
+from apps.shop.filter_backends import ProductsFilterBackend, ProductFacetsFilterBackend
 from apps.shop.models import Category, Product, Review
+from apps.shop.pagination import ProductPagination, ReviewPagination, SearchPagination
+from apps.shop.search import search_products
 from apps.shop.permissions import IsReviewer
 from apps.shop.serializers import CategorySerializer, ProductSerializer, OrderItemSerializer, ToggleCartItemSerializer, \
-    CheckoutSerializer, OrderSerializer, ReviewSerializer, CreateReviewSerializer
+    CartBatchSerializer, CheckoutSerializer, OrderSerializer, ReviewSerializer, CreateReviewSerializer, \
+    ProductValuesSerializer, ProductRatingSerializer, SalesAnalyticsQuerySerializer, SalesAnalyticsSerializer
+from apps.shop.thumbnails import get_formats, get_widths, is_source, thumbnails
 
 tags = ["Shop"]
 
 
-class CategoriesView(ListCreateAPIView):
+class CategoriesView(ConditionalGetMixin, ListCreateAPIView):
     serializer_class = CategorySerializer
     queryset = Category.objects.all()
 
@@ -39,36 +59,130 @@ class CategoriesView(ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class ProductsByCategoryView(ListAPIView):
+class ProductsByCategoryView(SparseFieldsetMixin, ValuesListMixin, ListAPIView):
     serializer_class = ProductSerializer
+    values_serializer_class = ProductValuesSerializer
+    pagination_class = ProductPagination
 
     def get_queryset(self):
         category = Category.objects.get_or_none(slug=self.kwargs["slug"])
         if not category:
-            return NotFound(detail={"message": "Category does not exist!"})
+            raise NotFound(detail={"message": "Category does not exist!"})
         return Product.objects.filter(category=category)
 
     @extend_schema(
         operation_id="category_products",
         summary="Category Products Fetch",
         description='This endpoint returns all products in a particular category.',
-        tags=tags
+        tags=tags,
+        parameters=SPARSE_FIELDSET_PARAMETERS,
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
 
-class ProductsView(ListAPIView):
+class ProductsView(SparseFieldsetMixin, ValuesListMixin, ListAPIView):
     serializer_class = ProductSerializer
+    values_serializer_class = ProductValuesSerializer
     queryset = Product.select.all()
-    filter_backends = [ProductsFilterBackend]
+    filter_backends = [ProductsFilterBackend, ProductFacetsFilterBackend]
+    pagination_class = ProductPagination
+
+    def get_facet_filters(self):
+        min_price, max_price = ProductsFilterBackend().get_price_range(self.request)
+        filters = ProductFacetsFilterBackend().get_facet_filters(self.request)
+        return {**filters, "min_price": min_price, "max_price": max_price}
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if request.query_params.get("facets", "").lower() in ("1", "true"):
+            response.data["facets"] = product_facets.describe(self.get_facet_filters())
+        return response
 
     @extend_schema(
         operation_id="all_products",
         summary="Product Fetch",
-        description='This endpoint returns all products.',
+        description="""
+            This endpoint returns all products.
+            With facets=true the response also carries product counts per category,
+            seller, price bucket and stock state for the active filters.
+        """,
+        tags=tags,
+        parameters=[
+            OpenApiParameter(
+                name="category",
+                description="Filter products by category slug",
+                required=False,
+                type=OpenApiTypes.STR,
+            ),
+            OpenApiParameter(
+                name="seller",
+                description="Filter products by seller slug",
+                required=False,
+                type=OpenApiTypes.STR,
+            ),
+            OpenApiParameter(
+                name="in_stock",
+                description="Filter products that are in (true) or out of (false) stock",
+                required=False,
+                type=OpenApiTypes.BOOL,
+            ),
+            OpenApiParameter(
+                name="facets",
+                description="Include facet counts in the response",
+                required=False,
+                type=OpenApiTypes.BOOL,
+            ),
+            OpenApiParameter(
+                name="max_price",
+                description="Filter products by MAX current price",
+                required=False,
+                type=OpenApiTypes.INT,
+            ),
+            OpenApiParameter(
+                name="min_price",
+                description="Filter products by MIN current price",
+                required=False,
+                type=OpenApiTypes.INT,
+            ),
+            *SPARSE_FIELDSET_PARAMETERS,
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class ProductsSearchView(SparseFieldsetMixin, ListAPIView):
+    serializer_class = ProductSerializer
+    values_serializer_class = ProductValuesSerializer
+    filter_backends = [ProductsFilterBackend]
+    pagination_class = SearchPagination
+
+    def get_queryset(self):
+        return self.get_sparse_queryset(Product.objects.all())
+
+    def get_search_query(self):
+        query = self.request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError(detail={"message": "Search query must not be empty"})
+        return query
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return search_products(queryset, self.get_search_query())
+
+    @extend_schema(
+        operation_id="search_products",
+        summary="Products Search",
+        description='This endpoint returns products matching the query, most relevant first.',
         tags=tags,
         parameters=[
+            OpenApiParameter(
+                name="q",
+                description="Search by product name and description",
+                required=True,
+                type=OpenApiTypes.STR,
+            ),
             OpenApiParameter(
                 name="max_price",
                 description="Filter products by MAX current price",
@@ -81,125 +195,398 @@ class ProductsView(ListAPIView):
                 required=False,
                 type=OpenApiTypes.INT,
             ),
+            *SPARSE_FIELDSET_PARAMETERS,
         ]
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
 
-class ProductsBySellerView(ListAPIView):
+class ProductsBySellerView(ConditionalGetMixin, SparseFieldsetMixin, ValuesListMixin, ListAPIView):
     serializer_class = ProductSerializer
+    values_serializer_class = ProductValuesSerializer
+    pagination_class = ProductPagination
 
     def get_queryset(self):
         seller = Seller.objects.get_or_none(slug=self.kwargs["slug"])
         if not seller:
-            return NotFound(detail={"message": "Seller does not exist!"})
+            raise NotFound(detail={"message": "Seller does not exist!"})
         return Product.objects.filter(seller=seller)
 
     @extend_schema(
         summary="Seller Products Fetch",
         description='This endpoint returns all products in a particular seller.',
-        tags=tags
+        tags=tags,
+        parameters=SPARSE_FIELDSET_PARAMETERS,
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
 
-class ProductView(RetrieveAPIView):
+EXPORT_PARAMETERS = [
+    OpenApiParameter(
+        name="file_format",
+        description="csv (default) or jsonl",
+        required=False,
+        type=OpenApiTypes.STR,
+        enum=FORMATS,
+    ),
+    OpenApiParameter(
+        name="gzip",
+        description="Compress the export with gzip",
+        required=False,
+        type=OpenApiTypes.BOOL,
+    ),
+    OpenApiParameter(
+        name="since",
+        description="Resume after the row with this updated_at",
+        required=False,
+        type=OpenApiTypes.DATETIME,
+    ),
+    OpenApiParameter(
+        name="after",
+        description="Id of the row the export resumes after, together with since",
+        required=False,
+        type=OpenApiTypes.UUID,
+    ),
+]
+
+
+class ProductsExportView(GenericAPIView):
+    permission_classes = [IsAdminUser]
+
+    def get_queryset(self):
+        queryset = Product.objects.all()
+        seller_slug = self.request.query_params.get("seller")
+        if seller_slug:
+            queryset = queryset.filter(seller__slug=seller_slug)
+        return queryset
+
+    def get_export_format(self):
+        # Not "format", DRF uses that one for renderer negotiation.
+        file_format = self.request.query_params.get("file_format", "csv")
+        if file_format not in FORMATS:
+            raise ValidationError({"file_format": f"Expected one of: {', '.join(FORMATS)}"})
+        return file_format
+
+    def get_cursor(self):
+        params = self.request.query_params
+        try:
+            return parse_cursor(params.get("since"), params.get("after"))
+        except ValueError as exc:
+            raise ValidationError({"since": str(exc)})
+
+    @extend_schema(
+        summary="Products Export",
+        description="""
+            This endpoint streams products ordered by updated_at and id as CSV or JSON Lines.
+            Pass the updated_at and id of the last received row as since and after to resume.
+        """,
+        tags=tags,
+        parameters=[
+            OpenApiParameter(
+                name="seller",
+                description="Export only the products of this seller slug",
+                required=False,
+                type=OpenApiTypes.STR,
+            ),
+            *EXPORT_PARAMETERS,
+        ],
+        responses={(200, "text/csv"): OpenApiTypes.BINARY},
+    )
+    def get(self, request, *args, **kwargs):
+        file_format = self.get_export_format()
+        compress = request.query_params.get("gzip", "").lower() in ("1", "true")
+        exporter = ProductExporter(self.get_queryset(), cursor=self.get_cursor())
+        filename = f"products.{file_format}"
+        if compress:
+            response = StreamingHttpResponse(exporter.stream(file_format, compress=True), content_type="application/gzip")
+            filename += ".gz"
+        else:
+            response = StreamingHttpResponse(exporter.stream(file_format), content_type=CONTENT_TYPES[file_format])
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class SalesAnalyticsView(GenericAPIView):
+    serializer_class = SalesAnalyticsQuerySerializer
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        summary="Sales Analytics",
+        description="""
+            This endpoint returns the GMV, units and orders of all order lines in total, per category,
+            seller or country and per day, week or month, with percentiles of the order values.
+            Orders with cancelled or failed payments are left out unless payment_status asks for them.
+            It reads the columnar snapshot written by the export_sales_snapshot command, not the orders.
+        """,
+        tags=tags,
+        parameters=[SalesAnalyticsQuerySerializer],
+        responses=SalesAnalyticsSerializer,
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        query = dict(serializer.validated_data)
+        snapshot = sales_snapshots.current()
+        if snapshot is None:
+            return Response(
+                data={"message": "No Sales Snapshot Yet"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        report = snapshot.report(
+            group_by=query.pop('group_by'),
+            interval=query.pop('interval'),
+            percentiles=query.pop('percentile'),
+            **query,
+        )
+        return Response(SalesAnalyticsSerializer(report).data)
+
+
+class ProductView(ConditionalGetMixin, SparseFieldsetMixin, RetrieveAPIView):
+    """
+    The full payload is cached per slug and `?fields=` is cut out of it. Expanded
+    relations are not part of the cached payload, so `?expand=` reads the
+    narrowed row from the database and skips the cache and the ETag.
+    """
     serializer_class = ProductSerializer
+    values_serializer_class = ProductValuesSerializer
+    image_fields = ('image1', 'image2', 'image3')
+    thumbnail_fields = ('image1_thumbnails', 'image2_thumbnails', 'image3_thumbnails')
+    conditional_empty_results = False
+
+    def get_validator_queryset(self):
+        return Product.objects.filter(slug=self.kwargs["slug"])
+
+    def get_etag(self):
+        _, expand = self.get_sparse_fieldset()
+        if expand:
+            return None
+        payload = product_cache.peek(self.kwargs["slug"])
+        if payload is None:
+            return super().get_etag()
+        return self.build_etag(1, parse_datetime(payload["updated_at"]))
 
     def get_object(self):
-        product = Product.objects.get_or_none(slug=self.kwargs["slug"])
+        _, expand = self.get_sparse_fieldset()
+        queryset = self.get_sparse_queryset(Product.objects.all()) if expand else Product.select.all()
+        product = queryset.filter(slug=self.kwargs["slug"]).first()
         if not product:
-            return NotFound(detail={"message": "Product does not exist!"})
+            raise NotFound(detail={"message": "Product does not exist!"})
         return product
 
+    def load_payload(self):
+        # Serialized without the request so the cached payload is host independent.
+        return ProductSerializer(self.get_object()).data
+
+    def retrieve(self, request, *args, **kwargs):
+        fields, expand = self.get_sparse_fieldset()
+        if expand:
+            return Response(self.get_serializer(self.get_object()).data)
+        payload = product_cache.get_or_set(self.kwargs["slug"], self.load_payload)
+        payload = {
+            name: value for name, value in payload.items()
+            if fields is None or name in fields
+        }
+        for field in self.image_fields:
+            if payload.get(field):
+                payload[field] = request.build_absolute_uri(payload[field])
+        for field in self.thumbnail_fields:
+            if payload.get(field):
+                payload[field] = {
+                    image_format: {width: request.build_absolute_uri(url) for width, url in urls.items()}
+                    for image_format, urls in payload[field].items()
+                }
+        return Response(payload)
+
     @extend_schema(
         operation_id="product_detail",
         summary="Product Details Fetch",
         description='This endpoint returns the details for a product via the slug.',
-        tags=tags
+        tags=tags,
+        parameters=SPARSE_FIELDSET_PARAMETERS,
     )
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
 
-class CartView(ListCreateAPIView):
+class ThumbnailView(APIView):
+    """
+    Redirects to a rendered image variant. Variants that do not exist yet are
+    scheduled and the original is served until they are ready.
+    """
+    ready_max_age = 60 * 60 * 24
+
+    @extend_schema(
+        summary="Image Thumbnail",
+        description='This endpoint redirects to a resized variant of a product or category image.',
+        tags=tags,
+        responses={302: None},
+    )
+    def get(self, request, width, image_format, name):
+        if width not in get_widths() or image_format not in get_formats() or not is_source(name):
+            raise NotFound(detail={"message": "Thumbnail does not exist!"})
+        url = thumbnails.variant_url(name, width, image_format)
+        if url is None:
+            if not default_storage.exists(name):
+                raise NotFound(detail={"message": "Image does not exist!"})
+            thumbnails.schedule(name)
+            url = thumbnails.variant_url(name, width, image_format)
+        if url is None:
+            response = HttpResponseRedirect(default_storage.url(name))
+            patch_cache_control(response, no_cache=True)
+        else:
+            response = HttpResponseRedirect(url)
+            patch_cache_control(response, public=True, max_age=self.ready_max_age)
+        return response
+
+
+class CartView(GenericAPIView):
+    """
+    The cart lives in `apps.shop.carts`; `OrderItem` rows are only written by
+    its write-behind flush and at checkout.
+    """
+
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return ToggleCartItemSerializer
         else:
             return OrderItemSerializer
 
-    def get_queryset(self):
-        return OrderItem.select.filter(user=self.request.user, order=None)
-
-    def get_product(self):
-        product = Product.objects.get_or_none(slug=self.kwargs["slug"])
+    def get_product(self, slug):
+        product = Product.objects.get_or_none(slug=slug)
         if not product:
-            return NotFound(detail={"message": "No Product with that slug"})
+            raise NotFound(detail={"message": "No Product with that slug"})
         return product
 
     @extend_schema(
         summary="Cart Items Fetch",
-        description='This endpoint returns all items in a user cart.',
+        description='This endpoint returns all items in a user cart, newest first, as a plain list.',
         tags=tags,
+        responses=OrderItemSerializer(many=True),
     )
     def get(self, request, *args, **kwargs):
-        return super().get(request, *args, **kwargs)
+        return Response(data=carts.render(request.user.pk))
 
     @extend_schema(
         summary="Toggle Item in cart",
         description="""
                This endpoint allows a user or guest to add/update/remove an item in cart.
-               If quantity is 0, the item is removed from cart
+               If quantity is 0, the item is removed from cart.
+               The quantity is reserved for a limited time; if not enough is in stock the cart is left as it was.
            """,
         tags=tags,
         request=ToggleCartItemSerializer,
     )
     def post(self, request, *args, **kwargs):
-        user = request.user
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
-        product = self.get_product()
-        orderitem, created = OrderItem.objects.update_or_create(
-            user=user,
-            order=None,
-            product=product,
-            defaults={'quantity': data['quantity']},
-        )
+        # Products on flash sale turn excess demand away before the database.
+        admitted = flash_sales.admit(data['slug'], data['quantity'])
+        if admitted is False:
+            return Response(
+                data={"message": "Not Enough Stock Left In The Sale", "available": flash_sales.remaining(data['slug'])},
+                status=status.HTTP_409_CONFLICT,
+            )
+        try:
+            return self.toggle(request.user, self.get_product(data['slug']), data['quantity'])
+        finally:
+            if admitted:
+                flash_sales.give_back(data['slug'], data['quantity'])
+
+    def toggle(self, user, product, quantity):
+        try:
+            # A busy cart rolls the reservation back with it.
+            with transaction.atomic():
+                inventory.reserve(user, product, quantity)
+                created = carts.set_quantity(user.pk, product.pk, quantity)
+        except inventory.InsufficientStock as exc:
+            return Response(
+                data={"message": str(exc), "available": exc.available},
+                status=status.HTTP_409_CONFLICT,
+            )
         resp_message_substring = "Updated In"
         status_code = 200
         if created:
             status_code = 201
             resp_message_substring = "Added To"
-        if orderitem.quantity == 0:
+        if quantity == 0:
             resp_message_substring = "Removed From"
-            orderitem.delete()
             data = None
-        if resp_message_substring != "Removed From":
-            serializer = self.serializer_class(orderitem)
-            data = serializer.data
+        else:
+            data = carts.render_item(carts.get_cards([str(product.pk)])[str(product.pk)], quantity)
         return Response(
             data={"message": f"Item {resp_message_substring} Cart", "item": data},
             status=status_code
         )
 
 
+class CartBatchView(GenericAPIView):
+    serializer_class = CartBatchSerializer
+
+    @extend_schema(
+        summary="Cart Batch Update",
+        description="""
+            This endpoint sets the quantities of several cart items at once and returns the new cart.
+            A quantity of 0 removes the item. Either every item is applied or, when a product is
+            unknown or short of stock, none is.
+        """,
+        tags=tags,
+        request=CartBatchSerializer,
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        quantities = {item['slug']: item['quantity'] for item in serializer.validated_data['items']}
+        admitted = {}
+        try:
+            for slug, quantity in quantities.items():
+                result = flash_sales.admit(slug, quantity)
+                if result is False:
+                    return Response(
+                        data={"message": "Not Enough Stock Left In The Sale", "product": slug,
+                              "available": flash_sales.remaining(slug)},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                if result:
+                    admitted[slug] = quantity
+            return self.apply(request.user, quantities)
+        finally:
+            for slug, quantity in admitted.items():
+                flash_sales.give_back(slug, quantity)
+
+    def apply(self, user, quantities):
+        products = {product.slug: product for product in Product.objects.filter(slug__in=quantities)}
+        missing = sorted(set(quantities) - set(products))
+        if missing:
+            raise NotFound(detail={"message": "No Product with that slug", "slugs": missing})
+        try:
+            with transaction.atomic():
+                for slug, quantity in quantities.items():
+                    inventory.reserve(user, products[slug], quantity)
+                carts.set_quantities(user.pk, {products[slug].pk: quantity for slug, quantity in quantities.items()})
+        except inventory.InsufficientStock as exc:
+            return Response(
+                data={"message": str(exc), "product": exc.product.slug, "available": exc.available},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(data={"message": "Cart Updated", "items": carts.render(user.pk)})
+
+
 class CheckoutView(CreateAPIView):
     serializer_class = CheckoutSerializer
 
     def get_shipping_address(self, id):
-        shipping = ShippingAddress.objects.get_or_none(id=id)
+        shipping = ShippingAddress.objects.get_or_none(id=id, user=self.request.user)
         if not shipping:
-            return Response({"message": "No shipping address with that ID"}, status=404)
+            raise NotFound(detail={"message": "No shipping address with that ID"})
         return shipping
 
     def get_orderitems(self):
-        orderitems = OrderItem.objects.filter(user=self.request.user, order=None)
-        if not orderitems.exists():
-            return Response({"message": "No Items in Cart"}, status=404)
+        orderitems = list(OrderItem.select.filter(user=self.request.user, order=None))
+        if not orderitems:
+            raise NotFound(detail={"message": "No Items in Cart"})
         return orderitems
 
     def create_order(self, obj):
@@ -215,20 +602,56 @@ class CheckoutView(CreateAPIView):
         data = {field: getattr(obj, field) for field in fields_to_update}
         return Order.objects.create(user=self.request.user, **data)
 
+    def place_items(self, order, orderitems):
+        """
+        Moves the cart items into the order and snapshots their prices in the same
+        UPDATE. Returns how many items were still in the cart.
+        """
+        price = Product.objects.unfiltered().filter(pk=OuterRef("product_id")).values("price_current")[:1]
+        return OrderItem.objects.filter(id__in=[item.id for item in orderitems], order=None).update(
+            order=order,
+            unit_price=Subquery(price),
+            line_total=ExpressionWrapper(Subquery(price) * F("quantity"), output_field=DecimalField()),
+        )
+
+    def fill_totals(self, order):
+        subtotal = OrderItem.objects.filter(order=order).aggregate(subtotal=Sum("line_total"))["subtotal"] or 0
+        order.subtotal = order.total = subtotal
+        order.save(update_fields=["subtotal", "total", "updated_at"])
+
     @extend_schema(
         summary="Checkout",
-        description='This endpoint allows a user to create an order through which payment can then be made through.',
+        description="""
+            This endpoint allows a user to create an order through which payment can then be made through.
+            Stock is taken for every item in one transaction; if any item is short nothing is ordered.
+        """,
         tags=tags,
         request=CheckoutSerializer,
     )
     def post(self, request, *args, **kwargs):
-        orderitems = self.get_orderitems()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
         shipping = self.get_shipping_address(data.get('shipping_id'))
-        order = self.create_order(shipping)
-        orderitems.update(order=order)
+        try:
+            with transaction.atomic():
+                carts.persist(request.user.pk)
+                orderitems = self.get_orderitems()
+                inventory.checkout(request.user, orderitems)
+                order = self.create_order(shipping)
+                if self.place_items(order, orderitems) != len(orderitems):
+                    # A concurrent checkout of the same cart got there first.
+                    transaction.set_rollback(True)
+                    return Response(data={"message": "Cart Changed During Checkout"}, status=status.HTTP_409_CONFLICT)
+                self.fill_totals(order)
+                SellerOrder.objects.project([order.id])
+                rollups.record_order(order)
+                transaction.on_commit(lambda: carts.clear(request.user.pk))
+        except inventory.InsufficientStock as exc:
+            return Response(
+                data={"message": str(exc), "product": exc.product.slug, "available": exc.available},
+                status=status.HTTP_409_CONFLICT,
+            )
         serializer = OrderSerializer(order)
         return Response(
             data={"message": "Checkout Successful", "item": serializer.data}, status=200
@@ -238,9 +661,7 @@ class CheckoutView(CreateAPIView):
 class ReviewView(DestroyModelMixin, ListCreateAPIView):
     permission_classes = [IsReviewer]
     lookup_field = 'id'
-    filter_backends = [OrderingFilter]
-    ordering_param = 'sort'
-    ordering_fields = ['created_at', 'rating']
+    pagination_class = ReviewPagination
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -254,21 +675,25 @@ class ReviewView(DestroyModelMixin, ListCreateAPIView):
             raise NotFound("No Product with that slug")
         return product
 
-    def get_reviews(self, product):
-        user = self.request.user
-        reviews = Review.objects.filter(user=user, product=product)
-        if not reviews.exists():
-            return Response(data={'message': "No Reviews"}, status=status.HTTP_404_NOT_FOUND)
-        return reviews
-
     def get_queryset(self):
-        product = self.get_product()
-        reviews = self.get_reviews(product)
+        self.product = self.get_product()
+        reviews = Review.objects.filter(product=self.product)
+        if self.request.method != 'GET':
+            reviews = reviews.filter(user=self.request.user)
         return reviews
 
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data = {"rating": ProductRatingSerializer(self.product).data, **response.data}
+        return response
+
     @extend_schema(
         summary="Reviews Fetch",
-        description='This endpoint returns all reviews of product.',
+        description="""
+            This endpoint returns the reviews of a product, newest first or sorted by rating, in pages.
+            The rating block carries the average and the star histogram of the product, kept up to
+            date as reviews are written.
+        """,
         tags=tags,
     )
     def get(self, request, *args, **kwargs):
@@ -281,17 +706,14 @@ class ReviewView(DestroyModelMixin, ListCreateAPIView):
         request=CreateReviewSerializer,
     )
     def post(self, request, *args, **kwargs):
-        user = request.user
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
         product = self.get_product()
-        review, created = Review.objects.update_or_create(
-            user=user,
-            product=product,
-            defaults=data
-        )
-        self.check_object_permissions(self.request, review)
+        with transaction.atomic():
+            review, created = Review.objects.upsert(request.user, product, **data)
+            # Checked on the written row, so a refusal rolls the write back.
+            self.check_object_permissions(self.request, review)
         response_message = 'Updated Review'
         status_code = status.HTTP_200_OK
         if created:
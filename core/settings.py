@@ -87,10 +87,58 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Transactions take the write lock up front, so concurrent writers queue
+        # on the busy timeout instead of failing to upgrade a read lock.
+        "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
     }
 }
 
 
+# Cache
+# The local-memory backend is per process; point this at a shared backend
+# (Redis, Memcached) in production so cache invalidation reaches every worker.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+PRODUCT_DETAIL_CACHE_TIMEOUT = 300
+
+# Seconds a cart item holds its stock; expired holds are given back by the
+# release_expired_reservations command (run it from cron) and on demand when a
+# product runs short.
+CART_RESERVATION_TTL = 15 * 60
+
+# Carts are kept in the cache and written to OrderItem behind: at checkout and
+# by the flush_carts command, run from cron every CART_FLUSH_INTERVAL seconds.
+CART_CACHE_TIMEOUT = 30 * 24 * 60 * 60
+CART_PRODUCT_CACHE_TIMEOUT = 300
+CART_FLUSH_INTERVAL = 30
+
+# Default length of a flash sale opened with the flash_sale command. The
+# admission counters live in the cache above, so they are only shared between
+# workers with a shared cache backend.
+FLASH_SALE_DURATION = 60 * 60
+
+# Order references: "sortable" (time-ordered, node-tagged base 32) or "legacy"
+# (12 random characters). TX_REF_NODE pins the node tag, e.g. per container.
+TX_REF_FORMAT = "sortable"
+
+# Resized product and category images, rendered by a process pool under
+# MEDIA_ROOT/THUMBNAIL_DIR. THUMBNAIL_WORKERS = 0 renders inline.
+THUMBNAIL_DIR = "thumbnails"
+THUMBNAIL_WIDTHS = (160, 320, 640)
+THUMBNAIL_FORMATS = ("webp", "jpeg")
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = 2
+
+# Columnar snapshots of the order lines read by the staff sales analytics; the
+# export_sales_snapshot command (run it from cron) writes a new one.
+SALES_SNAPSHOT_DIR = BASE_DIR / "snapshots" / "sales"
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -132,6 +180,22 @@ STATIC_URL = "static/"
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "/media/"
 
+STORAGES = {
+    "default": {
+        "BACKEND": "apps.common.storage.ContentAddressedStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
+# Media bodies are sent by the front server: "X-Accel-Redirect" (nginx, with an
+# internal location at MEDIA_ACCEL_REDIRECT_PREFIX aliased to MEDIA_ROOT) or
+# "X-Sendfile" (Apache). None streams them from Django, for development.
+MEDIA_SENDFILE_HEADER = None
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
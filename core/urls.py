@@ -15,10 +15,13 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
+from apps.common.views import serve_media
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
@@ -31,4 +34,5 @@ urlpatterns = [
     path("profile/", include("apps.profiles.urls")),
     path("sellers/", include("apps.sellers.urls")),
     path("shop/", include("apps.shop.urls")),
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:name>", serve_media, name="media"),
 ]